@@ -1,7 +1,14 @@
 from pathlib import Path
-from io import StringIO
-from Bio import Entrez, SeqIO
+from Bio import SeqIO
 import os
+import sys
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from seqtools.composition import sequence_composition
+from seqtools.entrez import EntrezClient
 
 # setează email pentru NCBI (sau: export NCBI_EMAIL="emailul_tău")
 
@@ -13,27 +20,28 @@ QUERY = 'BRCA1[Gene] AND "Homo sapiens"[Organism]'
 OUT_GB = DATA_DIR / "brca1.gb"
 
 def gc_content(seq: str) -> float:
-    s = seq.upper().replace("N", "")
-    return 0.0 if not s else (s.count("G") + s.count("C")) / len(s)
-
-# search
-with Entrez.esearch(db="nucleotide", term=QUERY, retmax=1) as h:
-    ids = Entrez.read(h)["IdList"]
-print(f"Găsite {len(ids)} rezultate.")
-if not ids:
+    # GC / (A+C+G+T): N și celelalte coduri IUPAC nu intră la numitor
+    return float(sequence_composition([seq]).gc[0])
+
+# email / api_key din NCBI_EMAIL / NCBI_API_KEY; cererile respectă limita NCBI (3/s, 10/s cu cheie).
+# Răspunsurile se păstrează în cache pe disc (7 zile): rerularea nu mai face cereri către NCBI;
+# SEQTOOLS_ENTREZ_OFFLINE=1 servește doar din cache.
+client = EntrezClient()
+
+# search: rezultatele rămân pe History server (WebEnv), nu mai transferăm lista de ID-uri
+query = client.esearch("nucleotide", QUERY)
+print(f"Găsite {query.count} rezultate.")
+if not query.count:
     raise SystemExit("Niciun rezultat pentru BRCA1.")
 
-acc = ids[0]
-
-# GenBank
-with Entrez.efetch(db="nucleotide", id=acc, rettype="gb", retmode="text") as h:
-    OUT_GB.write_text(h.read(), encoding="utf-8")
+# GenBank (o singură cerere: secvența pentru FASTA & GC vine din același record).
+# "gbwithparts" include secvența și pentru înregistrările de tip CONTIG (cu "gb" ar lipsi).
+OUT_GB.write_bytes(client.efetch(query, retstart=0, retmax=1, rettype="gbwithparts"))
 gb_record = SeqIO.read(OUT_GB, "genbank")
-
-# FASTA & GC
-with Entrez.efetch(db="nucleotide", id=acc, rettype="fasta", retmode="text") as hf:
-    fasta_rec = SeqIO.read(StringIO(hf.read()), "fasta")
-seq = str(fasta_rec.seq)
+acc = gb_record.id
+if not gb_record.seq.defined:
+    raise SystemExit(f"Înregistrarea {acc} nu conține secvența (CONTIG fără părți).")
+seq = str(gb_record.seq)
 
 gc = gc_content(seq)
 print("ID:", acc)
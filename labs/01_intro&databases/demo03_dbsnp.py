@@ -1,19 +1,30 @@
+from io import BytesIO
+from pathlib import Path
+import sys
+
 from Bio import Entrez
 
-Entrez.email = "student@example.com"
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from seqtools.entrez import EntrezClient
+
+# Răspunsurile NCBI se păstrează în cache pe disc (~/.cache/seqtools/entrez.sqlite, 7 zile):
+# rerulările nu mai așteaptă rețeaua; SEQTOOLS_ENTREZ_OFFLINE=1 servește doar din cache.
+client = EntrezClient(email="student@example.com")
 
-res = Entrez.esearch(
+res = client.call(
+    "esearch",
     db="snp",
     term="BRCA1[gene] AND Homo sapiens[organism]",
     retmax=5,
 )
-ids = Entrez.read(res)["IdList"]
+ids = Entrez.read(BytesIO(res))["IdList"]
 print(f"Am găsit {len(ids)} SNP IDs.")
 
 if ids:
-    handle = Entrez.esummary(db="snp", id=",".join(ids), retmode="xml")
-    docsums = Entrez.read(handle)
-    handle.close()
+    docsums = Entrez.read(BytesIO(client.call("esummary", db="snp", id=",".join(ids), retmode="xml")))
 
     for d in docsums['DocumentSummarySet']['DocumentSummary']:
         snp_id = d.attributes.get('uid')
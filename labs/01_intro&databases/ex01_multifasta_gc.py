@@ -26,68 +26,129 @@ Instrucțiuni:
     4) Scrieți rezultatele în fișierul dat prin --out.
     5) Citiți fișierul FASTA local și calculați GC pentru fiecare secvență.
     6) Afișați rezultatele pe ecran: <id>\tGC=<valoare cu 3 zecimale>.
+
+  Descărcări mari (sute de mii de înregistrări): se folosește History server-ul NCBI (WebEnv),
+  loturi de --batch_size ID-uri cerute în paralel (--workers) sub limita de 3 cereri/s
+  (10/s cu --api_key); o descărcare întreruptă se reia de unde a rămas la rularea
+  cu aceiași parametri (checkpoint <out>.ckpt.json).
+
+  Profil de compoziție pentru un FASTA existent (fără descărcare; merge și pe genomuri întregi,
+  fișierul se citește pe bucăți):
+      python ex01_multifasta_gc.py --composition --out data/work/<handle>/lab01/my_tp53.fa
+
+  Profil GC / GC skew pe ferestre glisante (bedGraph, de ex. pentru insule CpG):
+      python ex01_multifasta_gc.py --window 200 --step 20 --out data/work/<handle>/lab01/my_tp53.fa
+  scrie <out>.gc.bedgraph și <out>.gc_skew.bedgraph (sau --bedgraph <prefix>).
 """
 
 import argparse
 from pathlib import Path
 import sys
 
-from Bio import SeqIO
-# from Bio import Entrez  # TODO: deblocați și folosiți pentru descărcare
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from seqtools.composition import fasta_composition, fasta_gc_windows, sequence_composition, write_bedgraph
+from seqtools.entrez import DEFAULT_BASE_URL, DEFAULT_BATCH_SIZE, EntrezClient, EntrezError, download
 
 
 def gc_fraction(seq: str) -> float:
-    """Fracție GC pentru o secvență; robust la litere mici/mari și non-ATGC."""
-    s = seq.upper()
-    atgc = [c for c in s if c in ("A", "T", "G", "C")]
-    if not atgc:
-        return 0.0
-    g = atgc.count("G")
-    c = atgc.count("C")
-    return (g + c) / float(len(atgc))
+    """
+    Fracție GC pentru o secvență; robust la litere mici/mari și non-ATGC
+    (GC / (A+C+G+T), dintr-o singură numărare np.bincount a octeților, seqtools.composition).
+    """
+    return float(sequence_composition([seq]).gc[0])
+
+
+def print_composition(fasta_path: Path):
+    """Compoziția fiecărei înregistrări (GC, AT, N, ambiguități IUPAC, soft-mask), într-o singură trecere."""
+    comp = fasta_composition(fasta_path)
+    print("id\tlength\tGC\tAT\tN\tambiguous\tsoft_masked")
+    for row in comp.rows():
+        print(f"{row['id']}\t{row['length']}\t{row['gc']:.3f}\t{row['at']:.3f}\t{row['n']:.4f}\t"
+              f"{row['ambiguous']:.4f}\t{row['soft_masked']:.4f}")
+
+
+def write_gc_tracks(fasta_path: Path, window: int, step: int, prefix: Path):
+    """GC și GC skew pe ferestre (sume cumulative, O(1) pe fereastră), citind FASTA-ul pe bucăți."""
+    paths = {"gc": Path(f"{prefix}.gc.bedgraph"), "skew": Path(f"{prefix}.gc_skew.bedgraph")}
+    n = write_bedgraph(fasta_gc_windows(fasta_path, window, step), paths)
+    print(f"[ok] {n} ferestre (window={window}, step={step}) -> {paths['gc']}, {paths['skew']}")
 
 
 def download_fasta(email: str, out_path: Path, query: str = None,
                    accession: str = None, db: str = "nuccore",
-                   retmax: int = 3, api_key: str = None) -> int:
+                   retmax: int = 3, api_key: str = None,
+                   batch_size: int = DEFAULT_BATCH_SIZE, workers: int = 3,
+                   base_url: str = DEFAULT_BASE_URL) -> int:
     """
-    TODO: Implementați descărcarea din NCBI.
-    Pași:
-      - Configurați Entrez cu email (și api_key opțional).
-      - Dacă avem accession: descărcați acel record.
-      - Altfel, dacă avem query: faceți esearch -> lista de id-uri, apoi efetch.
-      - Scrieți rezultatele în out_path.
-      - Returnați numărul de înregistrări scrise.
+    Descarcă din NCBI în out_path (seqtools.entrez): accession -> acel record (epost),
+    altfel query -> primele `retmax` rezultate (esearch), ambele prin History server,
+    în loturi de `batch_size`. Returnează numărul de înregistrări scrise.
     """
-    raise NotImplementedError("TODO: implementați descărcarea cu Entrez")
+    if not query and not accession:
+        raise SystemExit("[eroare] Dați --query sau --accession.")
+    client = EntrezClient(email=email, api_key=api_key, base_url=base_url)
+
+    def progress(done, total):
+        print(f"\r[info] {done}/{total} înregistrări", end="\n" if done == total else "", file=sys.stderr)
+
+    try:
+        if accession:
+            return download(client, out_path, db=db, ids=[accession], batch_size=batch_size, workers=workers)
+        return download(client, out_path, db=db, term=query, max_records=retmax,
+                        batch_size=batch_size, workers=workers, progress=progress)
+    except EntrezError as exc:
+        raise SystemExit(f"[eroare] {exc}")
 
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--email", required=True, help="Email obligatoriu pentru NCBI Entrez")
+    ap.add_argument("--email", help="Email obligatoriu pentru NCBI Entrez (nu și cu --composition)")
     ap.add_argument("--api_key", help="NCBI API key (opțional)")
     ap.add_argument("--query", help="Ex: 'TP53[Gene] AND Homo sapiens[Organism]'")
     ap.add_argument("--accession", help="Ex: NM_000546")
     ap.add_argument("--db", default="nuccore", choices=["nuccore", "protein"])
-    ap.add_argument("--retmax", type=int, default=3)
+    ap.add_argument("--retmax", type=int, default=3, help="Numărul maxim de înregistrări pentru --query")
+    ap.add_argument("--batch_size", type=int, default=DEFAULT_BATCH_SIZE,
+                    help=f"ID-uri per cerere efetch (implicit {DEFAULT_BATCH_SIZE})")
+    ap.add_argument("--workers", type=int, default=3, help="Cereri efetch în paralel (implicit 3)")
+    ap.add_argument("--base_url", default=DEFAULT_BASE_URL, help="URL-ul E-utilities (ex. o oglindă / server local)")
     ap.add_argument("--out", required=True, help="Fișier FASTA de ieșire")
+    ap.add_argument("--composition", action="store_true",
+                    help="Doar profilul de compoziție pentru FASTA-ul --out existent (fără descărcare)")
+    ap.add_argument("--window", type=int,
+                    help="Lungimea ferestrei pentru profilul GC / GC skew (bedGraph) al FASTA-ului --out existent")
+    ap.add_argument("--step", type=int, help="Pasul dintre ferestre (implicit = --window)")
+    ap.add_argument("--bedgraph", help="Prefix pentru fișierele bedGraph (implicit: --out)")
     args = ap.parse_args()
 
     out_path = Path(args.out)
+    if args.composition or args.window:
+        if not out_path.exists():
+            raise SystemExit(f"[eroare] Nu găsesc fișierul: {out_path}")
+        if args.composition:
+            print_composition(out_path)
+        if args.window:
+            if args.window < 1 or (args.step is not None and args.step < 1):
+                raise SystemExit("[eroare] --window și --step trebuie să fie pozitive")
+            write_gc_tracks(out_path, args.window, args.step or args.window, Path(args.bedgraph or out_path))
+        return
+    if not args.email:
+        ap.error("--email este obligatoriu pentru descărcare")
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # TODO: Apelați funcția download_fasta(...) și salvați rezultatele
-    # n = download_fasta(args.email, out_path, query=args.query,
-    #                    accession=args.accession, db=args.db,
-    #                    retmax=args.retmax, api_key=args.api_key)
-    # print(f"[ok] Am scris {n} înregistrări în: {out_path}")
-
-    # TODO: Citiți fișierul FASTA cu SeqIO.parse
-    # records = ...
+    n = download_fasta(args.email, out_path, query=args.query,
+                       accession=args.accession, db=args.db,
+                       retmax=args.retmax, api_key=args.api_key,
+                       batch_size=args.batch_size, workers=args.workers, base_url=args.base_url)
+    print(f"[ok] Am scris {n} înregistrări în: {out_path}")
 
-    # TODO: Calculați GC pentru fiecare secvență și afișați rezultatele
-    # for rec in records:
-    #     print(f"{rec.id}\tGC={valoare:.3f}")
+    # GC pentru fiecare secvență, citind fișierul pe bucăți (o singură trecere)
+    comp = fasta_composition(out_path)
+    for seq_id, gc in zip(comp.ids, comp.gc):
+        print(f"{seq_id}\tGC={gc:.3f}")
 
 
 if __name__ == "__main__":
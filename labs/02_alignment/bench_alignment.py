@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+"""
+Benchmark pentru motoarele de aliniere din Lab 02 (NW global și SW local).
+
+Motoare comparate:
+  - ex01_global_nw.py : python, numpy, hirschberg, banded + Biopython (referința de scor)
+  - ex02_local_sw.py  : python, score (2 rânduri), traceback (pointeri de 2 biți) + Biopython
+  - submissions/<handle>/ex01_global_nw.py, ex02_local_sw.py : implementările studenților
+
+Perechi de intrare, pentru fiecare lungime din --lengths (implicit 100 .. 20000):
+  - synthetic : secvență ADN aleatoare + copie mutată (~10% substituții/inserții/deleții), seed fix
+  - tp53      : prefixele transcriptelor TP53 om / șoarece din data/sample/ (cel mult lungimea lor)
+
+Fiecare rulare se face într-un proces separat: se măsoară timpul, vârful de memorie (RSS)
+și celule/s (m * n / timp, și pentru motoarele care nu calculează toate celulele); scorul
+se compară cu Align.PairwiseAligner. Motoarele cu matrice completă care ar depăși
+--max_matrix_mb și cele pur Python peste --max_python_len sunt sărite.
+Raportul (JSON + CSV, ordine și seed-uri fixe) poate fi comparat între commit-uri cu --baseline.
+
+Exemplu rulare:
+  python labs/02_alignment/bench_alignment.py
+  python labs/02_alignment/bench_alignment.py --lengths 100 500 --check --out bench/alignment
+  python labs/02_alignment/bench_alignment.py --baseline bench_vechi.json
+"""
+
+import argparse
+import csv
+import importlib.util
+import json
+import multiprocessing as mp
+import platform
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from seqtools.seqstore import load_fasta
+
+LAB_DIR = Path(__file__).resolve().parent
+TP53_FASTA = REPO_ROOT / "data" / "sample" / "tp53_dna_multi.fasta"
+
+DEFAULT_LENGTHS = [100, 1000, 5000, 20000]
+MUTATION_RATE = 0.1
+
+# Scorurile implicite din ex01 (global) și ex02 (local)
+SCORING = {
+    "global": dict(match=1, mismatch=-1, gap=-2),
+    "local": dict(match=3, mismatch=-3, gap=-2),
+}
+
+# Memorie estimată per celulă (bytes): listă de liste Python, int32, pointeri de 2 biți;
+# None = memorie liniară (două rânduri / Hirschberg / Biopython doar scor).
+# "band" = int32 doar pe banda inițială (|m - n| + 2 * BAND + 1 diagonale).
+BYTES_PER_CELL = {"python": 36, "matrix": 4, "band": 4, "packed": 0.25, "linear": None}
+BAND = 32
+
+REPORT_FIELDS = ["dataset", "mode", "len1", "len2", "source", "engine", "status", "score",
+                 "reference_score", "agree", "wall_s", "cells_per_s", "peak_rss_mb", "extra_rss_mb", "error"]
+
+
+def engine_specs():
+    """
+    Lista motoarelor: (mod, sursă, motor, fișier, funcție, memorie).
+    Ordinea este fixă (motoarele de referință, apoi submissions/ alfabetic).
+    """
+    specs = [
+        ("global", "ex01_global_nw", "biopython", "biopython_score", "linear"),
+        ("global", "ex01_global_nw", "python", "needleman_wunsch", "python"),
+        ("global", "ex01_global_nw", "numpy", "needleman_wunsch_numpy", "matrix"),
+        ("global", "ex01_global_nw", "hirschberg", "needleman_wunsch_hirschberg", "linear"),
+        ("global", "ex01_global_nw", "banded", "needleman_wunsch_banded", "band"),
+        ("local", "ex02_local_sw", "biopython", "biopython_score", "linear"),
+        ("local", "ex02_local_sw", "python", "smith_waterman", "python"),
+        ("local", "ex02_local_sw", "score", "smith_waterman_score", "linear"),
+        ("local", "ex02_local_sw", "traceback", "smith_waterman_traceback", "packed"),
+    ]
+    out = [(mode, source, engine, LAB_DIR / f"{source}.py", func, memory)
+           for mode, source, engine, func, memory in specs]
+    for sub in sorted(p for p in (LAB_DIR / "submissions").glob("*") if p.is_dir()):
+        for mode, name, func in [("global", "ex01_global_nw", "needleman_wunsch"),
+                                 ("local", "ex02_local_sw", "smith_waterman")]:
+            path = sub / f"{name}.py"
+            if path.exists():
+                out.append((mode, f"submissions/{sub.name}/{name}", "python", path, func, "python"))
+    return out
+
+
+# ===================== Perechi de intrare =====================
+
+def mutate(seq: str, rng: np.random.Generator, rate: float = MUTATION_RATE) -> str:
+    """Copie a lui `seq` cu substituții, deleții și inserții (fiecare ~rate/3 per poziție)."""
+    bases = "ACGT"
+    draws = rng.random(len(seq))
+    repl = rng.integers(0, 4, len(seq))
+    out = []
+    for c, x, r in zip(seq, draws, repl):
+        if x < rate / 3:
+            continue                           # deleție
+        if x < 2 * rate / 3:
+            out.append(bases[(bases.index(c) + 1 + r % 3) % 4])  # substituție (altă bază)
+        else:
+            out.append(c)
+            if x < rate:
+                out.append(bases[r])           # inserție după poziție
+    return "".join(out)
+
+
+def synthetic_pair(length: int, seed: int):
+    """Pereche reproductibilă: secvență aleatoare de lungime `length` și o copie mutată."""
+    rng = np.random.default_rng(seed + length)
+    seq1 = "".join(np.array(list("ACGT"))[rng.integers(0, 4, length)])
+    return seq1, mutate(seq1, rng)
+
+
+def tp53_pairs(lengths):
+    """Prefixe din TP53 om vs șoarece; lungimile peste transcripte se reduc la transcriptele întregi."""
+    recs = load_fasta(TP53_FASTA, upper=True)
+    s1, s2 = recs.text(0), recs.text(1)
+    seen, out = set(), []
+    for length in lengths:
+        key = (min(length, len(s1)), min(length, len(s2)))
+        if key not in seen:
+            seen.add(key)
+            out.append((s1[:key[0]], s2[:key[1]]))
+    return out
+
+
+def build_inputs(lengths, seed: int, datasets):
+    """Lista (dataset, seq1, seq2), în ordinea lungimilor."""
+    inputs = []
+    if "synthetic" in datasets:
+        inputs += [("synthetic", *synthetic_pair(length, seed)) for length in lengths]
+    if "tp53" in datasets:
+        inputs += [("tp53", s1, s2) for s1, s2 in tp53_pairs(lengths)]
+    return inputs
+
+
+# ===================== Rulare izolată =====================
+
+def _max_rss_mb() -> float:
+    import resource
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10  # bytes pe macOS, KiB pe Linux
+
+
+def extract_score(result):
+    """Scorul din rezultatul unui motor: număr, AlignmentResult, (a1, a2, scor) sau (scor, poziție)."""
+    if isinstance(result, (int, float, np.integer, np.floating)):
+        return float(result)
+    if hasattr(result, "score"):
+        return float(result.score)
+    result = tuple(result)
+    return float(result[2] if len(result) == 3 else result[0])
+
+
+def _run_child(conn, path: str, func: str, seq1: str, seq2: str, scoring: dict):
+    """Procesul copil: încarcă modulul, rulează motorul o dată și trimite măsurătorile."""
+    try:
+        spec = importlib.util.spec_from_file_location(f"bench_{Path(path).stem}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        base = _max_rss_mb()
+        t0 = time.perf_counter()
+        result = getattr(module, func)(seq1, seq2, **scoring)
+        wall = time.perf_counter() - t0
+        conn.send({"status": "ok", "score": extract_score(result), "wall_s": wall,
+                   "peak_rss_mb": _max_rss_mb(), "extra_rss_mb": _max_rss_mb() - base})
+    except NotImplementedError as e:
+        conn.send({"status": "todo", "error": str(e)})
+    except Exception as e:
+        conn.send({"status": "error", "error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+def run_isolated(path: Path, func: str, seq1: str, seq2: str, scoring: dict, timeout: float) -> dict:
+    """Rulează motorul într-un proces nou (spawn), ca vârful RSS să fie doar al lui."""
+    ctx = mp.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_run_child, args=(child, str(path), func, seq1, seq2, scoring))
+    proc.start()
+    child.close()
+    if parent.poll(timeout):
+        try:
+            out = parent.recv()
+        except EOFError:
+            out = {"status": "error", "error": f"procesul s-a oprit (cod {proc.exitcode})"}
+    else:
+        proc.terminate()
+        out = {"status": "timeout", "error": f"peste {timeout:g} s"}
+    proc.join()
+    return out
+
+
+def skip_reason(memory: str, m: int, n: int, args) -> str:
+    """Motivul pentru care motorul nu se rulează pe o pereche m x n (sau "" dacă se rulează)."""
+    if memory == "python" and max(m, n) > args.max_python_len:
+        return f"lungime > --max_python_len {args.max_python_len}"
+    per_cell = BYTES_PER_CELL[memory]
+    cols = abs(m - n) + 2 * BAND + 1 if memory == "band" else n + 1
+    if per_cell is not None and (m + 1) * cols * per_cell > args.max_matrix_mb * 2**20:
+        return f"matrice > --max_matrix_mb {args.max_matrix_mb:g}"
+    return ""
+
+
+def run_benchmark(args) -> list:
+    """Toate combinațiile (pereche, motor); un rând de raport per combinație."""
+    rows = []
+    for dataset, seq1, seq2 in build_inputs(args.lengths, args.seed, args.datasets):
+        m, n = len(seq1), len(seq2)
+        for mode in ("global", "local"):
+            reference = None
+            for spec_mode, source, engine, path, func, memory in engine_specs():
+                if spec_mode != mode or (args.engines and engine not in args.engines and engine != "biopython"):
+                    continue
+                row = {"dataset": dataset, "mode": mode, "len1": m, "len2": n,
+                       "source": source, "engine": engine}
+                reason = skip_reason(memory, m, n, args)
+                if reason:
+                    row.update(status="skipped", error=reason)
+                else:
+                    row.update(run_isolated(path, func, seq1, seq2, SCORING[mode], args.timeout))
+                if row["status"] == "ok":
+                    row["cells_per_s"] = m * n / row["wall_s"] if row["wall_s"] > 0 else None
+                    if engine == "biopython":
+                        reference = row["score"]
+                    row["reference_score"] = reference
+                    row["agree"] = None if reference is None else row["score"] == reference
+                rows.append(normalize_row(row))
+                print_row(rows[-1])
+    return rows
+
+
+# ===================== Raport =====================
+
+def normalize_row(row: dict) -> dict:
+    """Toate câmpurile raportului, rotunjite (diff-uri stabile între rulări)."""
+    out = {field: row.get(field) for field in REPORT_FIELDS}
+    for field, digits in [("wall_s", 4), ("peak_rss_mb", 1), ("extra_rss_mb", 1)]:
+        if out[field] is not None:
+            out[field] = round(out[field], digits)
+    if out["cells_per_s"] is not None:
+        out["cells_per_s"] = int(float(f"{out['cells_per_s']:.3g}"))
+    for field in ("score", "reference_score"):
+        if out[field] is not None and float(out[field]).is_integer():
+            out[field] = int(out[field])
+    return out
+
+
+def print_row(row: dict):
+    label = f"{row['dataset']:9s} {row['len1']:>6}x{row['len2']:<6} {row['source']}:{row['engine']}"
+    if row["status"] != "ok":
+        print(f"  {label:72s} {row['status']:8s} {row['error'] or ''}")
+        return
+    agree = {True: "ok", False: "DIFERIT", None: "-"}[row["agree"]]
+    print(f"  {label:72s} {row['wall_s']:9.4f} s  {row['cells_per_s']:>12,} cel/s  "
+          f"{row['peak_rss_mb']:8.1f} MB  scor {row['score']} ({agree})")
+
+
+def environment() -> dict:
+    import Bio
+
+    return {"python": platform.python_version(), "numpy": np.__version__, "biopython": Bio.__version__,
+            "platform": platform.platform(), "machine": platform.machine()}
+
+
+def write_report(rows: list, args, prefix: Path):
+    """Scrie <prefix>.json (parametri + mediu + rânduri) și <prefix>.csv (doar rândurile)."""
+    prefix.parent.mkdir(parents=True, exist_ok=True)
+    params = {"lengths": args.lengths, "datasets": args.datasets, "seed": args.seed,
+              "mutation_rate": MUTATION_RATE, "scoring": SCORING,
+              "max_python_len": args.max_python_len, "max_matrix_mb": args.max_matrix_mb}
+    report = {"params": params, "environment": environment(), "results": rows}
+    json_path, csv_path = prefix.with_suffix(".json"), prefix.with_suffix(".csv")
+    json_path.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    with open(csv_path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\n[ok] Raport: {json_path}, {csv_path}")
+
+
+def row_key(row: dict):
+    return row["dataset"], row["mode"], row["len1"], row["len2"], row["source"], row["engine"]
+
+
+def compare_baseline(rows: list, baseline_path: Path) -> int:
+    """
+    Compară cu un raport anterior: raportul de timp (nou / vechi) și schimbările de
+    status sau scor. Returnează numărul de scoruri schimbate.
+    """
+    old = {row_key(r): r for r in json.loads(baseline_path.read_text(encoding="utf-8"))["results"]}
+    changed = 0
+    print(f"\n=== Comparație cu {baseline_path} ===")
+    for row in rows:
+        prev = old.get(row_key(row))
+        label = f"{row['dataset']} {row['len1']}x{row['len2']} {row['source']}:{row['engine']}"
+        if prev is None:
+            print(f"  {label}: nou")
+        elif prev["status"] != row["status"]:
+            print(f"  {label}: status {prev['status']} -> {row['status']}")
+        elif row["status"] == "ok":
+            if prev["score"] != row["score"]:
+                changed += 1
+                print(f"  {label}: SCOR {prev['score']} -> {row['score']}")
+            if prev["wall_s"]:
+                print(f"  {label}: timp x{row['wall_s'] / prev['wall_s']:.2f}")
+    return changed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark motoare NW/SW din Lab 02")
+    ap.add_argument("--lengths", type=int, nargs="+", default=DEFAULT_LENGTHS,
+                    help=f"Lungimile perechilor (implicit {' '.join(map(str, DEFAULT_LENGTHS))})")
+    ap.add_argument("--datasets", nargs="+", choices=["synthetic", "tp53"], default=["synthetic", "tp53"],
+                    help="Seturile de perechi (implicit ambele)")
+    ap.add_argument("--engines", nargs="+", default=None,
+                    help="Doar aceste motoare (ex. numpy hirschberg); Biopython rulează mereu ca referință")
+    ap.add_argument("--seed", type=int, default=42, help="Seed pentru perechile sintetice (implicit 42)")
+    ap.add_argument("--max_python_len", type=int, default=2000,
+                    help="Lungimea maximă pentru motoarele pur Python (implicit 2000)")
+    ap.add_argument("--max_matrix_mb", type=float, default=1024,
+                    help="Memoria maximă estimată pentru matricea completă (implicit 1024 MB)")
+    ap.add_argument("--timeout", type=float, default=600, help="Timp maxim per rulare, în secunde (implicit 600)")
+    ap.add_argument("--out", default="data/work/bench/alignment_bench",
+                    help="Prefixul raportului: <out>.json și <out>.csv (implicit data/work/bench/alignment_bench)")
+    ap.add_argument("--baseline", default=None, help="Raport JSON anterior, pentru comparație")
+    ap.add_argument("--check", action="store_true",
+                    help="Cod de ieșire 1 dacă un motor dă alt scor decât Biopython (sau decât --baseline)")
+    args = ap.parse_args()
+
+    if "tp53" in args.datasets and not TP53_FASTA.exists():
+        raise SystemExit(f"[eroare] Nu găsesc fișierul: {TP53_FASTA}")
+    if args.baseline and not Path(args.baseline).exists():
+        raise SystemExit(f"[eroare] Nu găsesc raportul: {args.baseline}")
+
+    print("=== Benchmark aliniere (Lab 02) ===")
+    rows = run_benchmark(args)
+    write_report(rows, args, Path(args.out))
+
+    mismatches = [r for r in rows if r["agree"] is False]
+    for r in mismatches:
+        print(f"[atenție] {r['dataset']} {r['len1']}x{r['len2']} {r['source']}:{r['engine']}: "
+              f"scor {r['score']}, Biopython {r['reference_score']}")
+    changed = compare_baseline(rows, Path(args.baseline)) if args.baseline else 0
+    if args.check and (mismatches or changed):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
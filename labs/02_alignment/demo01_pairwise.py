@@ -1,19 +1,28 @@
 #!/usr/bin/env python
 """
-Demo: aliniere globală și locală cu Biopython (pairwise).
+Demo: aliniere globală și locală cu Biopython (PairwiseAligner, prin seqtools.pairwise).
 - Refolosim datele din data/sample/; extragem subsecvențe scurte pentru debugging.
+- Se calculează doar prima aliniere optimă (pairwise2, deprecated, le enumera pe toate).
 Rulare:
-  python labs/02_alignment/demo01_pairwise_biopython.py --fasta data/sample/tp53_dna_multi.fasta
+  python labs/02_alignment/demo01_pairwise.py --fasta data/sample/tp53_dna_multi.fasta
 """
 import argparse
-from Bio import SeqIO, pairwise2
+from pathlib import Path
+import sys
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from seqtools.pairwise import align_pairs
+from seqtools.seqstore import load_fasta
 
 def take_two_short_subseqs(fasta_path, k=7):
-    recs = [r for r in SeqIO.parse(fasta_path, "fasta")]
+    recs = load_fasta(fasta_path)
     if len(recs) < 2:
         raise ValueError("Need at least 2 sequences in the FASTA.")
-    a = str(recs[0].seq)[:k]
-    b = str(recs[1].seq)[:k]
+    a = recs.text(0)[:k]
+    b = recs.text(1)[:k]
     return a, b
 
 def main():
@@ -25,18 +34,18 @@ def main():
     A, B = take_two_short_subseqs(args.fasta, k=args.k)
 
     # Scor simplu: +1 match, -1 mismatch, -1 gap
-    global_alignments = pairwise2.align.globalms(A, B, 1, -1, -1, -1)
-    local_alignments = pairwise2.align.localms(A, B, 1, -1, -1, -1)
+    global_alignment, = align_pairs([(A, B)], mode="global", match=1, mismatch=-1, gap=-1)
+    local_alignment, = align_pairs([(A, B)], mode="local", match=1, mismatch=-1, gap=-1)
 
     print("[INPUT]")
     print("A:", A)
     print("B:", B)
 
     print("\n[GLOBAL] top alignment:")
-    print(pairwise2.format_alignment(*global_alignments[0]))
+    print(global_alignment.format())
 
-    print("[LOCAL] top alignment:")
-    print(pairwise2.format_alignment(*local_alignments[0]))
+    print("\n[LOCAL] top alignment:")
+    print(local_alignment.format())
 
 if __name__ == "__main__":
     main()
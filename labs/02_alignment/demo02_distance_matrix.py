@@ -7,21 +7,41 @@ Rulare:
 """
 import argparse
 from itertools import combinations
-from Bio import SeqIO
+from pathlib import Path
+import sys
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from seqtools.distance import hamming_matrix
+from seqtools.scoring import encode
+from seqtools.seqstore import load_fasta
 
 def hamming_equal(a, b):
-    return sum(x != y for x, y in zip(a, b))
+    return int(np.count_nonzero(encode(a) != encode(b)))
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--fasta", required=True)
     args = ap.parse_args()
 
-    recs = list(SeqIO.parse(args.fasta, "fasta"))
-    ids = [r.id for r in recs]
-    seqs = [str(r.seq) for r in recs]
+    recs = load_fasta(args.fasta)  # un buffer uint8; secvențele sunt view-uri (fără copii)
+    ids = recs.ids
+    seqs = list(recs)
 
     print("pair,hamming,p_distance,len_used")
+    if len({len(s) for s in seqs}) == 1:
+        # lungimi egale: toată matricea dintr-un singur kernel vectorizat
+        L = len(seqs[0])
+        H = hamming_matrix(seqs)
+        for (i, j) in combinations(range(len(seqs)), 2):
+            d_p = H[i, j] / float(L) if L > 0 else 0.0
+            print(f"{ids[i]}-{ids[j]},{H[i, j]},{d_p:.4f},{L}")
+        return
+
     for (i, j) in combinations(range(len(seqs)), 2):
         a, b = seqs[i], seqs[j]
         L = min(len(a), len(b))
@@ -13,11 +13,25 @@ TODO:
 
 Exemplu rulare:
   python labs/02_alignment/ex02_global_nw.py --fasta data/work/<handle>/lab01/my_tp53.fa --i1 0 --i2 1
+  python labs/02_alignment/ex02_global_nw.py --fasta data/sample/tp53_dna_multi.fasta --engine numpy
 """
 
 from pathlib import Path
 import argparse
-from Bio import SeqIO
+import sys
+import numpy as np
+
+# seqtools/ (rădăcina repo-ului) trebuie să fie importabil când rulăm din labs/*
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from seqtools.alignment import AlignmentResult, biopython_align
+from seqtools.cigar import DELETE, INSERT, MATCH, MISMATCH, concat, from_steps, swap
+from seqtools.faidx import IndexedFasta
+from seqtools.pairwise import get_aligner
+from seqtools.scoring import encode, pair_score, score_table
+from seqtools.traceback import traceback_linear
 
 
 # ===================== TODO: Scoring matrix init =========================================
@@ -62,60 +76,452 @@ def needleman_wunsch(seq1: str, seq2: str, match=1, mismatch=-1, gap=-2):
             # apelăm funcția pentru scor
             score[i][j] = score_cell_global(score, i, j, ai, bj, match, mismatch, gap)
 
-    # ================== Backtracking ==================
-    # pornim din colțul dreapta-jos (scor[m][n])
-    align1, align2 = "", ""
+    return backtrack_global(score, seq1, seq2, score_table(match, mismatch), gap)
+
+
+def backtrack_global(score, seq1: str, seq2: str, table: np.ndarray, gap: int):
+    """
+    Backtracking comun pentru ambele motoare (listă de liste sau np.ndarray).
+    `table` este tabelul de scoruri 256 x 256 (seqtools.scoring.score_table).
+    Drumul se obține ca listă de operații run-length (seqtools.traceback.traceback_linear).
+    Returnează un AlignmentResult (se despachetează ca (align1, align2, scor));
+    șirurile aliniate se construiesc doar dacă sunt cerute.
+    """
+    ops, _ = traceback_linear(score, seq1, seq2, table, gap)
+    return AlignmentResult.from_ops(ops, seq1, seq2, int(score[len(seq1)][len(seq2)]))
+
+
+# ===================== Motor NumPy (vectorizat pe rânduri) =====================
+
+# "Minus infinit" pentru int32, ales astfel încât NEG + penalizare să nu depășească intervalul.
+NEG_INF = np.int32(-(2**30))
+
+
+def fill_score_matrix_numpy(seq1: str, seq2: str, table: np.ndarray, gap: int) -> np.ndarray:
+    """
+    Umple matricea NW (m+1) x (n+1) ca np.ndarray int32, câte un rând per operație.
+    Pe rândul i:
+      - scorurile de substituție ale rândului sunt o singură indexare table[a_i][b];
+      - t[j] = max(diagonal, sus) se calculează pentru toate coloanele deodată;
+      - termenul "stânga" devine un prefix-max:
+            H[j] = max(t[j], H[j-1] + gap) = j*gap + max_{k<=j}(t[k] - k*gap)
+        adică np.maximum.accumulate pe (t - j*gap).
+    """
+    m, n = len(seq1), len(seq2)
+    a, b = encode(seq1), encode(seq2)
+
+    score = np.empty((m + 1, n + 1), dtype=np.int32)
+    col_gap = np.arange(n + 1, dtype=np.int32) * np.int32(gap)  # j * gap
+    score[0] = col_gap
+
+    t = np.empty(n + 1, dtype=np.int32)
+    for i in range(1, m + 1):
+        _next_row_global(score[i - 1], score[i], t, table[a[i - 1]], b, i, gap, col_gap)
+    return score
+
+
+def _next_row_global(prev, out, t, table_row, b, i, gap, col_gap):
+    """Calculează rândul i din rândul i-1 (scrie în `out`; `t` este buffer de lucru)."""
+    sub = table_row[b]
+    t[0] = i * gap
+    np.maximum(prev[:-1] + sub, prev[1:] + np.int32(gap), out=t[1:])
+    t -= col_gap
+    np.maximum.accumulate(t, out=out)
+    out += col_gap
+
+
+def last_row_global(seq1: str, seq2: str, table: np.ndarray, gap: int) -> np.ndarray:
+    """
+    Ultimul rând al matricei NW (scorurile lui seq1 complet vs. fiecare prefix din seq2),
+    calculat cu doar două rânduri în memorie: O(len(seq2)).
+    """
+    a, b = encode(seq1), encode(seq2)
+    col_gap = np.arange(len(seq2) + 1, dtype=np.int32) * np.int32(gap)
+
+    prev, cur = col_gap.copy(), np.empty_like(col_gap)
+    t = np.empty_like(col_gap)
+    for i in range(1, len(seq1) + 1):
+        _next_row_global(prev, cur, t, table[a[i - 1]], b, i, gap, col_gap)
+        prev, cur = cur, prev
+    return prev
+
+
+def needleman_wunsch_numpy(seq1: str, seq2: str, match=1, mismatch=-1, gap=-2, matrix=None):
+    """
+    Aceeași aliniere ca needleman_wunsch(), dar matricea este umplută vectorizat
+    (fill_score_matrix_numpy) și ținută compact ca int32.
+    `matrix` (ex. "BLOSUM62") înlocuiește perechea match/mismatch.
+    """
+    table = score_table(match, mismatch, matrix)
+    score = fill_score_matrix_numpy(seq1, seq2, table, gap)
+    return backtrack_global(score, seq1, seq2, table, gap)
+
+
+# ===================== Hirschberg (memorie liniară) =====================
+
+# Sub acest număr de celule subproblema se rezolvă direct cu matricea completă.
+HIRSCHBERG_BASE_CELLS = 1 << 16
+
+
+def needleman_wunsch_hirschberg(seq1: str, seq2: str, match=1, mismatch=-1, gap=-2, matrix=None):
+    """
+    Aliniere globală Hirschberg (divide et impera), cu memorie O(min(m, n)).
+    - se împarte seq1 la mijloc;
+    - last_row_global pe prima jumătate (înainte) și pe a doua (inversată) dă,
+      pentru fiecare coloană k, scorul celor două jumătăți;
+    - k = argmax(stânga + dreapta) este punctul prin care trece o aliniere optimă;
+    - se rezolvă recursiv cele două subprobleme.
+    Scorul este identic cu cel din needleman_wunsch(); la egalitate între alinieri
+    co-optimale, drumul ales poate diferi.
+    """
+    table = score_table(match, mismatch, matrix)
+    # rândurile se țin pe secvența mai scurtă; tabelul transpus păstrează scorurile perechilor
+    swapped = len(seq2) > len(seq1)
+    if swapped:
+        seq1, seq2 = seq2, seq1
+        table = table.T
+
+    parts = []
+    _hirschberg(seq1, seq2, table, gap, parts)
+    ops = concat(*parts)
+    sc = score_ops(ops, seq1, seq2, table, gap)
+
+    if swapped:
+        seq1, seq2, ops = seq2, seq1, swap(ops)
+    return AlignmentResult.from_ops(ops, seq1, seq2, sc)
+
+
+def _hirschberg(seq1: str, seq2: str, table, gap, parts: list):
+    m, n = len(seq1), len(seq2)
+    if m == 0 or n == 0:
+        parts.append([(INSERT, m), (DELETE, n)])
+        return
+    if m == 1 or (m + 1) * (n + 1) <= HIRSCHBERG_BASE_CELLS:
+        ops, _ = traceback_linear(fill_score_matrix_numpy(seq1, seq2, table, gap), seq1, seq2, table, gap)
+        parts.append(ops)
+        return
+
+    mid = m // 2
+    left = last_row_global(seq1[:mid], seq2, table, gap)
+    right = last_row_global(seq1[mid:][::-1], seq2[::-1], table, gap)[::-1]
+    k = int(np.argmax(left.astype(np.int64) + right))
+
+    _hirschberg(seq1[:mid], seq2[:k], table, gap, parts)
+    _hirschberg(seq1[mid:], seq2[k:], table, gap, parts)
+
+
+def score_ops(ops, seq1: str, seq2: str, table: np.ndarray, gap: int, start1: int = 0, start2: int = 0) -> int:
+    """Scorul (gap liniar) al unei alinieri date ca operații run-length, fără a construi șirurile."""
+    a, b = encode(seq1), encode(seq2)
+    i, j, sc = start1, start2, 0
+    for op, n in ops:
+        if op == INSERT:
+            sc += n * gap; i += n
+        elif op == DELETE:
+            sc += n * gap; j += n
+        else:
+            sc += int(table[a[i:i + n], b[j:j + n]].sum())
+            i += n; j += n
+    return sc
+
+
+# ===================== Bandă în jurul diagonalei =====================
+
+def fill_band_numpy(seq1: str, seq2: str, table: np.ndarray, gap: int, lo: int, hi: int) -> np.ndarray:
+    """
+    Umple doar celulele cu lo <= j - i <= hi, stocate ca matrice (m+1) x W, W = hi - lo + 1.
+    Celula (i, j) se află în coloana c = j - i - lo, deci pe rândul anterior
+    diagonala este tot în c, "sus" în c+1, iar "stânga" în c-1 pe rândul curent.
+    Celulele din afara benzii (sau din afara matricei) sunt NEG_INF.
+    """
+    m, n = len(seq1), len(seq2)
+    a, b = encode(seq1), encode(seq2)
+    gap = np.int32(gap)
+    width = hi - lo + 1
+    c_gap = np.arange(width, dtype=np.int32) * gap  # c * gap
+
+    band = np.full((m + 1, width), NEG_INF, dtype=np.int32)
+    j0 = lo + np.arange(width)
+    inside = (j0 >= 0) & (j0 <= n)
+    band[0, inside] = j0[inside] * gap
+
+    # seq2 bordată, ca reziduurile j-1 ale rândului i să fie o simplă felie
+    pad = width + m
+    b_pad = np.concatenate([np.zeros(pad, np.uint8), b, np.zeros(pad, np.uint8)])
+
+    t = np.empty(width, dtype=np.int32)
+    for i in range(1, m + 1):
+        prev, cur = band[i - 1], band[i]
+        c_min, c_max = max(0, -i - lo), min(width - 1, n - i - lo)  # 0 <= j <= n
+        start = pad + i + lo - 1
+        sub = table[a[i - 1]][b_pad[start:start + width]]
+        np.add(prev, sub, out=t)
+        np.maximum(t[:-1], prev[1:] + gap, out=t[:-1])
+        if c_min > 0 or lo == -i:
+            t[c_min] = i * gap  # coloana j = 0
+        t[:c_min] = NEG_INF
+        t[c_max + 1:] = NEG_INF
+        t -= c_gap
+        np.maximum.accumulate(t, out=cur)
+        cur += c_gap
+        cur[c_max + 1:] = NEG_INF
+    return band
+
+
+def band_exit_bound(m: int, n: int, best: int, gap: int, lo: int, hi: int):
+    """
+    Limită superioară pentru scorul oricărui drum global care iese din banda lo <= j - i <= hi
+    (None dacă banda acoperă toată matricea); `best` = cel mai mare scor de substituție posibil.
+    Un drum care atinge diagonala d pleacă de pe diagonala 0 și ajunge pe n - m, deci are
+    cel puțin g = |d| + |n - m - d| gap-uri și cel mult (m + n - g) / 2 perechi aliniate.
+    """
+    exits = []
+    if lo > -m:
+        exits.append(n - m - 2 * (lo - 1))  # diagonala lo - 1, sub bandă
+    if hi < n:
+        exits.append(2 * (hi + 1) - (n - m))  # diagonala hi + 1, deasupra benzii
+    if not exits:
+        return None
+    g = min(exits)
+    # fiecare pereche de gap-uri în plus înlocuiește o pereche aliniată: maximul e la g sau la "doar gap-uri"
+    return max(g * gap + (m + n - g) // 2 * best, (m + n) * gap)
+
+
+def needleman_wunsch_banded(seq1: str, seq2: str, match=1, mismatch=-1, gap=-2, band=32, widen=True, matrix=None,
+                            max_matrix_mb=None):
+    """
+    Aliniere globală restrânsă la ±band în jurul diagonalei (lărgită cu |m - n| ca să conțină colțul).
+    Timp și memorie O(band * max(m, n)).
+    Cu widen=False rezultatul este o euristică: cel mai bun drum din bandă, care poate fi sub optim
+    chiar dacă nu atinge marginea benzii. Cu widen=True, dacă scorul din bandă este sub limita
+    band_exit_bound a drumurilor care ies din ea, banda crește până la cea mai mică lățime a cărei
+    limită nu depășește scorul deja găsit și se umple încă o dată: alinierea e atunci dovedit optimă.
+    Dacă banda ar fi cât matricea completă, se umple matricea completă (NumPy); dacă ar depăși
+    `max_matrix_mb`, alinierea se face cu Hirschberg (tot optimă, memorie liniară).
+    """
+    m, n = len(seq1), len(seq2)
+    table = score_table(match, mismatch, matrix)
+    best = int(table[np.ix_(np.unique(encode(seq1)), np.unique(encode(seq2)))].max()) if m and n else 0
+
+    def limits(band):
+        return max(min(0, n - m) - band, -m), min(max(0, n - m) + band, n)
+
+    while True:
+        lo, hi = limits(band)
+        scores = fill_band_numpy(seq1, seq2, table, gap, lo, hi)
+        sc = int(scores[m, n - m - lo])
+        bound = band_exit_bound(m, n, best, gap, lo, hi)
+        if not widen or bound is None or sc >= bound:
+            ops = _backtrack_band(scores, seq1, seq2, table, gap, lo)
+            return AlignmentResult.from_ops(ops, seq1, seq2, sc)
+        while bound is not None and bound > sc:  # optimul >= sc, deci banda nouă îl conține sigur
+            band += 1
+            bound = band_exit_bound(m, n, best, gap, *limits(band))
+        cells = min((m + 1) * (abs(m - n) + 2 * band + 1), (m + 1) * (n + 1))
+        if max_matrix_mb is not None and cells * np.dtype(np.int32).itemsize > max_matrix_mb * 2**20:
+            return needleman_wunsch_hirschberg(seq1, seq2, match, mismatch, gap, matrix=matrix)
+        if cells == (m + 1) * (n + 1):
+            return needleman_wunsch_numpy(seq1, seq2, match, mismatch, gap, matrix=matrix)
+
+
+def _backtrack_band(scores, seq1: str, seq2: str, table, gap, lo: int):
+    """Backtracking în bandă, cu aceeași ordine de preferință ca backtrack_global."""
+    m, n = len(seq1), len(seq2)
+
+    def at(i, j):
+        c = j - i - lo
+        return int(scores[i, c]) if 0 <= c < scores.shape[1] else int(NEG_INF)
+
+    steps = []
     i, j = m, n
     while i > 0 and j > 0:
-        current = score[i][j]
-        # recalculăm scorurile vecinilor pentru a decide de unde am venit
-        diag = score[i - 1][j - 1] + (match if seq1[i - 1] == seq2[j - 1] else mismatch)
-        up   = score[i - 1][j] + gap
-        left = score[i][j - 1] + gap
-
-        if current == diag:  # am venit pe diagonală
-            align1 = seq1[i - 1] + align1
-            align2 = seq2[j - 1] + align2
+        current = at(i, j)
+        a, b = seq1[i - 1], seq2[j - 1]
+        if current == at(i - 1, j - 1) + pair_score(table, a, b):
+            steps.append(MATCH if a == b else MISMATCH)
+            i -= 1; j -= 1
+        elif current == at(i - 1, j) + gap:
+            steps.append(INSERT)
+            i -= 1
+        else:
+            steps.append(DELETE)
+            j -= 1
+    steps.extend(INSERT * i)
+    steps.extend(DELETE * j)
+    return from_steps(steps)
+
+
+# ===================== Gotoh (penalizări afine pentru gap) =====================
+
+def fill_affine_matrices(seq1: str, seq2: str, table: np.ndarray, gap_open: int, gap_extend: int):
+    """
+    Cele trei matrice Gotoh, int32, umplute câte un rând:
+      M[i][j] - aliniere care se termină cu seq1[i-1] / seq2[j-1]
+      X[i][j] - se termină cu gap în seq2 (sus)
+      Y[i][j] - se termină cu gap în seq1 (stânga)
+    Un gap de lungime L costă gap_open + (L-1) * gap_extend (ca în Align.PairwiseAligner).
+    M și X depind doar de rândul anterior; Y (pe același rând) se obține ca prefix-max:
+      Y[j] = max_{k<j}(max(M[k], X[k]) + gap_open + (j-1-k) * gap_extend)
+    """
+    m, n = len(seq1), len(seq2)
+    a, b = encode(seq1), encode(seq2)
+    go, ge = np.int32(gap_open), np.int32(gap_extend)
+    col_ext = np.arange(n + 1, dtype=np.int32) * ge  # k * gap_extend
+
+    M = np.full((m + 1, n + 1), NEG_INF, dtype=np.int32)
+    X = np.full((m + 1, n + 1), NEG_INF, dtype=np.int32)
+    Y = np.full((m + 1, n + 1), NEG_INF, dtype=np.int32)
+    M[0, 0] = 0
+    Y[0, 1:] = go + col_ext[:-1]
+
+    w = np.empty(n + 1, dtype=np.int32)
+    for i in range(1, m + 1):
+        sub = table[a[i - 1]][b]
+        best_prev = np.maximum(np.maximum(M[i - 1], X[i - 1]), Y[i - 1])
+        M[i, 1:] = best_prev[:-1] + sub
+        np.maximum(np.maximum(M[i - 1], Y[i - 1]) + go, X[i - 1] + ge, out=X[i])
+        np.maximum(M[i], X[i], out=w)
+        w += go
+        w -= col_ext
+        np.maximum.accumulate(w[:-1], out=Y[i, 1:])
+        Y[i, 1:] += col_ext[:-1]
+    return M, X, Y
+
+
+def needleman_wunsch_affine(seq1: str, seq2: str, match=1, mismatch=-1, gap_open=-5, gap_extend=-1, matrix=None):
+    """
+    Aliniere globală cu penalizări afine (Gotoh), vectorizată pe rânduri.
+    Backtracking-ul urmărește starea (M/X/Y); la egalitate preferăm M, apoi X, apoi Y.
+    """
+    table = score_table(match, mismatch, matrix)
+    M, X, Y = fill_affine_matrices(seq1, seq2, table, gap_open, gap_extend)
+    mats = (M, X, Y)
+    i, j = len(seq1), len(seq2)
+    ends = [int(M[i, j]), int(X[i, j]), int(Y[i, j])]
+    sc = max(ends)
+    state = ends.index(sc)
+
+    steps = []
+    while i > 0 or j > 0:
+        cur = int(mats[state][i, j])
+        if state == 0:
+            a, b = seq1[i - 1], seq2[j - 1]
+            prev = cur - pair_score(table, a, b)
+            steps.append(MATCH if a == b else MISMATCH)
             i -= 1; j -= 1
-        elif current == up:  # am venit de sus
-            align1 = seq1[i - 1] + align1
-            align2 = "-" + align2
+            state = [int(M[i, j]), int(X[i, j]), int(Y[i, j])].index(prev)
+        elif state == 1:
+            steps.append(INSERT)
             i -= 1
-        else:                # am venit de la stânga
-            align1 = "-" + align1
-            align2 = seq2[j - 1] + align2
+            if cur == M[i, j] + gap_open:
+                state = 0
+            elif cur != X[i, j] + gap_extend:
+                state = 2
+        else:
+            steps.append(DELETE)
             j -= 1
+            if cur == M[i, j] + gap_open:
+                state = 0
+            elif cur == Y[i, j] + gap_extend:
+                state = 2
+            else:
+                state = 1
+
+    return AlignmentResult.from_ops(from_steps(steps), seq1, seq2, sc)
+
 
-    # dacă am ajuns la margine, completăm cu gap-uri
-    while i > 0:
-        align1 = seq1[i - 1] + align1
-        align2 = "-" + align2
-        i -= 1
-    while j > 0:
-        align1 = "-" + align1
-        align2 = seq2[j - 1] + align2
-        j -= 1
+def biopython_score(seq1: str, seq2: str, match=1, mismatch=-1, gap=-2, gap_open=None, gap_extend=None,
+                    matrix=None) -> float:
+    """Scorul optim calculat de Align.PairwiseAligner, pentru verificarea motoarelor proprii."""
+    return get_aligner("global", match, mismatch, gap, gap_open, gap_extend, matrix).score(seq1, seq2)
 
-    return align1, align2, score[m][n]
 
+def biopython_alignment(seq1: str, seq2: str, match=1, mismatch=-1, gap=-2, gap_open=None, gap_extend=None,
+                        matrix=None) -> AlignmentResult:
+    """Prima aliniere optimă din Align.PairwiseAligner, ca AlignmentResult (același tip ca motoarele proprii)."""
+    aligner = get_aligner("global", match, mismatch, gap, gap_open, gap_extend, matrix)
+    return biopython_align(seq1, seq2, aligner=aligner)
 
-def load_two_sequences(fasta_path: Path, i1: int, i2: int):
+
+ENGINES = {
+    "python": needleman_wunsch,
+    "numpy": needleman_wunsch_numpy,
+    "hirschberg": needleman_wunsch_hirschberg,
+    "banded": needleman_wunsch_banded,
+}
+
+# Bugetul implicit pentru matricea completă; peste el se trece automat pe Hirschberg.
+DEFAULT_MAX_MATRIX_MB = 1024
+
+
+def estimate_matrix_bytes(m: int, n: int) -> int:
+    """Dimensiunea estimată a matricei (m+1) x (n+1) de scoruri int32."""
+    return (m + 1) * (n + 1) * np.dtype(np.int32).itemsize
+
+
+def align_global(seq1: str, seq2: str, match=1, mismatch=-1, gap=-2,
+                 engine: str = "python", max_matrix_mb: float = DEFAULT_MAX_MATRIX_MB,
+                 band: int = 32, widen: bool = True, matrix=None):
     """
-    Încărcăm FASTA și alegem două secvențe după index.
+    Alege motorul de aliniere: dacă matricea completă (sau banda, pentru engine="banded")
+    ar depăși `max_matrix_mb`, se folosește Hirschberg (memorie liniară), indiferent de `engine`.
+    `matrix` (ex. "BLOSUM62") este suportat doar de motoarele NumPy.
+    engine="banded" cu widen=False întoarce o euristică (vezi needleman_wunsch_banded); cu widen=True
+    scorul este dovedit optim.
+    Toate motoarele întorc un AlignmentResult (seqtools.alignment): identitate, p-distance,
+    gap-uri fără a construi șirurile; se despachetează în continuare ca (align1, align2, scor).
     """
-    recs = list(SeqIO.parse(str(fasta_path), "fasta"))
-    if len(recs) < 2:
-        raise SystemExit("[eroare] Fișierul trebuie să conțină cel puțin 2 secvențe.")
-    if not (0 <= i1 < len(recs) and 0 <= i2 < len(recs)):
-        raise SystemExit(f"[eroare] Indici invalizi (0..{len(recs)-1}).")
-    return str(recs[i1].seq), str(recs[i2].seq), recs[i1].id, recs[i2].id
+    m, n = len(seq1), len(seq2)
+    if matrix and engine == "python":
+        raise ValueError("Matricea de substituție necesită un motor NumPy (numpy/hirschberg/banded)")
+    if engine == "banded":
+        cells = (m + 1) * (abs(m - n) + 2 * band + 1)
+        if cells * np.dtype(np.int32).itemsize <= max_matrix_mb * 2**20:
+            return needleman_wunsch_banded(seq1, seq2, match, mismatch, gap, band=band, widen=widen, matrix=matrix,
+                                           max_matrix_mb=max_matrix_mb)
+        engine = "numpy"
+    if engine != "hirschberg" and estimate_matrix_bytes(m, n) > max_matrix_mb * 2**20:
+        print(f"[info] Matricea ar depăși {max_matrix_mb} MB -> folosesc Hirschberg", file=sys.stderr)
+        engine = "hirschberg"
+    if engine == "python":
+        return needleman_wunsch(seq1, seq2, match, mismatch, gap)
+    return ENGINES[engine](seq1, seq2, match, mismatch, gap, matrix=matrix)
+
+
+def load_two_sequences(fasta_path: Path, i1, i2):
+    """
+    Alegem două secvențe după index sau ID, fără să citim tot FASTA-ul:
+    indexul .fai (seqtools.faidx, construit la prima rulare) dă poziția exactă a octeților,
+    iar fișierul e mapat în memorie (mmap; merge și pe .gz / BGZF).
+    """
+    with IndexedFasta(fasta_path) as recs:
+        if len(recs) < 2:
+            raise SystemExit("[eroare] Fișierul trebuie să conțină cel puțin 2 secvențe.")
+        try:
+            k1, k2 = recs.index.position(i1), recs.index.position(i2)
+        except (KeyError, IndexError):
+            raise SystemExit(f"[eroare] Indici / ID-uri invalide (0..{len(recs)-1} sau un ID din fișier).") from None
+        return recs.text(k1), recs.text(k2), recs.ids[k1], recs.ids[k2]
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--fasta", required=True, help="Cale către FASTA-ul propriu din data/work/<handle>/lab01/")
-    ap.add_argument("--i1", type=int, default=0, help="Index prima secvență (implicit 0)")
-    ap.add_argument("--i2", type=int, default=1, help="Index a doua secvență (implicit 1)")
+    ap.add_argument("--i1", default="0", help="Index sau ID prima secvență (implicit 0)")
+    ap.add_argument("--i2", default="1", help="Index sau ID a doua secvență (implicit 1)")
+    ap.add_argument("--engine", choices=sorted(ENGINES), default="python",
+                    help="Motorul de aliniere: python (celulă cu celulă), numpy (vectorizat) "
+                         "hirschberg (memorie liniară) sau banded (doar ±band în jurul diagonalei)")
+    ap.add_argument("--band", type=int, default=32, help="Lățimea benzii pentru --engine banded (implicit 32)")
+    ap.add_argument("--no_widen", action="store_true",
+                    help="Nu lărgi banda: scorul din bandă e o euristică și poate fi sub optim")
+    ap.add_argument("--max_matrix_mb", type=float, default=DEFAULT_MAX_MATRIX_MB,
+                    help="Buget de memorie pentru matricea completă; peste el se folosește Hirschberg")
+    ap.add_argument("--matrix", help="Matrice de substituție Biopython, ex. BLOSUM62 sau PAM250 (motoarele NumPy)")
+    ap.add_argument("--gap_open", type=int, help="Penalizare deschidere gap (activează modelul afin Gotoh)")
+    ap.add_argument("--gap_extend", type=int, default=-1, help="Penalizare extindere gap (implicit -1)")
+    ap.add_argument("--check_biopython", action="store_true",
+                    help="Compară scorul cu Align.PairwiseAligner")
     args = ap.parse_args()
 
     fasta_path = Path(args.fasta)
@@ -123,13 +529,32 @@ def main():
         raise SystemExit(f"[eroare] Nu găsesc fișierul: {fasta_path}")
 
     s1, s2, id1, id2 = load_two_sequences(fasta_path, args.i1, args.i2)
-    a1, a2, sc = needleman_wunsch(s1, s2)
+    if args.gap_open is not None:
+        if 3 * estimate_matrix_bytes(len(s1), len(s2)) > args.max_matrix_mb * 2**20:
+            raise SystemExit(f"[eroare] Cele 3 matrice Gotoh depășesc {args.max_matrix_mb} MB (--max_matrix_mb).")
+        res = needleman_wunsch_affine(s1, s2, gap_open=args.gap_open, gap_extend=args.gap_extend,
+                                      matrix=args.matrix)
+    else:
+        if args.matrix and args.engine == "python":
+            raise SystemExit("[eroare] --matrix necesită --engine numpy, hirschberg sau banded.")
+        res = align_global(s1, s2, engine=args.engine, max_matrix_mb=args.max_matrix_mb,
+                           band=args.band, widen=not args.no_widen, matrix=args.matrix)
+    a1, a2, sc = res
 
     print("=== Aliniere globală (NW) ===")
     print(f"{id1}  vs  {id2}")
     print(a1)
     print(a2)
     print("Score:", sc)
+    print(f"Identitate {res.identity:.2%}, p-distance {res.p_distance:.4f}, "
+          f"gap-uri {res.gaps} ({res.gap_opens} deschideri)")
+
+    if args.check_biopython:
+        if args.gap_open is not None:
+            ref = biopython_score(s1, s2, gap_open=args.gap_open, gap_extend=args.gap_extend, matrix=args.matrix)
+        else:
+            ref = biopython_score(s1, s2, matrix=args.matrix)
+        print(f"PairwiseAligner: {ref:g} ({'OK' if ref == sc else 'DIFERIT'})")
 
 
 if __name__ == "__main__":
@@ -13,11 +13,31 @@ TODO:
 
 Exemplu Rulare:
   python labs/02_alignment/ex03_local_sw.py --fasta data/work/<handle>/lab01/my_tp53.fa --i1 0 --i2 1
+  python labs/02_alignment/ex03_local_sw.py --fasta data/sample/tp53_dna_multi.fasta --mode score
+  python labs/02_alignment/ex03_local_sw.py --fasta data/sample/tp53_dna_multi.fasta --mode topk --top 5
+  python labs/02_alignment/ex03_local_sw.py --fasta data/sample/tp53_protein_multi.fasta --matrix BLOSUM62 \
+      --gap_open -11 --gap_extend -1 --scan --replicate 10000 --benchmark
 """
 
 from pathlib import Path
 import argparse
-from Bio import SeqIO
+import heapq
+import sys
+import time
+import numpy as np
+
+# seqtools/ (rădăcina repo-ului) trebuie să fie importabil când rulăm din labs/*
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from seqtools.alignment import AlignmentResult, biopython_align
+from seqtools.cigar import DELETE, INSERT, MATCH, MISMATCH, from_steps
+from seqtools.faidx import IndexedFasta
+from seqtools.pairwise import get_aligner
+from seqtools.scoring import decode, encode, pair_score, score_table
+from seqtools.seqstore import load_fasta
+from seqtools.traceback import traceback_linear
 
 
 # ===================== Matrix initiation =========================================
@@ -42,7 +62,6 @@ def score_cell_local(score, i: int, j: int, a: str, b: str, match: int, mismatch
     raise NotImplementedError("TODO 2: implementați scorarea pentru SW")
 
 
-
 def smith_waterman(seq1: str, seq2: str, match=3, mismatch=-3, gap=-2):
     # Implementare simplificată Smith–Waterman.
     m, n = len(seq1), len(seq2)
@@ -66,62 +85,622 @@ def smith_waterman(seq1: str, seq2: str, match=3, mismatch=-3, gap=-2):
                 max_pos = (i, j)
 
     # ================== Backtracking ==================
-    # pornim din celula cu scor maxim și mergem înapoi
-    align1, align2 = "", ""
+    # pornim din celula cu scor maxim și mergem înapoi (până la primul scor 0);
+    # drumul vine ca operații run-length, șirurile se construiesc o singură dată la final
+    ops, start = traceback_linear(score, seq1, seq2, score_table(match, mismatch), gap, *max_pos, local=True)
+    return AlignmentResult.from_ops(ops, seq1, seq2, max_score, start)
+
+
+# ===================== Moduri NumPy: doar scor / pointeri de 2 biți =====================
+
+# Direcțiile din matricea de traceback (2 biți per celulă).
+STOP, DIAG, UP, LEFT = 0, 1, 2, 3
+
+
+def _next_row_local(prev, out, t, table_row, b, gap, col_gap):
+    """
+    Rândul i din rândul i-1, vectorizat:
+      scorurile de substituție sunt o singură indexare table[a_i][b];
+      t[j] = max(0, diagonal, sus), apoi "stânga" ca prefix-max:
+      H[j] = max(t[j], H[j-1] + gap) = j*gap + max_{k<=j}(t[k] - k*gap).
+    Returnează vectorul de substituție (reutilizat pentru direcții).
+    """
+    sub = table_row[b]
+    t[0] = 0
+    np.maximum(prev[:-1] + sub, prev[1:] + np.int32(gap), out=t[1:])
+    np.maximum(t, 0, out=t)
+    t -= col_gap
+    np.maximum.accumulate(t, out=out)
+    out += col_gap
+    return sub
+
+
+def smith_waterman_score(seq1: str, seq2: str, match=3, mismatch=-3, gap=-2, matrix=None):
+    """
+    Doar scorul maxim și poziția lui (i, j), cu două rânduri în memorie.
+    Poziția este aceeași ca în smith_waterman() (primul maxim, parcurgând pe rânduri).
+    `matrix` (ex. "BLOSUM62") înlocuiește perechea match/mismatch.
+    """
+    a, b = encode(seq1), encode(seq2)
+    table = score_table(match, mismatch, matrix)
+    col_gap = np.arange(len(seq2) + 1, dtype=np.int32) * np.int32(gap)
+
+    prev = np.zeros(len(seq2) + 1, dtype=np.int32)
+    cur, t = np.empty_like(prev), np.empty_like(prev)
+    max_score, max_pos = 0, (0, 0)
+    for i in range(1, len(seq1) + 1):
+        _next_row_local(prev, cur, t, table[a[i - 1]], b, gap, col_gap)
+        j = int(np.argmax(cur))
+        if cur[j] > max_score:
+            max_score, max_pos = int(cur[j]), (i, j)
+        prev, cur = cur, prev
+    return max_score, max_pos
+
+
+def pack_directions(d: np.ndarray) -> np.ndarray:
+    """Împachetează direcțiile (valori 0..3) câte 4 pe byte."""
+    pad = (-len(d)) % 4
+    if pad:
+        d = np.concatenate([d, np.zeros(pad, dtype=np.uint8)])
+    d = d.reshape(-1, 4)
+    return d[:, 0] | (d[:, 1] << 2) | (d[:, 2] << 4) | (d[:, 3] << 6)
+
+
+def smith_waterman_traceback(seq1: str, seq2: str, match=3, mismatch=-3, gap=-2, matrix=None):
+    """
+    Aceeași aliniere ca smith_waterman(), dar în loc de scoruri se păstrează doar
+    direcția fiecărei celule (STOP/DIAG/UP/LEFT), 2 biți per celulă, împachetată în uint8.
+    Ordinea de preferință la egalitate este cea din backtracking-ul clasic: diag, sus, stânga.
+    """
+    m, n = len(seq1), len(seq2)
+    a, b = encode(seq1), encode(seq2)
+    table = score_table(match, mismatch, matrix)
+    col_gap = np.arange(n + 1, dtype=np.int32) * np.int32(gap)
+
+    ptr = np.zeros((m + 1, (n + 4) // 4), dtype=np.uint8)
+    prev = np.zeros(n + 1, dtype=np.int32)
+    cur, t = np.empty_like(prev), np.empty_like(prev)
+    d = np.empty(n + 1, dtype=np.uint8)
+    max_score, max_pos = 0, (0, 0)
+    for i in range(1, m + 1):
+        sub = _next_row_local(prev, cur, t, table[a[i - 1]], b, gap, col_gap)
+        h = cur[1:]
+        d[0] = STOP
+        d[1:] = np.where(h == 0, STOP,
+                         np.where(h == prev[:-1] + sub, DIAG,
+                                  np.where(h == prev[1:] + np.int32(gap), UP, LEFT)))
+        ptr[i] = pack_directions(d)
+
+        j = int(np.argmax(cur))
+        if cur[j] > max_score:
+            max_score, max_pos = int(cur[j]), (i, j)
+        prev, cur = cur, prev
+
+    steps = []
     i, j = max_pos
-    while i > 0 and j > 0 and score[i][j] > 0:
-        # recalculăm scorurile vecinilor pentru a decide direcția
-        diag = score[i - 1][j - 1] + (match if seq1[i - 1] == seq2[j - 1] else mismatch)
-        up   = score[i - 1][j] + gap
-        left = score[i][j - 1] + gap
-
-        if score[i][j] == diag:
-            align1 = seq1[i - 1] + align1
-            align2 = seq2[j - 1] + align2
+    while True:
+        step = (int(ptr[i, j >> 2]) >> ((j & 3) * 2)) & 3
+        if step == STOP:
+            break
+        if step == DIAG:
+            steps.append(MATCH if seq1[i - 1] == seq2[j - 1] else MISMATCH)
+            i -= 1; j -= 1
+        elif step == UP:
+            steps.append(INSERT)
+            i -= 1
+        else:
+            steps.append(DELETE)
+            j -= 1
+
+    return AlignmentResult.from_ops(from_steps(steps), seq1, seq2, max_score, (i, j))
+
+
+# ===================== Gotoh local (penalizări afine pentru gap) =====================
+
+# "Minus infinit" pentru int32, ales astfel încât NEG + penalizare să nu depășească intervalul.
+NEG_INF = np.int32(-(2**30))
+
+
+def fill_affine_matrices_local(seq1: str, seq2: str, table: np.ndarray, gap_open: int, gap_extend: int):
+    """
+    Cele trei matrice Gotoh pentru aliniere locală, int32, umplute câte un rând:
+      M[i][j] = max(0, M, X, Y de pe (i-1, j-1)) + s(a, b)   (0 = începe o aliniere nouă)
+      X[i][j] - gap în seq2 (sus), Y[i][j] - gap în seq1 (stânga)
+    Un gap de lungime L costă gap_open + (L-1) * gap_extend (ca în Align.PairwiseAligner).
+    Y (pe același rând) se obține ca prefix-max:
+      Y[j] = max_{k<j}(max(M[k], X[k]) + gap_open + (j-1-k) * gap_extend)
+    """
+    m, n = len(seq1), len(seq2)
+    a, b = encode(seq1), encode(seq2)
+    go, ge = np.int32(gap_open), np.int32(gap_extend)
+    col_ext = np.arange(n + 1, dtype=np.int32) * ge  # k * gap_extend
+
+    M = np.full((m + 1, n + 1), NEG_INF, dtype=np.int32)
+    X = np.full((m + 1, n + 1), NEG_INF, dtype=np.int32)
+    Y = np.full((m + 1, n + 1), NEG_INF, dtype=np.int32)
+
+    w = np.empty(n + 1, dtype=np.int32)
+    for i in range(1, m + 1):
+        sub = table[a[i - 1]][b]
+        best_prev = np.maximum(np.maximum(M[i - 1], X[i - 1]), Y[i - 1])
+        np.maximum(best_prev[:-1], 0, out=M[i, 1:])
+        M[i, 1:] += sub
+        np.maximum(np.maximum(M[i - 1], Y[i - 1]) + go, X[i - 1] + ge, out=X[i])
+        np.maximum(M[i], X[i], out=w)
+        w += go
+        w -= col_ext
+        np.maximum.accumulate(w[:-1], out=Y[i, 1:])
+        Y[i, 1:] += col_ext[:-1]
+    return M, X, Y
+
+
+def affine_local_score(seq1: str, seq2: str, table: np.ndarray, gap_open: int, gap_extend: int) -> int:
+    """Doar scorul local afin (maximul din M, minim 0), fără backtracking."""
+    M, _, _ = fill_affine_matrices_local(seq1, seq2, table, gap_open, gap_extend)
+    return max(int(M.max()), 0)
+
+
+def smith_waterman_affine(seq1: str, seq2: str, match=3, mismatch=-3, gap_open=-5, gap_extend=-2, matrix=None):
+    """
+    Aliniere locală cu penalizări afine (Gotoh), vectorizată pe rânduri.
+    Alinierea optimă se termină într-o celulă M (primul maxim, parcurgând pe rânduri);
+    backtracking-ul se oprește când scorul anterior din M este 0.
+    """
+    table = score_table(match, mismatch, matrix)
+    M, X, Y = fill_affine_matrices_local(seq1, seq2, table, gap_open, gap_extend)
+    flat = int(np.argmax(M))
+    i, j = divmod(flat, M.shape[1])
+    max_score = max(int(M[i, j]), 0)
+    if max_score == 0:
+        return AlignmentResult.from_ops([], seq1, seq2, 0)
+
+    mats = (M, X, Y)
+    state = 0
+    steps = []
+    while True:
+        cur = int(mats[state][i, j])
+        if state == 0:
+            a, b = seq1[i - 1], seq2[j - 1]
+            prev = cur - pair_score(table, a, b)
+            steps.append(MATCH if a == b else MISMATCH)
             i -= 1; j -= 1
-        elif score[i][j] == up:
-            align1 = seq1[i - 1] + align1
-            align2 = "-" + align2
+            if prev == 0:
+                break
+            state = [int(M[i, j]), int(X[i, j]), int(Y[i, j])].index(prev)
+        elif state == 1:
+            steps.append(INSERT)
             i -= 1
-        else:  # stânga
-            align1 = "-" + align1
-            align2 = seq2[j - 1] + align2
+            if cur == M[i, j] + gap_open:
+                state = 0
+            elif cur != X[i, j] + gap_extend:
+                state = 2
+        else:
+            steps.append(DELETE)
             j -= 1
+            if cur == M[i, j] + gap_open:
+                state = 0
+            elif cur == Y[i, j] + gap_extend:
+                state = 2
+            else:
+                state = 1
+
+    return AlignmentResult.from_ops(from_steps(steps), seq1, seq2, max_score, (i, j))
 
-    return align1, align2, max_score
 
+def biopython_score(seq1: str, seq2: str, match=3, mismatch=-3, gap=-2, gap_open=None, gap_extend=None,
+                    matrix=None) -> float:
+    """Scorul optim local calculat de Align.PairwiseAligner, pentru verificarea motoarelor proprii."""
+    return get_aligner("local", match, mismatch, gap, gap_open, gap_extend, matrix).score(seq1, seq2)
 
-def load_two_sequences(fasta_path: Path, i1: int, i2: int):
+
+def biopython_alignment(seq1: str, seq2: str, match=3, mismatch=-3, gap=-2, gap_open=None, gap_extend=None,
+                        matrix=None) -> AlignmentResult:
+    """Prima aliniere optimă din Align.PairwiseAligner, ca AlignmentResult (același tip ca motoarele proprii)."""
+    return biopython_align(seq1, seq2, aligner=get_aligner("local", match, mismatch, gap, gap_open, gap_extend, matrix))
+
+
+# ===================== Waterman–Eggert: top-K alinieri locale =====================
+
+# Decalaj per segment pentru cummax-ul segmentat (mai mare decât orice |scor| + |j * gap|).
+_SEGMENT_OFFSET = np.int64(1) << 40
+
+
+def _recompute_row_local(H, used, i, c0, table_row, b, gap):
     """
-    Încărcăm FASTA și alegem două secvențe după index.
+    Recalculează H[i, c0:] (c0 >= 1) cu celulele din `used` forțate la 0, pornind de la
+    H[i - 1] și de la H[i, c0 - 1] (neschimbat). Termenul "stânga" este un cummax
+    segmentat: fiecare celulă blocată începe un segment nou, deci nu propagă scor
+    spre dreapta. Întoarce prima coloană care s-a schimbat (sau None).
     """
-    recs = list(SeqIO.parse(str(fasta_path), "fasta"))
-    if len(recs) < 2:
-        raise SystemExit("[eroare] Fișierul trebuie să conțină cel puțin 2 secvențe.")
-    if not (0 <= i1 < len(recs) and 0 <= i2 < len(recs)):
-        raise SystemExit(f"[eroare] Indici invalizi (0..{len(recs)-1}).")
-    return str(recs[i1].seq), str(recs[i2].seq), recs[i1].id, recs[i2].id
+    prev = H[i - 1]
+    t = np.empty(H.shape[1] - c0 + 1, dtype=np.int64)
+    t[0] = H[i, c0 - 1]
+    np.maximum(prev[c0 - 1:-1] + table_row[b[c0 - 1:]], prev[c0:] + gap, out=t[1:])
+    np.maximum(t[1:], 0, out=t[1:])
+    blocked = np.zeros(len(t), dtype=bool)
+    blocked[1:] = used[i, c0:]
+    t[blocked] = 0
+
+    k = np.arange(len(t), dtype=np.int64) * gap
+    seg = np.cumsum(blocked) * _SEGMENT_OFFSET
+    u = t - k + seg
+    np.maximum.accumulate(u, out=u)
+    new = (u - seg + k)[1:]
+
+    changed = np.flatnonzero(new != H[i, c0:])
+    H[i, c0:] = new
+    return c0 + int(changed[0]) if changed.size else None
+
+
+def _path_cells(ops, start):
+    """Celulele (i, j) ale matricei prin care trece alinierea (fără celula de start, cu scor 0)."""
+    i, j = start
+    cells = []
+    for op, n in ops:
+        for _ in range(n):
+            if op == INSERT:
+                i += 1
+            elif op == DELETE:
+                j += 1
+            else:
+                i += 1; j += 1
+            cells.append((i, j))
+    return cells
+
+
+def smith_waterman_top(seq1: str, seq2: str, k=5, match=3, mismatch=-3, gap=-2, matrix=None, min_score=1):
+    """
+    Primele `k` alinieri locale care nu se intersectează (Waterman–Eggert), în ordinea scorului.
+
+    - matricea SW se umple o singură dată (vectorizat pe rânduri);
+    - un heap ține maximul fiecărui rând; intrările învechite se recunosc după versiunea rândului;
+    - după fiecare aliniere, celulele drumului ei sunt blocate (scor 0) și se recalculează doar
+      zona afectată: de la primul rând al drumului în jos și de la prima coloană schimbată
+      spre dreapta, oprindu-ne la primul rând (sub drum) care nu se mai schimbă.
+    Prima aliniere este identică cu cea din smith_waterman_traceback().
+    """
+    if gap >= 0:
+        raise ValueError("gap trebuie să fie negativ")
+    m, n = len(seq1), len(seq2)
+    a, b = encode(seq1), encode(seq2)
+    table = score_table(match, mismatch, matrix)
+    H = np.zeros((m + 1, n + 1), dtype=np.int32)
+    used = np.zeros((m + 1, n + 1), dtype=bool)
+    version = [0] * (m + 1)
+    heap = []
+
+    def push_row(i):
+        version[i] += 1
+        j = int(np.argmax(H[i]))
+        if H[i, j] >= min_score:
+            heapq.heappush(heap, (-int(H[i, j]), i, j, version[i]))
+
+    if n:
+        for i in range(1, m + 1):
+            _recompute_row_local(H, used, i, 1, table[a[i - 1]], b, gap)
+            push_row(i)
+
+    hits = []
+    while heap and len(hits) < k:
+        neg, i, j, ver = heapq.heappop(heap)
+        if ver != version[i]:
+            continue  # rândul a fost recalculat după ce intrarea a fost pusă în heap
+        ops, start = traceback_linear(H, seq1, seq2, table, gap, i, j, local=True)
+        hits.append(AlignmentResult.from_ops(ops, seq1, seq2, -neg, start))
+
+        cells = _path_cells(ops, start)
+        first_col = {}
+        for ci, cj in cells:
+            used[ci, cj] = True
+            first_col[ci] = min(cj, first_col.get(ci, cj))
+
+        # recalcul doar în aval de drum (dreapta / jos)
+        carry = None  # prima coloană schimbată pe rândul anterior
+        for r in range(min(first_col), m + 1):
+            cols = [c for c in (first_col.get(r), carry) if c is not None]
+            if not cols:
+                break
+            carry = _recompute_row_local(H, used, r, max(min(cols), 1), table[a[r - 1]], b, gap)
+            push_row(r)
+    return hits
+
+
+# ===================== Scanare cu profil striped (Farrar), int16 =====================
+
+# Codul de completare pentru subiectele mai scurte dintr-un lot (în afara celor 256 de byte-uri).
+PAD_CODE = 256
+PAD_SCORE = -(2**14)
+INT16_MAX = np.iinfo(np.int16).max
+# Fiecare coloană costă câteva zeci de operații NumPy pe tot lotul, deci lotul trebuie să le amortizeze:
+# sub STRIPED_MIN_CELLS (lot × lungimea interogării) e mai rapid pereche cu pereche, iar peste
+# ~STRIPED_BATCH_CELLS vectorii unei coloane ies din cache (măsurat pe tp53: ADN 2.5 kb, proteine ~400 aa).
+STRIPED_MIN_CELLS = 8192
+STRIPED_BATCH_CELLS = 1 << 17
+# Penalizarea maximă acumulată pe o bandă (seg_len × gap_extend), ca prefix-max-ul din F să rămână în int16
+STRIPED_MAX_RAMP = 8192
+
+
+def build_striped_profile(query: str, table: np.ndarray, lanes: int) -> np.ndarray:
+    """
+    Profilul interogării în aranjamentul striped al lui Farrar, calculat o singură dată:
+      profile[s, c, l] = table[c][query[s + l * seg_len]]   (int16)
+    unde seg_len = ceil(len(query) / lanes). Pozițiile de completare primesc PAD_SCORE,
+    la fel ca rezidul de completare PAD_CODE al subiectelor.
+    """
+    q = encode(query)
+    seg_len = max(1, -(-len(q) // lanes))
+    idx = np.arange(seg_len)[:, None] + np.arange(lanes)[None, :] * seg_len  # (seg_len, lanes)
+    valid = idx < len(q)
+
+    profile = np.full((seg_len, PAD_CODE + 1, lanes), PAD_SCORE, dtype=np.int16)
+    cols = table[:, q[np.where(valid, idx, 0)]].astype(np.int16)  # (256, seg_len, lanes)
+    profile[:, :PAD_CODE, :] = np.where(valid[None], cols, PAD_SCORE).transpose(1, 0, 2)
+    return profile
+
+
+def _shift_lanes(v: np.ndarray) -> np.ndarray:
+    """Deplasare cu o bandă (lane) spre dreapta, cu 0 pe prima bandă (LSHIFT din Farrar)."""
+    out = np.zeros_like(v)
+    out[..., 1:] = v[..., :-1]
+    return out
+
+
+def _striped_batch(profile: np.ndarray, codes: np.ndarray, gap_open: int, gap_extend: int) -> np.ndarray:
+    """
+    Smith–Waterman striped (Farrar 2007) pentru un lot de subiecte deodată.
+    Banda l ține pozițiile l * seg_len .. (l + 1) * seg_len - 1 ale interogării, deci vectorii
+    (segmente, lot, benzi) acoperă toată coloana: diagonala vine din segmentul anterior
+    (din ultimul segment al benzii anterioare pentru s = 0), iar fiecare operație NumPy
+    procesează coloana întreagă pentru tot lotul, fără buclă Python pe segmente.
+    F în interiorul unei benzi este un prefix-max pe segmente; corecția F peste granița
+    dintre benzi (lazy F la Farrar) se face apoi o singură dată, ca scanare pe benzi, exactă
+    pentru gap_open <= gap_extend. E/F sunt saturate la 0, ca în varianta fără semn.
+    Returnează scorul maxim pentru fiecare subiect (int16).
+    """
+    seg_len, _, lanes = profile.shape
+    batch = codes.shape[0]
+    go, ge = np.int16(-gap_open), np.int16(-gap_extend)
+    zero = np.int16(0)
+    # rest[s] = (seg_len - 1 - s) * ge: t = h - go - rest nu scade sub -(go + seg_len * ge)
+    rest = (np.arange(seg_len - 1, -1, -1, dtype=np.int16) * ge)[:, None, None]
+    ramp = (np.arange(seg_len, dtype=np.int16) * ge)[:, None]  # s * ge, pentru F venit din banda anterioară
+
+    h_prev = np.zeros((seg_len, batch, lanes), dtype=np.int16)
+    h = np.empty_like(h_prev)
+    e = np.zeros_like(h_prev)
+    t = np.empty_like(h_prev)
+    carry = np.empty((batch, lanes), dtype=np.int16)
+    v_max = np.zeros((batch, lanes), dtype=np.int16)
+
+    for j in range(codes.shape[1]):
+        prof = profile[:, codes[:, j], :]  # (seg_len, lot, benzi)
+        h[0] = _shift_lanes(h_prev[-1])
+        h[1:] = h_prev[:-1]
+        h += prof
+        np.maximum(h, e, out=h)
+        np.maximum(h, zero, out=h)
+
+        # F în bandă: F[s] = max_{k<s}(h[k] - go - (s-1-k) * ge) = cm[s-1] + (seg_len - s) * ge
+        np.subtract(h, go, out=t)
+        t -= rest
+        np.maximum.accumulate(t, axis=0, out=t)
+        # F care intră în banda l la s = 0: din capătul benzii l-1 sau continuat de mai departe
+        carry[:, 0] = 0
+        for lane in range(1, lanes):
+            np.maximum(t[-1, :, lane - 1], carry[:, lane - 1] - ge * seg_len, out=carry[:, lane])
+            np.maximum(carry[:, lane], zero, out=carry[:, lane])
+        np.maximum(h[1:], t[:-1] + rest[:-1], out=h[1:])
+        np.maximum(h, carry[None] - ramp[:, :, None], out=h)
+
+        np.maximum(v_max, h.max(axis=0), out=v_max)
+        e -= ge
+        np.subtract(h, go, out=t)
+        np.maximum(e, t, out=e)
+        np.maximum(e, zero, out=e)
+        h_prev, h = h, h_prev
+
+    return v_max.max(axis=1)
+
+
+def sw_scan(query: str, subjects, top_n: int = 10, match=3, mismatch=-3, gap_open=-5, gap_extend=-2,
+            matrix=None, lanes: int = 16, batch_size: int = None):
+    """
+    Scanează o interogare contra multor subiecte (stil bază de date) și întoarce cele mai bune
+    `top_n` rezultate ca listă de (index_subiect, scor), descrescător după scor.
+    - profilul striped al interogării se construiește o singură dată și se refolosește;
+    - subiectele se procesează în loturi de lungimi apropiate, pe benzi int16; implicit un lot are
+      STRIPED_BATCH_CELLS // len(query) subiecte, ca vectorii unei coloane să rămână în cache;
+    - dacă un scor se apropie de limita int16, subiectul se recalculează cu motorul int32.
+    Loturile cu lot × len(query) < STRIPED_MIN_CELLS (ex. ultimele subiecte ale scanării) se calculează
+    pereche cu pereche cu fill_affine_matrices_local(), unde costul fix pe coloană nu se amortizează.
+    Corecția F dintre benzi presupune gap_open <= gap_extend; pentru gap_extend < gap_open se folosește
+    tot motorul exact, așa că scorurile sunt identice cu smith_waterman_affine() pentru aceiași parametri.
+    """
+    table = score_table(match, mismatch, matrix)
+    max_sub = int(table.max())
+    striped = gap_extend >= gap_open
+    # t = h - gap_open - (seg_len - 1 - s) * gap_extend trebuie să rămână în int16
+    lanes = max(lanes, -(-len(query) * -gap_extend // STRIPED_MAX_RAMP))
+    profile = build_striped_profile(query, table, lanes) if striped else None
+    if batch_size is None:
+        batch_size = max(1, STRIPED_BATCH_CELLS // max(len(query), 1))
+
+    scores = np.zeros(len(subjects), dtype=np.int64)
+    int16 = np.zeros(len(subjects), dtype=bool)  # scoruri din benzile int16 (pot satura)
+    order = sorted(range(len(subjects)), key=lambda k: len(subjects[k]))
+    for start in range(0, len(order), batch_size):
+        chunk = order[start:start + batch_size]
+        if not striped or len(chunk) * len(query) < STRIPED_MIN_CELLS:
+            for k in chunk:
+                scores[k] = affine_local_score(query, subjects[k], table, gap_open, gap_extend)
+            continue
+        width = max(len(subjects[k]) for k in chunk)
+        codes = np.full((len(chunk), width), PAD_CODE, dtype=np.int32)
+        for row, k in enumerate(chunk):
+            codes[row, :len(subjects[k])] = encode(subjects[k])
+        scores[chunk] = _striped_batch(profile, codes, gap_open, gap_extend)
+        int16[chunk] = True
+
+    # saturare int16 -> recalculăm exact cu matricele int32
+    for k in np.flatnonzero(int16 & (scores >= INT16_MAX - max_sub)):
+        scores[k] = affine_local_score(query, subjects[k], table, gap_open, gap_extend)
+
+    best = heapq.nlargest(top_n, range(len(subjects)), key=lambda k: (scores[k], -k))
+    return [(k, int(scores[k])) for k in best]
+
+
+def benchmark_scan(query: str, subjects, replicate: int = 10000, **scoring):
+    """
+    Compară sw_scan pe `replicate` subiecte (cele date, repetate) cu motoarele pereche cu pereche:
+      - smith_waterman: motorul original (celulă cu celulă, gap liniar, fără --matrix), doar timpul;
+      - smith_waterman_affine: aceleași scoruri afine, matrice completă + backtracking;
+      - affine_local_score: aceleași scoruri, doar umplerea (motorul de rezervă din sw_scan).
+    Subiectele se repetă, așa că motoarele pereche cu pereche rulează o dată pe fiecare subiect
+    distinct, iar timpul se înmulțește cu numărul de repetări; scorurile afine se compară cu sw_scan.
+    """
+    pool = [subjects[k % len(subjects)] for k in range(replicate)]
+    match, mismatch, matrix = scoring.get("match", 3), scoring.get("mismatch", -3), scoring.get("matrix")
+    go, ge = scoring.get("gap_open", -5), scoring.get("gap_extend", -2)
+    table = score_table(match, mismatch, matrix)
+    texts = [decode(subj) for subj in subjects]
+
+    t0 = time.perf_counter()
+    hits = dict(sw_scan(query, pool, top_n=len(pool), **scoring))
+    t_scan = time.perf_counter() - t0
+    print(f"[bench] {replicate} subiecte: sw_scan {t_scan:.2f} s")
+
+    engines = [("smith_waterman_affine", lambda s: smith_waterman_affine(query, s, match, mismatch, go, ge, matrix)[2]),
+               ("affine_local_score", lambda s: affine_local_score(query, s, table, go, ge))]
+    if matrix is None:
+        engines.insert(0, ("smith_waterman", lambda s: smith_waterman(query, s, match, mismatch)[2]))
+    times = {}
+    for name, run in engines:
+        t0 = time.perf_counter()
+        try:
+            per_pair = [run(s) for s in texts]
+        except NotImplementedError:
+            print(f"[bench] {name}: neimplementat încă (TODO) — omis")
+            continue
+        t_pair = (time.perf_counter() - t0) * replicate / len(subjects)
+        same = "" if name == "smith_waterman" else \
+            f"; scoruri identice: {all(per_pair[k % len(subjects)] == sc for k, sc in hits.items())}"
+        print(f"[bench] {name}: {t_pair:.2f} s pereche cu pereche (x{t_pair / t_scan:.1f}){same}")
+        times[name] = t_pair
+    return t_scan, times
+
+
+def load_two_sequences(fasta_path: Path, i1, i2):
+    """
+    Alegem două secvențe după index sau ID, fără să citim tot FASTA-ul:
+    indexul .fai (seqtools.faidx, construit la prima rulare) dă poziția exactă a octeților,
+    iar fișierul e mapat în memorie (mmap; merge și pe .gz / BGZF).
+    """
+    with IndexedFasta(fasta_path) as recs:
+        if len(recs) < 2:
+            raise SystemExit("[eroare] Fișierul trebuie să conțină cel puțin 2 secvențe.")
+        try:
+            k1, k2 = recs.index.position(i1), recs.index.position(i2)
+        except (KeyError, IndexError):
+            raise SystemExit(f"[eroare] Indici / ID-uri invalide (0..{len(recs)-1} sau un ID din fișier).") from None
+        return recs.text(k1), recs.text(k2), recs.ids[k1], recs.ids[k2]
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--fasta", required=True, help="Cale către FASTA-ul propriu din data/work/<handle>/lab01/")
-    ap.add_argument("--i1", type=int, default=0, help="Index prima secvență (implicit 0)")
-    ap.add_argument("--i2", type=int, default=1, help="Index a doua secvență (implicit 1)")
+    ap.add_argument("--i1", default="0", help="Index sau ID prima secvență (implicit 0)")
+    ap.add_argument("--i2", default="1", help="Index sau ID a doua secvență (implicit 1)")
+    ap.add_argument("--mode", choices=["full", "score", "traceback", "topk"], default="full",
+                    help="full: matricea completă de scoruri; score: doar scor + poziție (2 rânduri); "
+                         "traceback: pointeri de 2 biți per celulă; "
+                         "topk: primele --top alinieri locale disjuncte (Waterman–Eggert)")
+    ap.add_argument("--matrix", help="Matrice de substituție Biopython, ex. BLOSUM62 sau PAM250 (modurile NumPy)")
+    ap.add_argument("--gap_open", type=int, help="Penalizare deschidere gap (activează modelul afin Gotoh)")
+    ap.add_argument("--gap_extend", type=int, default=-2, help="Penalizare extindere gap (implicit -2)")
+    ap.add_argument("--check_biopython", action="store_true",
+                    help="Compară scorul cu Align.PairwiseAligner")
+    ap.add_argument("--scan", action="store_true",
+                    help="Scanează secvența --i1 contra tuturor înregistrărilor (sw_scan, profil striped)")
+    ap.add_argument("--top", type=int, default=10,
+                    help="Numărul de rezultate pentru --scan și --mode topk (implicit 10)")
+    ap.add_argument("--replicate", type=int, default=0,
+                    help="La --scan: repetă înregistrările până la N subiecte (ex. 10000 pentru benchmark)")
+    ap.add_argument("--benchmark", action="store_true",
+                    help="La --scan: compară timpul cu alinierea pereche cu pereche")
     args = ap.parse_args()
 
     fasta_path = Path(args.fasta)
     if not fasta_path.exists():
         raise SystemExit(f"[eroare] Nu găsesc fișierul: {fasta_path}")
 
+    if args.scan:
+        recs = load_fasta(fasta_path)
+        with IndexedFasta(fasta_path) as fa:
+            try:
+                q = fa.index.position(args.i1)
+            except (KeyError, IndexError):
+                raise SystemExit(f"[eroare] Index / ID invalid (0..{len(recs)-1} sau un ID din fișier).") from None
+        query = recs.text(q)
+        subjects = list(recs)  # view-uri uint8, fără copii
+        ids = recs.ids
+        total = max(args.replicate, len(subjects))
+        scoring = {"matrix": args.matrix, "gap_open": args.gap_open if args.gap_open is not None else -5,
+                   "gap_extend": args.gap_extend}
+        if args.benchmark:
+            benchmark_scan(query, subjects, replicate=total, **scoring)
+            return
+        pool = [subjects[k % len(subjects)] for k in range(total)]
+        print(f"=== sw_scan: {recs.ids[q]} vs {total} subiecte ===")
+        for k, sc in sw_scan(query, pool, top_n=args.top, **scoring):
+            print(f"{sc:8d}  #{k}  {ids[k % len(ids)]}")
+        return
+
     s1, s2, id1, id2 = load_two_sequences(fasta_path, args.i1, args.i2)
-    a1, a2, sc = smith_waterman(s1, s2)
+    if args.matrix and args.mode == "full" and args.gap_open is None:
+        raise SystemExit("[eroare] --matrix necesită --mode score/traceback sau --gap_open.")
+
+    if args.mode == "score":
+        sc, (i, j) = smith_waterman_score(s1, s2, matrix=args.matrix)
+        print("=== Aliniere locală (SW, doar scor) ===")
+        print(f"{id1}  vs  {id2}")
+        print("Score:", sc)
+        print(f"Sfârșit aliniere: {id1}[{i}]  {id2}[{j}]")
+        return
+
+    if args.mode == "topk":
+        if args.gap_open is not None:
+            raise SystemExit("[eroare] --mode topk folosește gap liniar (fără --gap_open).")
+        hits = smith_waterman_top(s1, s2, k=args.top, matrix=args.matrix)
+        print(f"=== Top {args.top} alinieri locale (Waterman–Eggert) ===")
+        print(f"{id1}  vs  {id2}")
+        for rank, hit in enumerate(hits, 1):
+            print(f"#{rank}  scor {hit.score}  {id1}[{hit.start1}:{hit.end1}]  {id2}[{hit.start2}:{hit.end2}]  "
+                  f"identitate {hit.identity:.2%}  {hit.cigar}")
+        return
+
+    if args.gap_open is not None:
+        res = smith_waterman_affine(s1, s2, gap_open=args.gap_open, gap_extend=args.gap_extend,
+                                    matrix=args.matrix)
+    elif args.mode == "traceback":
+        res = smith_waterman_traceback(s1, s2, matrix=args.matrix)
+    else:
+        res = smith_waterman(s1, s2)
+    a1, a2, sc = res
 
     print("=== Aliniere locală (SW) ===")
     print(f"{id1}  vs  {id2}")
     print(a1)
     print(a2)
     print("Score:", sc)
+    print(f"Regiune: {id1}[{res.start1}:{res.end1}]  {id2}[{res.start2}:{res.end2}]  "
+          f"identitate {res.identity:.2%}, p-distance {res.p_distance:.4f}, gap-uri {res.gaps}")
+
+    if args.check_biopython:
+        if args.gap_open is not None:
+            ref = biopython_score(s1, s2, gap_open=args.gap_open, gap_extend=args.gap_extend, matrix=args.matrix)
+        else:
+            ref = biopython_score(s1, s2, matrix=args.matrix)
+        print(f"PairwiseAligner: {ref:g} ({'OK' if ref == sc else 'DIFERIT'})")
 
 
 if __name__ == "__main__":
@@ -16,15 +16,32 @@ Instrucțiuni:
     --method hamming     : Hamming distance (doar pentru secvențe de aceeași lungime)
     --method p_distance  : p-distance (proporția pozițiilor diferite)
     --truncate          : Trunchează la lungimea minimă (pentru Hamming cu lungimi diferite)
+    --workers N         : Calcul paralel al alinierilor (N procese)
+    --out matrice.npy   : Mod streaming pentru N mare (fără limita --max_seqs): matricea
+                          se scrie pe disc pe blocuri (memmap .npy), cu reluare după întrerupere
 """
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import hashlib
+import json
+import os
 from pathlib import Path
 import sys
-from Bio import SeqIO
-from Bio import Align
+import time
 from typing import List, Tuple
 import numpy as np
 
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from seqtools.cache import ResultCache, open_cache
+from seqtools.distance import hamming_block, hamming_matrix, prepare_panel
+from seqtools.faidx import IndexedFasta
+from seqtools.pairwise import align_pairs, align_store_pairs
+from seqtools.scoring import encode
+from seqtools.seqstore import SequenceStore, load_fasta
+
 
 def hamming_distance(seq1: str, seq2: str) -> int:
     """
@@ -34,7 +51,7 @@ def hamming_distance(seq1: str, seq2: str) -> int:
     if len(seq1) != len(seq2):
         raise ValueError(f"Secvențele trebuie să aibă aceeași lungime! ({len(seq1)} vs {len(seq2)})")
     
-    return sum(c1 != c2 for c1, c2 in zip(seq1, seq2))
+    return int(np.count_nonzero(encode(seq1) != encode(seq2)))
 
 
 def p_distance(seq1: str, seq2: str) -> float:
@@ -59,81 +76,84 @@ def truncate_sequences(sequences: List[Tuple[str, str]]) -> List[Tuple[str, str]
     truncated = [(seq_id, seq[:min_length]) for seq_id, seq in sequences]
     return truncated
 
-def p_distance_aligned(seq1: str, seq2: str) -> float:
+
+# Scoring-ul "globalxx" folosit pentru p-distance cu aliniere: fără penalități la capete
+ALIGN_SCORING = dict(mode="global", match=1, mismatch=-1, gap=-1, end_gap=0)
+
+
+def p_distance_aligned(seq1: str, seq2: str, cache: ResultCache = None) -> float:
     """
     Calculează p-distance pe secvențe aliniate cu globalxx (Biopython).
     Funcționează pentru secvențe de lungimi DIFERITE.
     
     globalxx = aliniere globală fără penalități pentru gap-uri la capete.
+    Se folosește doar prima aliniere optimă; nepotrivirile / coloanele fără gap se numără
+    vectorizat din coordonatele alinierii (fără a construi șirurile aliniate).
+    Cu `cache`, rezultatul se caută întâi după hash(seq1, seq2, parametri de scoring).
     """
-    aligner = Align.PairwiseAligner()
-    aligner.mode = 'global'
-    
-    # Configurare scoring
-    aligner.match_score = 1
-    aligner.mismatch_score = -1
-    aligner.open_gap_score = -1
-    aligner.extend_gap_score = -1
-    
-    # Fără penalități la capete 
-    aligner.target_end_gap_score = 0.0
-    aligner.query_end_gap_score = 0.0
-  
-    # Aliniază
-    alignments = aligner.align(seq1, seq2)
-    best_alignment = alignments[0]  #  Doar prima aliniere
-    
-    aligned_seq1 = str(best_alignment[0])
-    aligned_seq2 = str(best_alignment[1])
-    
-    matches = 0
-    total = 0
-    
-    for c1, c2 in zip(aligned_seq1, aligned_seq2):
-        if c1 != '-' and c2 != '-': 
-            total += 1
-            if c1 != c2:
-                matches += 1
-    
-    if total == 0:
-        return 0.0
-    
-    return matches / total
+    return align_pairs([(seq1, seq2)], cache=cache, **ALIGN_SCORING)[0].p_distance
 
 
+def aligned_p_distances(pairs: List[Tuple[str, str]], workers: int = 1, cache: ResultCache = None) -> List[float]:
+    """p_distance_aligned pentru o listă de perechi, într-un singur apel batch (pool de procese dacă workers > 1)."""
+    return [r.p_distance for r in align_pairs(pairs, workers=workers, cache=cache, **ALIGN_SCORING)]
+
+
+def pair_distance(seq1: str, seq2: str, method: str, use_alignment: bool = False,
+                  cache: ResultCache = None) -> float:
+    """Distanța dintre două secvențe (deja cu majuscule, ex. view-uri din load_fasta(upper=True))."""
+    if method == "hamming":
+        return hamming_distance(seq1, seq2)
+    if method == "p_distance":
+        if use_alignment:
+            return p_distance_aligned(seq1, seq2, cache)
+        return p_distance(seq1, seq2)
+    raise ValueError(f"Metodă necunoscută: {method}")
+
 
-def calculate_distance_matrix(sequences: List[Tuple[str, str]], method: str = "p_distance", use_alignment: bool = False) -> np.ndarray:
+def calculate_distance_matrix(sequences: List[Tuple[str, str]], method: str = "p_distance", use_alignment: bool = False,
+                              workers: int = 1, cache: ResultCache = None) -> np.ndarray:
     """
     Calculează matricea de distanțe pentru toate perechile de secvențe.
     
     Args:
-        sequences: Lista de tupluri (id, secvență)
+        sequences: Lista de tupluri (id, secvență); secvențele sunt view-uri uint8 din
+                   SequenceStore (load_fasta(upper=True)), deja cu majuscule
         method: "hamming" sau "p_distance"
+        workers: > 1 → alinierile rulează pe un pool de procese (seqtools.pairwise.align_store_pairs)
+        cache: cache pe disc pentru distanțele cu aliniere (vezi seqtools.cache)
     
     Returns:
         Matrice numpy cu distanțele
     """
+    lengths = {len(seq) for _, seq in sequences}
+    if not use_alignment and len(lengths) == 1 and method in ("hamming", "p_distance"):
+        # Lungimi egale (sau --truncate): toată matricea dintr-un singur kernel vectorizat,
+        # cu secvențele codificate o singură dată (2 biți/bază + XOR/popcount pentru ACGT)
+        distance_matrix = hamming_matrix([seq for _, seq in sequences]).astype(np.float64)
+        if method == "p_distance":
+            distance_matrix /= lengths.pop() or 1
+        return np.triu(distance_matrix, 1)
+
     n = len(sequences)
+    seqs = [seq for _, seq in sequences]
+    if use_alignment and method == "p_distance":
+        # Toate perechile într-un singur batch (seqtools.pairwise): un aligner per proces,
+        # doar prima aliniere optimă. Secvențele ajung o singură dată în memoria partajată
+        # a pool-ului; task-urile conțin doar perechi de indici (i, j).
+        upper = np.triu_indices(n, 1)
+        store = SequenceStore.from_sequences(sequences)
+        results = align_store_pairs(store, zip(*upper), workers=workers, cache=cache, **ALIGN_SCORING)
+        distance_matrix = np.zeros((n, n))
+        distance_matrix[upper] = [r.p_distance for r in results]
+        return distance_matrix
+
     distance_matrix = np.zeros((n, n))
     
     for i in range(n):
         for j in range(i + 1, n):  # Doar triunghiul superior
-            seq1 = sequences[i][1].upper()
-            seq2 = sequences[j][1].upper()
-            
             try:
-                if method == "hamming":
-                    dist = hamming_distance(seq1, seq2)
-                elif method == "p_distance":
-                    if use_alignment:
-                        dist = p_distance_aligned(seq1, seq2)
-                    else:
-                        dist = p_distance(seq1, seq2)
-                else:
-                    raise ValueError(f"Metodă necunoscută: {method}")
-                
-                distance_matrix[i][j] = dist
-                
+                distance_matrix[i][j] = pair_distance(seqs[i], seqs[j], method, use_alignment, cache)
             except ValueError as e:
                 print(f"[ERROR] {e}", file=sys.stderr)
                 raise
@@ -141,6 +161,169 @@ def calculate_distance_matrix(sequences: List[Tuple[str, str]], method: str = "p
     return distance_matrix
 
 
+# Starea fiecărui proces din pool (setată o singură dată de _init_tile_worker)
+_WORKER = {}
+
+
+def tile_list(n: int, tile: int) -> List[Tuple[int, int]]:
+    """Blocurile (bi, bj), bi <= bj, care acoperă triunghiul superior, în ordinea rândurilor."""
+    nb = -(-n // tile)
+    return [(bi, bj) for bi in range(nb) for bj in range(bi, nb)]
+
+
+def _init_tile_worker(out_path: str, seqs: List[str], method: str, use_alignment: bool, tile: int,
+                      cache: ResultCache = None):
+    _WORKER["out"] = np.load(out_path, mmap_mode="r+")
+    _WORKER["seqs"] = seqs
+    _WORKER["method"] = method
+    _WORKER["use_alignment"] = use_alignment
+    _WORKER["cache"] = cache
+    _WORKER["tile"] = tile
+    # Lungimi egale, fără aliniere: blocurile vin din kernelul vectorizat (codificare o singură dată)
+    equal = len({len(s) for s in seqs}) == 1
+    _WORKER["panel"] = prepare_panel(seqs) if equal and not use_alignment and seqs else None
+
+
+def _fill_tile(block: Tuple[int, int]) -> Tuple[Tuple[int, int], Tuple[float, int, int]]:
+    """
+    Calculează un bloc, îl scrie în memmap și întoarce minimul lui ca (distanță, i, j).
+    Pe blocurile de pe diagonală se păstrează doar triunghiul superior (j > i).
+    """
+    out, seqs, tile = _WORKER["out"], _WORKER["seqs"], _WORKER["tile"]
+    method, use_alignment, cache = _WORKER["method"], _WORKER["use_alignment"], _WORKER["cache"]
+    n = len(seqs)
+    bi, bj = block
+    r0, r1 = bi * tile, min((bi + 1) * tile, n)
+    c0, c1 = bj * tile, min((bj + 1) * tile, n)
+
+    panel = _WORKER["panel"]
+    if panel is not None and method in ("hamming", "p_distance"):
+        vals = hamming_block(panel[r0:r1], panel[c0:c1]).astype(np.float64)
+        if method == "p_distance":
+            vals /= len(seqs[0]) or 1
+    elif use_alignment and method == "p_distance":
+        # Perechile blocului într-un singur batch, cu aligner-ul acestui proces
+        vals = np.zeros((r1 - r0, c1 - c0))
+        cells = [(i, j) for i in range(r0, r1) for j in range(max(c0, i + 1), c1)]
+        dists = aligned_p_distances([(seqs[i], seqs[j]) for i, j in cells], cache=cache)
+        for (i, j), d in zip(cells, dists):
+            vals[i - r0, j - c0] = d
+    else:
+        vals = np.zeros((r1 - r0, c1 - c0))
+        for i in range(r0, r1):
+            for j in range(max(c0, i + 1), c1):
+                vals[i - r0, j - c0] = pair_distance(seqs[i], seqs[j], method, use_alignment, cache)
+
+    valid = np.arange(r0, r1)[:, None] < np.arange(c0, c1)[None, :]
+    vals[~valid] = 0.0
+    out[r0:r1, c0:c1] = vals
+    out.flush()
+
+    best = (float("inf"), -1, -1)
+    if valid.any():
+        masked = np.where(valid, vals, np.inf)
+        k = int(np.argmin(masked))  # primul minim în ordinea rândurilor, ca find_closest_pair
+        bi_, bj_ = divmod(k, vals.shape[1])
+        best = (float(masked.flat[k]), r0 + bi_, c0 + bj_)
+    return block, best
+
+
+def _input_digest(sequences: List[Tuple[str, str]]) -> str:
+    """
+    Amprenta setului de intrare (id-uri, lungimi și reziduuri), ca reluarea să nu amestece
+    distanțe din fișiere diferite, nici după substituții care nu schimbă lungimile.
+    """
+    h = hashlib.sha256()
+    for seq_id, seq in sequences:
+        h.update(seq_id.encode())
+        h.update(b"\0")
+        h.update(str(len(seq)).encode())
+        h.update(b"\n")
+        h.update(np.ascontiguousarray(encode(seq)))
+    return h.hexdigest()
+
+
+def _write_progress(path: Path, state: dict):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)  # atomic: fișierul de progres nu rămâne niciodată pe jumătate scris
+
+
+def stream_distance_matrix(sequences: List[Tuple[str, str]], out_path: Path, method: str = "p_distance",
+                           use_alignment: bool = False, tile: int = 256,
+                           workers: int = 1, cache: ResultCache = None) -> Tuple[int, int, float]:
+    """
+    Calculează matricea pe blocuri tile x tile direct într-un .npy memory-mapped (triunghiul superior).
+
+    Perechea cea mai apropiată se actualizează după fiecare bloc, fără a reciti matricea.
+    Progresul e salvat lângă matrice: blocurile terminate într-un bitmap de dimensiune fixă
+    (`<out>.tiles.npy`, memmap, un octet per bloc), iar parametrii și minimul curent în
+    `<out>.progress.json`; la o nouă rulare cu aceiași parametri se continuă de la blocurile rămase.
+
+    Returns:
+        (index1, index2, distanță_minimă)
+    """
+    n = len(sequences)
+    seqs = [seq for _, seq in sequences]
+    progress_path = out_path.with_name(out_path.name + ".progress.json")
+    tiles_path = out_path.with_name(out_path.name + ".tiles.npy")
+    blocks = tile_list(n, tile)
+    params = {"n": n, "method": method, "use_alignment": use_alignment, "tile": tile,
+              "input": _input_digest(sequences)}
+
+    state = None
+    if out_path.exists() and progress_path.exists() and tiles_path.exists():
+        state = json.loads(progress_path.read_text())
+        if state.get("params") != params:
+            print("[!] Parametri diferiți față de rularea anterioară: reiau de la zero", file=sys.stderr)
+            state = None
+    if state is None:
+        np.lib.format.open_memmap(str(out_path), mode="w+", dtype=np.float64, shape=(n, n)).flush()
+        np.lib.format.open_memmap(str(tiles_path), mode="w+", dtype=np.uint8, shape=(len(blocks),)).flush()
+        state = {"params": params, "best": [float("inf"), -1, -1]}
+        _write_progress(progress_path, state)
+
+    # Un octet per bloc: actualizarea după fiecare bloc scrie O(1), oricât de multe blocuri are matricea
+    done_tiles = np.load(tiles_path, mmap_mode="r+")
+    todo = [b for b, flag in zip(blocks, done_tiles) if not flag]
+    position = {b: k for k, b in enumerate(blocks)}
+    total = len(blocks)
+    finished = total - len(todo)
+    if finished:
+        print(f"[*] Reiau: {finished}/{total} blocuri deja calculate", file=sys.stderr)
+
+    best = tuple(state["best"])
+    t0 = time.perf_counter()
+
+    def record(block, tile_best):
+        nonlocal best, finished
+        if tile_best < best:  # (distanță, i, j): egalitățile → prima pereche în ordinea rândurilor
+            best = tile_best
+            state["best"] = list(best)
+            _write_progress(progress_path, state)  # minimul se salvează înainte de a marca blocul
+        done_tiles[position[block]] = 1
+        done_tiles.flush()
+        finished += 1
+        print(f"[*] bloc {finished}/{total} ({time.perf_counter() - t0:.1f}s)", file=sys.stderr)
+
+    initargs = (str(out_path), seqs, method, use_alignment, tile, cache)
+    if workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_tile_worker, initargs=initargs) as pool:
+            for fut in as_completed([pool.submit(_fill_tile, b) for b in todo]):
+                record(*fut.result())
+    else:
+        _init_tile_worker(*initargs)
+        try:
+            for b in todo:
+                record(*_fill_tile(b))
+        finally:
+            _WORKER.clear()  # închide memmap-ul
+    del done_tiles
+
+    d, i, j = best
+    return int(i), int(j), float(d)
+
+
 def print_distance_matrix(distance_matrix: np.ndarray, seq_ids: List[str], method: str):
     n = len(seq_ids)
     
@@ -169,16 +352,11 @@ def find_closest_pair(distance_matrix: np.ndarray, seq_ids: List[str], method: s
         (index1, index2, distanță_minimă)
     """
     n = len(seq_ids)
-    min_dist = float('inf')
-    min_i, min_j = 0, 1
+    rows, cols = np.triu_indices(n, k=1)  # ordinea rândurilor: la egalitate câștigă prima pereche
+    values = distance_matrix[rows, cols]
+    k = int(np.argmin(values))
     
-    for i in range(n):
-        for j in range(i + 1, n):
-            if distance_matrix[i][j] < min_dist:
-                min_dist = distance_matrix[i][j]
-                min_i, min_j = i, j
-    
-    return min_i, min_j, min_dist
+    return int(rows[k]), int(cols[k]), values[k]
 
 
 def main():
@@ -190,8 +368,17 @@ def main():
                     help="Trunchează secvențele la lungimea minimă (pentru lungimi diferite)")
     ap.add_argument("--align", action="store_true",
                     help="Folosește aliniament globalxx pentru p-distance (pentru lungimi diferite)")
-    ap.add_argument("--max_seqs", type=int, default=10,
-                    help="Limitează numărul de secvențe procesate (opțional)")
+    ap.add_argument("--max_seqs", type=int, default=None,
+                    help="Limitează numărul de secvențe procesate (implicit 10; fără limită cu --out)")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Număr de procese pentru calculul matricei (implicit 1 = serial)")
+    ap.add_argument("--out", default=None,
+                    help="Scrie matricea pe blocuri într-un .npy (memmap), cu reluare; nu mai afișează matricea")
+    ap.add_argument("--tile", type=int, default=256,
+                    help="Dimensiunea blocului pentru --out (implicit 256)")
+    ap.add_argument("--cache", default=None,
+                    help="Fișier SQLite pentru cache-ul alinierilor (implicit $SEQTOOLS_CACHE sau ~/.cache/seqtools)")
+    ap.add_argument("--no_cache", action="store_true", help="Nu folosi cache-ul de alinieri")
     
     args = ap.parse_args()
     
@@ -201,19 +388,27 @@ def main():
         sys.exit(1)
     
     print(f"[*] Citesc secvențele din: {input_path}", file=sys.stderr)
-    records = list(SeqIO.parse(str(input_path), "fasta"))
+    # Indexul .fai (seqtools.faidx) dă numărul de secvențe și poziția lor fără să parsăm tot fișierul
+    fasta = IndexedFasta(input_path)
     
-    if len(records) < 3:
-        print(f"[ERROR] Sunt necesare cel puțin 3 secvențe! Găsite: {len(records)}", file=sys.stderr)
+    if len(fasta) < 3:
+        print(f"[ERROR] Sunt necesare cel puțin 3 secvențe! Găsite: {len(fasta)}", file=sys.stderr)
         sys.exit(1)
     
-    # Limitare număr secvențe 
-    if args.max_seqs and len(records) > args.max_seqs:
-        records = records[:args.max_seqs]
+    # Limitare număr secvențe (implicit 10, doar în modul cu afișare completă)
+    if args.max_seqs is None and args.out is None:
+        args.max_seqs = 10
+    if args.max_seqs and len(fasta) > args.max_seqs:
+        # doar primele max_seqs înregistrări se citesc de pe disc
+        store = fasta.store(range(args.max_seqs), upper=True)
         print(f"[*] Limitez la primele {args.max_seqs} secvențe", file=sys.stderr)
+    else:
+        # Un singur buffer uint8 (cache .npy lângă FASTA), deja cu majuscule; secvențele sunt view-uri în el
+        store = load_fasta(input_path, upper=True)
+    fasta.close()
     
     # Pregătire secvente
-    sequences = [(rec.id, str(rec.seq)) for rec in records]
+    sequences = store.items()
     seq_ids = [seq_id for seq_id, _ in sequences]
     
     print(f"[*] Am încărcat {len(sequences)} secvențe", file=sys.stderr)
@@ -243,15 +438,32 @@ def main():
         elif args.align:
             print(f"[OK] Voi folosi aliniament globalxx (opțiunea a)", file=sys.stderr)
     
+    # Cache pentru alinieri (doar --align e suficient de scump ca să merite)
+    cache = open_cache(args.cache) if args.align and not args.no_cache else None
+
     # Calcul matrice de distanțe
     print(f"[*] Calculez distanțele ({args.method})...", file=sys.stderr)
-    distance_matrix = calculate_distance_matrix(sequences, args.method, use_alignment=args.align)
-    
-    # Afișare matrice
-    print_distance_matrix(distance_matrix, seq_ids, args.method)
-    
-    # Găsire pereche cea mai apropiată
-    i, j, min_dist = find_closest_pair(distance_matrix, seq_ids, args.method)
+    if args.out:
+        out_path = Path(args.out)
+        if args.tile < 1:
+            print("[ERROR] --tile trebuie să fie pozitiv", file=sys.stderr)
+            sys.exit(1)
+        i, j, min_dist = stream_distance_matrix(sequences, out_path, args.method, use_alignment=args.align,
+                                                tile=args.tile, workers=args.workers, cache=cache)
+        print(f"[OK] Matricea ({len(sequences)}x{len(sequences)}, triunghiul superior) e în {out_path}",
+              file=sys.stderr)
+    else:
+        distance_matrix = calculate_distance_matrix(sequences, args.method, use_alignment=args.align,
+                                                    workers=args.workers, cache=cache)
+        
+        # Afișare matrice
+        print_distance_matrix(distance_matrix, seq_ids, args.method)
+        
+        # Găsire pereche cea mai apropiată
+        i, j, min_dist = find_closest_pair(distance_matrix, seq_ids, args.method)
+
+    if cache is not None and (args.workers <= 1 or not args.out):
+        print(f"[*] Cache {cache.path}: {cache.hits} din cache, {cache.misses} calculate", file=sys.stderr)
     
     print(f"{'='*80}")
     print(f"PERECHEA CEA MAI APROPIATĂ:")
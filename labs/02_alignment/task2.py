@@ -1,40 +1,52 @@
-from Bio import SeqIO
-from Bio import Align
+import argparse
+from pathlib import Path
+import sys
 
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from seqtools.cache import open_cache
+from seqtools.pairwise import align_pairs
+from seqtools.seqstore import load_fasta
+
+# echivalent cu globalxx/localxx: match=1, mismatch=0, gap=0
+XX_SCORING = dict(match=1.0, mismatch=0.0, gap=0.0)
+
+
+def best_alignment(mode, seq1, seq2, cache=None):
+    """Prima aliniere optimă (seqtools.pairwise); cu cache, aceleași secvențe + parametri nu se mai realiniază."""
+    return align_pairs([(seq1, seq2)], cache=cache, mode=mode, **XX_SCORING)[0]
+
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--no_cache", action="store_true", help="Nu folosi cache-ul de alinieri")
+args = ap.parse_args()
+
+cache = None if args.no_cache else open_cache()
 file_path = "data/work/lab/rosestoica/tp53.fa"
-sequences = list(SeqIO.parse(file_path, "fasta"))
+sequences = load_fasta(file_path)
 
 if len(sequences) < 2:
     print("Nu sunt suficiente secvențe!")
 else:
+    # view-uri în buffer-ul comun (fără copii)
     seq1 = sequences[0][5:500]
     seq2 = sequences[1][0:500]
-    
-    print(f"Secvențe: {seq1.id} vs {seq2.id}")
-    print("-" * 40)
 
-    aligner = Align.PairwiseAligner()
-    
-    # echivalent cu globalxx/localxx: match=1, mismatch=0, gap=0
-    aligner.match_score = 1.0
-    aligner.mismatch_score = 0.0
-    aligner.open_gap_score = 0.0
-    aligner.extend_gap_score = 0.0
+    print(f"Secvențe: {sequences.ids[0]} vs {sequences.ids[1]}")
+    print("-" * 40)
 
     # ALINIERE GLOBALĂ
-    aligner.mode = 'global'
-    alignments_global = aligner.align(seq1.seq, seq2.seq)
-    best_global = alignments_global[0] # Luăm primul rezultat
+    best_global = best_alignment("global", seq1, seq2, cache)
 
     print("\n### 1. ALINIERE GLOBALĂ (Fragment) ###")
     print(f"Scor: {best_global.score}")
-    print(best_global) 
+    print(best_global.format())
 
     # ALINIERE LOCALĂ
-    aligner.mode = 'local'
-    alignments_local = aligner.align(seq1.seq, seq2.seq)
-    best_local = alignments_local[0]
+    best_local = best_alignment("local", seq1, seq2, cache)
 
     print("\n### 2. ALINIERE LOCALĂ (Fragment) ###")
     print(f"Scor: {best_local.score}")
-    print(best_local)
+    print(best_local.format())
@@ -1,246 +1,435 @@
 #!/usr/bin/env python3
 """
-MSA Analysis Script - Clustal Omega Only
+MSA Analysis Script - Clustal Omega sau motor MSA intern
 Pentru GitHub Codespaces
+
+Motoare:
+  --engine builtin  : aliniere progresivă în Python (seqtools.msa): arbore ghid din
+                      distanțe k-mer + aliniere profil-profil NW; merge complet offline
+  --engine clustalo : Clustal Omega (trebuie instalat separat, ex. apt-get install clustalo)
+
+MSA-ul rulează o singură dată; alinierea din memorie se scrie apoi în toate formatele
+cerute (--formats clustal,fasta,phylip,stockholm). La final se afișează timpul pe etape.
+
+Exemplu rulare:
+  python labs/02_alignment/task3.py --fasta data/sample/tp53_dna_multi.fasta
+  python labs/02_alignment/task3.py --engine clustalo --formats clustal,phylip
 """
 
-from Bio import SeqIO, AlignIO
-from Bio.Align.Applications import ClustalOmegaCommandline
-from Bio.Phylo.TreeConstruction import DistanceCalculator, DistanceTreeConstructor
+import argparse
+from contextlib import contextmanager
+from Bio import AlignIO
+from Bio.Align import MultipleSeqAlignment
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
 from Bio import Phylo
-import subprocess
+import io
+import shutil
 import os
 import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from seqtools.cache import make_key, open_cache
+from seqtools.distance import p_distance_matrix
+from seqtools.faidx import IndexedFasta
+from seqtools.kmer import KMER_METHODS, kmer_distance_matrix
+from seqtools.msa import SHARED_KMER_MAX_SEQS, default_gaps, default_k, progressive_align
+from seqtools.phylo import to_distance_matrix, upgma_tree
+from seqtools.seqstore import load_fasta
+
+DEFAULT_FASTA = "data/work/lab/rosestoica/tp53.fa"
+
+# Peste aceste praguri nu mai afișăm alinierea / matricea, respectiv arborele ASCII
+MAX_DISPLAY = 20
+MAX_TREE_DRAW = 60
+
+# format cerut -> (extensie fișier, nume format AlignIO)
+ALIGNMENT_FORMATS = {
+    "clustal": ("aln", "clustal"),
+    "fasta": ("fasta", "fasta"),
+    "phylip": ("phy", "phylip-relaxed"),  # relaxed: ID-uri mai lungi de 10 caractere
+    "stockholm": ("sto", "stockholm"),
+}
+
+
+@contextmanager
+def timed(timings, stage):
+    """Adaugă în `timings` durata (secunde) blocului `with`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
 
 # ============================================================================
-# 0. VERIFICARE ȘI INSTALARE DEPENDINȚE
+# 0. VERIFICARE DEPENDINȚE
 # ============================================================================
 
-def check_and_install_tools():
-    """Verifică și instalează tool-urile necesare"""
+
+def check_tools(engine):
+    """Verifică tool-urile necesare motorului ales (fără instalări automate)"""
     print("="*80)
     print("VERIFICARE DEPENDINȚE")
     print("="*80)
-    
-    # Verifică Biopython
-    try:
-        import Bio
-        print(f"✓ Biopython instalat (versiune {Bio.__version__})")
-    except ImportError:
-        print("⚠ Instalez Biopython...")
-        subprocess.run([sys.executable, "-m", "pip", "install", "biopython"], check=True)
-        print("✓ Biopython instalat!")
-    
+
+    import Bio
+    print(f"✓ Biopython instalat (versiune {Bio.__version__})")
+
+    if engine == "builtin":
+        print("✓ Motor MSA intern (seqtools.msa) — nu necesită tool-uri externe")
+        return True
+
     # Verifică Clustal Omega
-    try:
-        result = subprocess.run(["clustalo", "--version"], 
-                              stdout=subprocess.PIPE, 
-                              stderr=subprocess.PIPE,
-                              text=True)
+    if shutil.which("clustalo"):
         print(f"✓ Clustal Omega instalat")
         return True
-    except FileNotFoundError:
-        print("⚠ Clustal Omega nu este instalat. Instalez...")
-        try:
-            subprocess.run(["sudo", "apt-get", "update", "-qq"], check=True)
-            subprocess.run(["sudo", "apt-get", "install", "-y", "-qq", "clustalo"], check=True)
-            print("✓ Clustal Omega instalat cu succes!")
-            return True
-        except subprocess.CalledProcessError:
-            print("✗ Nu s-a putut instala Clustal Omega automat")
-            print("\nRulează manual în terminal:")
-            print("  sudo apt-get update")
-            print("  sudo apt-get install -y clustalo")
-            return False
-
-# Rulează verificarea
-if not check_and_install_tools():
-    sys.exit(1)
+    print("✗ Clustal Omega nu este instalat")
+    print("\nInstalează-l manual (necesită acces la rețea), de ex.:")
+    print("  sudo apt-get install -y clustalo")
+    print("sau rulează cu motorul intern: --engine builtin")
+    return False
 
 # ============================================================================
 # 1. CITIRE ȘI SELECȚIE SECVENȚE
 # ============================================================================
 
-print("\n" + "="*80)
-print("TASK 3 - MSA ONLINE (CLUSTAL OMEGA)")
-print("="*80)
-
-fasta_file = "data/work/lab/rosestoica/tp53.fa"
 
-# Verifică dacă fișierul există
-if not os.path.exists(fasta_file):
-    print(f"\n⚠ ATENȚIE: Fișierul {fasta_file} nu există!")
-    print("\nCaută fișiere .fa în directorul curent:")
-    for root, dirs, files in os.walk(".", topdown=True):
-        for file in files:
-            if file.endswith('.fa') or file.endswith('.fasta'):
-                print(f"  Găsit: {os.path.join(root, file)}")
-    sys.exit(1)
+def select_sequences(fasta_file, max_seqs, input_file):
+    """Citește FASTA-ul, păstrează primele `max_seqs` secvențe și le salvează în `input_file`"""
+    # Verifică dacă fișierul există
+    if not os.path.exists(fasta_file):
+        print(f"\n⚠ ATENȚIE: Fișierul {fasta_file} nu există!")
+        print("\nCaută fișiere .fa în directorul curent:")
+        for root, dirs, files in os.walk(".", topdown=True):
+            for file in files:
+                if file.endswith('.fa') or file.endswith('.fasta'):
+                    print(f"  Găsit: {os.path.join(root, file)}")
+        sys.exit(1)
 
-sequences = list(SeqIO.parse(fasta_file, "fasta"))
+    # Indexul .fai (seqtools.faidx): numărul de secvențe fără să parsăm tot fișierul
+    with IndexedFasta(fasta_file) as fasta:
+        total = len(fasta)
+        print(f"\nTotal secvențe în dataset: {total}")
 
-print(f"\nTotal secvențe în dataset: {len(sequences)}")
+        # Selectează maxim `max_seqs` secvențe (None = toate); se citesc doar cele alese
+        num_sequences = total if max_seqs is None else min(max_seqs, total)
+        if num_sequences < total:
+            selected_sequences = fasta.store(range(num_sequences))
+        else:
+            # toate: un singur buffer uint8 (seqtools.seqstore, cache .npy lângă FASTA)
+            selected_sequences = load_fasta(fasta_file)
 
-# Selectează maxim 5 secvențe
-num_sequences = min(5, len(sequences))
-selected_sequences = sequences[:num_sequences]
+    print(f"Secvențe selectate pentru MSA: {len(selected_sequences)}")
+    print("\nSecvențele selectate:")
+    for i, (seq_id, length) in enumerate(zip(selected_sequences.ids[:MAX_DISPLAY], selected_sequences.lengths), 1):
+        print(f"  {i}. {seq_id[:60]:60} (lungime: {length:6} bp)")
+    if len(selected_sequences) > MAX_DISPLAY:
+        print(f"  ... încă {len(selected_sequences) - MAX_DISPLAY} secvențe")
 
-print(f"Secvențe selectate pentru MSA: {len(selected_sequences)}")
-print("\nSecvențele selectate:")
-for i, seq in enumerate(selected_sequences, 1):
-    print(f"  {i}. {seq.id[:60]:60} (lungime: {len(seq.seq):6} bp)")
-
-# Salvează secvențele selectate
-input_file = "selected_sequences.fasta"
-SeqIO.write(selected_sequences, input_file, "fasta")
-print(f"\n✓ Secvențe salvate în: {input_file}")
+    # Salvează secvențele selectate
+    selected_sequences.write_fasta(input_file)
+    print(f"\n✓ Secvențe salvate în: {input_file}")
+    return selected_sequences
 
 # ============================================================================
-# 2. MSA CU CLUSTAL OMEGA
+# 2. MSA (CLUSTAL OMEGA SAU MOTOR INTERN)
 # ============================================================================
 
-print("\n" + "="*80)
-print("ALINIERE MULTIPLĂ CU CLUSTAL OMEGA")
-print("="*80)
 
-output_clustal = "alignment_clustalo.aln"
-output_fasta = "alignment_clustalo.fasta"
+def run_clustalo(input_file):
+    """Rulează Clustal Omega o singură dată și întoarce alinierea din memorie"""
+    from Bio.Align.Applications import ClustalOmegaCommandline  # wrapper Biopython (deprecated)
+    from Bio.Application import ApplicationError
 
-try:
-    # Rulează Clustal Omega - format Clustal
     print("\nRulează Clustal Omega...")
-    clustalo_cline = ClustalOmegaCommandline(
-        infile=input_file,
-        outfile=output_clustal,
-        outfmt="clustal",
-        verbose=True,
-        auto=True,
-        force=True
-    )
-    
-    print(f"Comandă: {clustalo_cline}")
-    stdout, stderr = clustalo_cline()
-    
-    # Salvează și în format FASTA
-    clustalo_fasta = ClustalOmegaCommandline(
-        infile=input_file,
-        outfile=output_fasta,
-        outfmt="fasta",
-        auto=True,
-        force=True
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_output = os.path.join(tmp, "clustalo.fasta")
+        clustalo_cline = ClustalOmegaCommandline(
+            infile=input_file,
+            outfile=raw_output,
+            outfmt="fasta",
+            verbose=True,
+            auto=True,
+            force=True
+        )
+
+        print(f"Comandă: {clustalo_cline}")
+        try:
+            clustalo_cline()
+        except ApplicationError as e:
+            # mesajul clustalo (stderr) ajunge în eroarea afișată de run_msa
+            raise RuntimeError(f"clustalo a eșuat (cod {e.returncode}):\n{(e.stderr or '').strip()}") from None
+        return AlignIO.read(raw_output, "fasta")
+
+
+def resolve_gaps(matrix=None, gap_open=None, gap_extend=None):
+    """Penalizările de gap efective: cele lipsă vin din default_gaps (afine -10/-1 cu matrice, liniare -2 fără)"""
+    default_open, default_extend = default_gaps(matrix)
+    return (default_open if gap_open is None else gap_open,
+            default_extend if gap_extend is None else gap_extend)
+
+
+def run_builtin(records, matrix=None, workers=1, kmer_method=None, gap_open=None, gap_extend=None):
+    """Aliniere progresivă în proces (seqtools.msa), direct pe view-urile din SequenceStore"""
+    gap_open, gap_extend = resolve_gaps(matrix, gap_open, gap_extend)
+    print(f"\nRulează MSA intern (arbore ghid k-mer + profil-profil NW, gap {gap_open}/{gap_extend}, "
+          f"{workers} proces(e))...")
+    rows = progressive_align(list(records), matrix=matrix, workers=workers, kmer_method=kmer_method,
+                             gap_open=gap_open, gap_extend=gap_extend)
+    return MultipleSeqAlignment(
+        [SeqRecord(Seq(row), id=seq_id, description="") for seq_id, row in zip(records.ids, rows)]
     )
-    clustalo_fasta()
-    
-    print(f"\n✓ Aliniere completă!")
-    print(f"✓ Format Clustal: {output_clustal}")
-    print(f"✓ Format FASTA:   {output_fasta}")
-    
-    # Afișează alinierea
+
+
+def run_msa(engine, records, input_file, matrix=None, workers=1, cache=None, kmer_method=None,
+            gap_open=None, gap_extend=None):
+    """
+    MSA cu motorul ales, o singură rulare; întoarce alinierea (MultipleSeqAlignment).
+    Același input + aceiași parametri → rezultatul vine din cache (păstrat ca FASTA aliniat).
+    """
+    title = "CLUSTAL OMEGA" if engine == "clustalo" else "MOTORUL INTERN (seqtools.msa)"
     print("\n" + "="*80)
-    print("REZULTAT ALINIERE MULTIPLĂ (MSA)")
+    print(f"ALINIERE MULTIPLĂ CU {title}")
     print("="*80)
-    with open(output_clustal, 'r') as f:
-        content = f.read()
-        print(content)
-    
-except Exception as e:
-    print(f"\n✗ Eroare la rularea Clustal Omega: {e}")
-    sys.exit(1)
+
+    if engine == "clustalo":
+        msa_key = make_key("clustalo", Path(input_file).read_bytes(), auto=True) if cache else None
+    else:
+        msa_key = make_key("msa_builtin", Path(input_file).read_bytes(), matrix=matrix, kmer_method=kmer_method,
+                           gaps=resolve_gaps(matrix, gap_open, gap_extend)) if cache else None
+    cached_msa = cache.get(msa_key) if cache else None
+
+    try:
+        if cached_msa:
+            print("\n✓ MSA găsit în cache (aceleași secvențe) — nu mai rulez alinierea")
+            return AlignIO.read(io.StringIO(cached_msa["fasta"]), "fasta")
+
+        if engine == "clustalo":
+            alignment = run_clustalo(input_file)
+        else:
+            alignment = run_builtin(records, matrix, workers, kmer_method, gap_open, gap_extend)
+        print(f"\n✓ Aliniere completă!")
+        if cache:
+            cache.set(msa_key, {"fasta": format(alignment, "fasta")})
+        return alignment
+
+    except Exception as e:
+        print(f"\n✗ Eroare la rularea alinierii multiple: {e}")
+        sys.exit(1)
+
+
+def write_alignment(alignment, formats, prefix):
+    """Scrie alinierea din memorie în toate formatele cerute; întoarce {format: fișier}"""
+    written = {}
+    for fmt in formats:
+        path = f"{prefix}.{ALIGNMENT_FORMATS[fmt][0]}"
+        AlignIO.write(alignment, path, ALIGNMENT_FORMATS[fmt][1])
+        written[fmt] = path
+        print(f"✓ Format {fmt + ':':<10} {path}")
+    return written
 
 # ============================================================================
 # 3. ANALIZĂ ALINIERE
 # ============================================================================
 
-print("\n" + "="*80)
-print("ANALIZA ALINIERII")
-print("="*80)
 
-try:
-    # Citește alinierea
-    alignment = AlignIO.read(output_clustal, "clustal")
-    
+def alignment_stats(alignment):
+    """Afișează alinierea și statistici per secvență (primele MAX_DISPLAY pentru panouri mari)"""
+    print("\n" + "="*80)
+    print("REZULTAT ALINIERE MULTIPLĂ (MSA)")
+    print("="*80)
+    if len(alignment) <= MAX_DISPLAY:
+        print(format(alignment, "clustal"))
+    else:
+        print(f"\n({len(alignment)} secvențe — alinierea completă este în fișierele de ieșire)")
+
+    print("\n" + "="*80)
+    print("ANALIZA ALINIERII")
+    print("="*80)
+
     print(f"\nNumăr secvențe aliniate: {len(alignment)}")
     print(f"Lungime aliniere: {alignment.get_alignment_length()} poziții")
-    
+
     # Calculează statistici
     print("\nStatistici per secvență:")
     print(f"{'Secvență':<50} {'Nucleotide':>10} {'Gap-uri':>10} {'% Identitate':>15}")
     print("-"*90)
-    
-    for record in alignment:
+
+    for record in alignment[:MAX_DISPLAY]:
         seq_str = str(record.seq)
         gaps = seq_str.count('-')
         nucleotides = len(seq_str) - gaps
         identity_pct = (nucleotides / len(seq_str)) * 100
         record_id = record.id[:48] if len(record.id) > 48 else record.id
         print(f"{record_id:<50} {nucleotides:>10} {gaps:>10} {identity_pct:>14.2f}%")
-    
-    # ========================================================================
-    # 4. ARBORE FILOGENETIC
-    # ========================================================================
-    
+    if len(alignment) > MAX_DISPLAY:
+        print(f"... încă {len(alignment) - MAX_DISPLAY} secvențe")
+
+# ============================================================================
+# 4. ARBORE FILOGENETIC
+# ============================================================================
+
+
+def tree_distances(alignment, records, distance="identity", kmer_method=None):
+    """
+    Matricea de distanțe pentru arbore:
+      identity - 1 - proporția pozițiilor identice din MSA (ca DistanceCalculator('identity')),
+                 calculată vectorizat pe rândurile aliniate;
+      kmer     - distanță k-mer fără aliniere (seqtools.kmer) pe secvențele originale.
+    """
+    if distance == "identity":
+        return p_distance_matrix([str(rec.seq) for rec in alignment]), "identity"
+    seqs = list(records)
+    method = kmer_method or ("shared" if len(seqs) <= SHARED_KMER_MAX_SEQS else "cosine")
+    return kmer_distance_matrix(seqs, default_k(seqs), method), f"k-mer {method}"
+
+
+def build_tree(alignment, records, tree_file, distance="identity", kmer_method=None):
+    """Matrice de distanță și arbore UPGMA (O(n^2), seqtools.phylo), salvat în Newick"""
     print("\n" + "="*80)
     print("CONSTRUCȚIE ARBORE FILOGENETIC")
     print("="*80)
-    
+
     try:
         # Calculează matrice de distanță
-        calculator = DistanceCalculator('identity')
-        dm = calculator.get_distance(alignment)
-        
-        print("\nMatrice de distanță (identity):")
-        print(dm)
-        
+        names = [rec.id for rec in alignment]
+        dist, label = tree_distances(alignment, records, distance, kmer_method)
+
+        if len(names) <= MAX_DISPLAY:
+            print(f"\nMatrice de distanță ({label}):")
+            print(to_distance_matrix(dist, names))
+        else:
+            print(f"\nMatrice de distanță ({label}): {len(names)} x {len(names)}")
+
         # Construiește arborele (UPGMA)
-        constructor = DistanceTreeConstructor(calculator, 'upgma')
-        tree = constructor.build_tree(alignment)
-        
+        tree = upgma_tree(dist, names)
+
         # Salvează arborele
-        tree_file = "phylogenetic_tree.nwk"
         Phylo.write(tree, tree_file, "newick")
         print(f"\n✓ Arbore salvat în: {tree_file}")
-        
+
         # Afișează arborele ASCII
-        print("\nArbore filogenetic (reprezentare ASCII):")
-        print("-"*80)
-        Phylo.draw_ascii(tree)
-        
+        if len(names) <= MAX_TREE_DRAW:
+            print("\nArbore filogenetic (reprezentare ASCII):")
+            print("-"*80)
+            Phylo.draw_ascii(tree)
+
     except Exception as e:
         print(f"\n⚠ Eroare la construcția arborelui: {e}")
 
-except Exception as e:
-    print(f"\n✗ Eroare la analiza alinierii: {e}")
-
 # ============================================================================
 # 5. REZUMAT
 # ============================================================================
 
-print("\n" + "="*80)
-print("REZUMAT FIȘIERE GENERATE")
-print("="*80)
-
-files_generated = [
-    (input_file, "Secvențe selectate (input)"),
-    (output_clustal, "Aliniere MSA (format Clustal)"),
-    (output_fasta, "Aliniere MSA (format FASTA)"),
-    ("phylogenetic_tree.nwk", "Arbore filogenetic (Newick)"),
-]
-
-print(f"\n{'Fișier':<35} {'Status':<10} {'Dimensiune':<15} {'Descriere'}")
-print("-"*95)
-
-for filename, description in files_generated:
-    if os.path.exists(filename):
-        size = os.path.getsize(filename)
-        size_str = f"{size} bytes" if size < 1024 else f"{size/1024:.1f} KB"
-        print(f"{filename:<35} {'✓ Există':<10} {size_str:<15} {description}")
-
-print("\n" + "="*80)
-print("✓ TASK 3 COMPLET!")
-print("="*80)
-
-print("\nFișierul principal pentru raport:")
-print(f"  📄 {output_clustal}")
-print("\nPentru a vizualiza:")
-print(f"  cat {output_clustal}")
-print(f"  cat phylogenetic_tree.nwk")
\ No newline at end of file
+
+def print_summary(files_generated, main_file, timings):
+    print("\n" + "="*80)
+    print("REZUMAT FIȘIERE GENERATE")
+    print("="*80)
+
+    print(f"\n{'Fișier':<35} {'Status':<10} {'Dimensiune':<15} {'Descriere'}")
+    print("-"*95)
+
+    for filename, description in files_generated:
+        if os.path.exists(filename):
+            size = os.path.getsize(filename)
+            size_str = f"{size} bytes" if size < 1024 else f"{size/1024:.1f} KB"
+            print(f"{filename:<35} {'✓ Există':<10} {size_str:<15} {description}")
+
+    print("\n" + "="*80)
+    print("TIMP PE ETAPE")
+    print("="*80)
+    total = sum(timings.values())
+    for stage, seconds in timings.items():
+        share = 100 * seconds / total if total else 0.0
+        print(f"{stage:<35} {seconds:>10.3f} s {share:>7.1f}%")
+    print(f"{'TOTAL':<35} {total:>10.3f} s")
+
+    print("\n" + "="*80)
+    print("✓ TASK 3 COMPLET!")
+    print("="*80)
+
+    print("\nFișierul principal pentru raport:")
+    print(f"  📄 {main_file}")
+    print("\nPentru a vizualiza:")
+    print(f"  cat {main_file}")
+    print(f"  cat phylogenetic_tree.nwk")
+
+
+def parse_formats(text):
+    formats = [f.strip().lower() for f in text.split(",") if f.strip()]
+    unknown = [f for f in formats if f not in ALIGNMENT_FORMATS]
+    if unknown or not formats:
+        raise argparse.ArgumentTypeError(
+            f"format necunoscut: {', '.join(unknown) or text!r} (disponibile: {', '.join(ALIGNMENT_FORMATS)})")
+    return formats
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Task 3 - MSA + arbore filogenetic")
+    ap.add_argument("--fasta", default=DEFAULT_FASTA, help=f"Fișier FASTA de intrare (implicit {DEFAULT_FASTA})")
+    ap.add_argument("--engine", choices=["builtin", "clustalo"], default="builtin",
+                    help="Motorul MSA: builtin (Python, offline; implicit) sau clustalo (Clustal Omega)")
+    ap.add_argument("--max_seqs", type=int, default=None,
+                    help="Număr maxim de secvențe aliniate (implicit: toate)")
+    ap.add_argument("--matrix", default=None,
+                    help="Matrice de substituție pentru motorul intern (ex. BLOSUM62 pentru proteine)")
+    ap.add_argument("--gap_open", type=int, default=None,
+                    help="Penalizarea de deschidere a unui gap (implicit -10 cu --matrix, altfel -2)")
+    ap.add_argument("--gap_extend", type=int, default=None,
+                    help="Penalizarea de extindere a unui gap (implicit -1 cu --matrix, altfel -2)")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Procese pentru motorul intern: subarborii independenți se aliniază în paralel")
+    ap.add_argument("--kmer_method", choices=KMER_METHODS, default=None,
+                    help="Distanța k-mer pentru arborele ghid / --tree_distance kmer "
+                         f"(implicit shared până la {SHARED_KMER_MAX_SEQS} secvențe, apoi cosine)")
+    ap.add_argument("--tree_distance", choices=["identity", "kmer"], default="identity",
+                    help="Distanța pentru arborele filogenetic: identity (din MSA; implicit) sau kmer (fără aliniere)")
+    ap.add_argument("--formats", type=parse_formats, default=list(ALIGNMENT_FORMATS),
+                    help="Formatele de ieșire, separate prin virgulă (implicit: clustal,fasta,phylip,stockholm)")
+    ap.add_argument("--no_cache", action="store_true", help="Nu folosi cache-ul de rezultate MSA")
+    args = ap.parse_args()
+
+    # Rulează verificarea
+    if not check_tools(args.engine):
+        sys.exit(1)
+
+    print("\n" + "="*80)
+    print(f"TASK 3 - MSA ({'CLUSTAL OMEGA' if args.engine == 'clustalo' else 'MOTOR INTERN'})")
+    print("="*80)
+
+    timings = {}
+    input_file = "selected_sequences.fasta"
+    with timed(timings, "Citire + selecție secvențe"):
+        selected = select_sequences(args.fasta, args.max_seqs, input_file)
+
+    prefix = f"alignment_{args.engine}"
+    tree_file = "phylogenetic_tree.nwk"
+
+    cache = None if args.no_cache else open_cache()
+    with timed(timings, f"MSA ({args.engine})"):
+        alignment = run_msa(args.engine, selected, input_file,
+                            matrix=args.matrix, workers=args.workers, cache=cache,
+                            kmer_method=args.kmer_method, gap_open=args.gap_open, gap_extend=args.gap_extend)
+    # Alinierea e în memorie: toate formatele se scriu din același rezultat, fără a realinia
+    with timed(timings, "Scriere formate"):
+        written = write_alignment(alignment, args.formats, prefix)
+    with timed(timings, "Statistici aliniere"):
+        alignment_stats(alignment)
+    with timed(timings, "Arbore filogenetic"):
+        build_tree(alignment, selected, tree_file, args.tree_distance, args.kmer_method)
+
+    files = [(input_file, "Secvențe selectate (input)")]
+    files += [(path, f"Aliniere MSA (format {fmt})") for fmt, path in written.items()]
+    files.append((tree_file, "Arbore filogenetic (Newick)"))
+    print_summary(files, next(iter(written.values())), timings)
+
+
+if __name__ == "__main__":
+    main()
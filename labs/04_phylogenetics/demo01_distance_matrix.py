@@ -3,23 +3,39 @@ Demo 1 — Distance Matrix
 Calculate pairwise distances (Hamming / p-distance) from a multi-FASTA file.
 """
 
-from Bio import SeqIO
+from pathlib import Path
+import sys
+
 import numpy as np
 
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from seqtools.distance import p_distance_matrix
+from seqtools.scoring import encode
+from seqtools.seqstore import load_fasta
+
 def hamming_distance(seq1, seq2):
-    return sum(a != b for a, b in zip(seq1, seq2))
+    L = min(len(seq1), len(seq2))  # like zip(): compare the common prefix
+    return int(np.count_nonzero(encode(seq1[:L]) != encode(seq2[:L])))
 
 if __name__ == "__main__":
     fasta = "data/sample/tp53_dna_multi.fasta"
-    records = list(SeqIO.parse(fasta, "fasta"))
+    records = load_fasta(fasta)  # one uint8 buffer; each sequence is a view into it
     n = len(records)
-    matrix = np.zeros((n, n))
+    seqs = list(records)
 
-    for i in range(n):
-        for j in range(i + 1, n):
-            d = hamming_distance(str(records[i].seq), str(records[j].seq))
-            p_dist = d / len(records[i].seq)
-            matrix[i, j] = matrix[j, i] = p_dist
+    if len({len(s) for s in seqs}) == 1:
+        # Equal lengths (aligned input): whole matrix from one vectorised kernel
+        matrix = p_distance_matrix(seqs)
+    else:
+        matrix = np.zeros((n, n))
+        for i in range(n):
+            for j in range(i + 1, n):
+                d = hamming_distance(seqs[i], seqs[j])
+                p_dist = d / len(seqs[i])
+                matrix[i, j] = matrix[j, i] = p_dist
 
-    print("Sequences:", [rec.id for rec in records])
+    print("Sequences:", records.ids)
     print("Distance matrix:\n", matrix)
@@ -23,6 +23,8 @@ if __name__ == "__main__":
     # Exemplu (decomentați după ce înlocuiți <handle>):
 
     # TODO 2: Calculați matricea de distanțe
+    # (Pentru sute/mii de secvențe fără aliniere: seqtools.kmer.kmer_distance_matrix(seqs, k, "cosine")
+    #  + seqtools.phylo.to_distance_matrix(dist, names) dau un DistanceMatrix pentru DistanceTreeConstructor.)
 
     # TODO 3: Construiți arborele NJ
 
@@ -0,0 +1 @@
+# Makes `seqtools` importable as a package.
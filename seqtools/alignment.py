@@ -0,0 +1,262 @@
+"""Compact pairwise alignment result shared by the Lab 02 engines and the Biopython wrappers."""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from .cigar import DELETE, INSERT, MATCH, MISMATCH, render
+from .scoring import SeqLike, as_sequence, decode, encode
+
+__all__ = ["AlignmentResult", "pairwise_aligner", "biopython_align"]
+
+ALIGNED = "M"  # aligned pair whose identity is not recorded in the op (Biopython coordinates)
+
+_CODE = {op: ord(op) for op in (MATCH, MISMATCH, INSERT, DELETE, ALIGNED)}
+_PAIR_CODES = np.array([_CODE[MATCH], _CODE[MISMATCH], _CODE[ALIGNED]], dtype=np.uint8)
+_SEQ1_CODES = np.array([_CODE[MATCH], _CODE[MISMATCH], _CODE[ALIGNED], _CODE[INSERT]], dtype=np.uint8)
+_SEQ2_CODES = np.array([_CODE[MATCH], _CODE[MISMATCH], _CODE[ALIGNED], _CODE[DELETE]], dtype=np.uint8)
+
+
+class AlignmentResult:
+    """
+    One pairwise alignment as a run-length op array plus the two input sequences.
+
+    `codes` holds one op per run (ASCII of "=", "X", "I", "D", or "M" when the
+    source does not say whether a pair matches) and `lengths` the run lengths.
+    Identity, p-distance, gap counts and coordinates are computed from these
+    arrays with NumPy; the gapped strings are only built (once) when asked for.
+
+    For compatibility with the old `(align1, align2, score)` tuples, a result
+    unpacks and indexes like that tuple.
+    """
+
+    __slots__ = ("seq1", "seq2", "score", "codes", "lengths", "start1", "start2", "_aligned", "_stats")
+
+    def __init__(self, seq1: SeqLike, seq2: SeqLike, score, codes: np.ndarray, lengths: np.ndarray,
+                 start1: int = 0, start2: int = 0):
+        self.seq1 = seq1
+        self.seq2 = seq2
+        self.score = score
+        self.codes = np.asarray(codes, dtype=np.uint8)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.start1 = int(start1)
+        self.start2 = int(start2)
+        self._aligned: Optional[Tuple[str, str]] = None
+        self._stats: Optional[Tuple[int, int]] = None
+
+    # ---------- construction ----------
+
+    @classmethod
+    def from_ops(cls, ops: Iterable[Tuple[str, int]], seq1: str, seq2: str, score,
+                 start: Tuple[int, int] = (0, 0)) -> "AlignmentResult":
+        """From a seqtools.cigar op list, e.g. the output of seqtools.traceback.traceback_linear."""
+        ops = list(ops)
+        codes = np.fromiter((_CODE[op] for op, _ in ops), dtype=np.uint8, count=len(ops))
+        lengths = np.fromiter((n for _, n in ops), dtype=np.int64, count=len(ops))
+        return cls(seq1, seq2, score, codes, lengths, *start)
+
+    @classmethod
+    def from_biopython(cls, alignment) -> "AlignmentResult":
+        """From a Bio.Align.Alignment (e.g. PairwiseAligner.align(...)[0]), via its coordinates."""
+        coords = np.asarray(alignment.coordinates, dtype=np.int64)
+        steps = np.diff(coords, axis=1)
+        if (steps < 0).any():
+            raise ValueError("Reverse-strand alignments are not supported")
+        d1, d2 = steps
+        if ((d1 > 0) & (d2 > 0) & (d1 != d2)).any():
+            raise ValueError("Inconsistent alignment coordinates")
+        keep = (d1 > 0) | (d2 > 0)
+        d1, d2 = d1[keep], d2[keep]
+        codes = np.where(d2 == 0, _CODE[INSERT], np.where(d1 == 0, _CODE[DELETE], _CODE[ALIGNED]))
+        lengths = np.maximum(d1, d2)
+        score = alignment.score
+        if float(score).is_integer():
+            score = int(score)
+        return cls(as_sequence(alignment.target), as_sequence(alignment.query), score, codes, lengths,
+                   int(coords[0, 0]), int(coords[1, 0]))
+
+    def to_dict(self) -> dict:
+        """JSON-serialisable form (the sequences are left out), e.g. for seqtools.cache."""
+        return {"score": self.score, "codes": self.codes.tobytes().decode("ascii"),
+                "lengths": self.lengths.tolist(), "start": [self.start1, self.start2]}
+
+    @classmethod
+    def from_dict(cls, data: dict, seq1: str, seq2: str) -> "AlignmentResult":
+        """Inverse of to_dict(), given the same two sequences."""
+        codes = np.frombuffer(data["codes"].encode("ascii"), dtype=np.uint8)
+        return cls(seq1, seq2, data["score"], codes, data["lengths"], *data["start"])
+
+    # ---------- tuple compatibility ----------
+
+    def __iter__(self):
+        align1, align2 = self.aligned
+        return iter((align1, align2, self.score))
+
+    def __getitem__(self, k):
+        return tuple(self)[k]
+
+    def __len__(self) -> int:
+        return 3
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (AlignmentResult, tuple)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return (f"AlignmentResult(score={self.score}, cigar={self.cigar!r}, "
+                f"seq1[{self.start1}:{self.end1}], seq2[{self.start2}:{self.end2}])")
+
+    # ---------- lazy views ----------
+
+    @property
+    def ops(self):
+        return [(chr(c), int(n)) for c, n in zip(self.codes, self.lengths)]
+
+    @property
+    def cigar(self) -> str:
+        return "".join(f"{n}{chr(c)}" for c, n in zip(self.codes, self.lengths))
+
+    @property
+    def aligned(self) -> Tuple[str, str]:
+        """The two gapped strings, built on first use."""
+        if self._aligned is None:
+            self._aligned = render(self.ops, decode(self.seq1), decode(self.seq2), self.start1, self.start2)
+        return self._aligned
+
+    def format(self, width: int = 60) -> str:
+        """
+        Text view in the style of pairwise2.format_alignment: seq1, a match line
+        ("|" identical, "." mismatch, " " gap), seq2, in blocks of `width` columns
+        with 1-based start / end positions, then the score.
+        """
+        align1, align2 = self.aligned
+        label = len(str(max(self.end1, self.end2, 1)))
+        pos1, pos2 = self.start1, self.start2
+        blocks = []
+        for c0 in range(0, len(align1), width):
+            a, b = align1[c0:c0 + width], align2[c0:c0 + width]
+            bar = "".join(" " if "-" in (x, y) else "|" if x == y else "." for x, y in zip(a, b))
+            n1, n2 = len(a) - a.count("-"), len(b) - b.count("-")
+            blocks.append(f"{pos1 + 1:>{label}} {a} {pos1 + n1}\n"
+                          f"{'':>{label}} {bar}\n"
+                          f"{pos2 + 1:>{label}} {b} {pos2 + n2}")
+            pos1, pos2 = pos1 + n1, pos2 + n2
+        blocks.append(f"  Score={self.score}")
+        return "\n\n".join(blocks)
+
+    # ---------- vectorised statistics ----------
+
+    def _consumed(self, which: np.ndarray) -> np.ndarray:
+        return np.where(np.isin(self.codes, which), self.lengths, 0)
+
+    @property
+    def coordinates(self) -> np.ndarray:
+        """2 x (runs + 1) array of run boundaries in seq1 / seq2, like Bio.Align.Alignment.coordinates."""
+        c1 = np.concatenate([[0], np.cumsum(self._consumed(_SEQ1_CODES))]) + self.start1
+        c2 = np.concatenate([[0], np.cumsum(self._consumed(_SEQ2_CODES))]) + self.start2
+        return np.vstack([c1, c2])
+
+    @property
+    def end1(self) -> int:
+        return self.start1 + int(self._consumed(_SEQ1_CODES).sum())
+
+    @property
+    def end2(self) -> int:
+        return self.start2 + int(self._consumed(_SEQ2_CODES).sum())
+
+    def aligned_positions(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices into seq1 and seq2 of every gap-free column."""
+        coords = self.coordinates
+        pair = np.isin(self.codes, _PAIR_CODES)
+        lens = self.lengths[pair]
+        if not lens.size:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        offsets = np.repeat(np.cumsum(lens) - lens, lens)
+        step = np.arange(int(lens.sum()), dtype=np.int64) - offsets
+        return np.repeat(coords[0, :-1][pair], lens) + step, np.repeat(coords[1, :-1][pair], lens) + step
+
+    def _counts(self) -> Tuple[int, int]:
+        if self._stats is None:
+            if np.isin(self.codes, [_CODE[ALIGNED]]).any():
+                i, j = self.aligned_positions()
+                mismatches = int(np.count_nonzero(encode(self.seq1)[i] != encode(self.seq2)[j]))
+                aligned = len(i)
+            else:
+                mismatches = int(self._consumed(np.array([_CODE[MISMATCH]], np.uint8)).sum())
+                aligned = int(self._consumed(_PAIR_CODES).sum())
+            self._stats = (aligned - mismatches, mismatches)
+        return self._stats
+
+    @property
+    def matches(self) -> int:
+        return self._counts()[0]
+
+    @property
+    def mismatches(self) -> int:
+        return self._counts()[1]
+
+    @property
+    def length(self) -> int:
+        """Number of alignment columns (gaps included)."""
+        return int(self.lengths.sum())
+
+    @property
+    def gaps(self) -> int:
+        """Gap columns (in either sequence)."""
+        return self.length - self.matches - self.mismatches
+
+    @property
+    def gap_opens(self) -> int:
+        """Number of gap runs; a run of INSERT next to a run of DELETE counts twice."""
+        return int(np.count_nonzero(np.isin(self.codes, [_CODE[INSERT], _CODE[DELETE]])))
+
+    @property
+    def identity(self) -> float:
+        """Identical columns / all columns."""
+        return self.matches / self.length if self.length else 0.0
+
+    @property
+    def p_distance(self) -> float:
+        """Mismatches / gap-free columns (gapped columns are ignored)."""
+        aligned = self.matches + self.mismatches
+        return self.mismatches / aligned if aligned else 0.0
+
+
+def pairwise_aligner(mode: str = "global", match=1, mismatch=-1, gap=-2, gap_open=None, gap_extend=None,
+                     matrix: Optional[str] = None, end_gap=None):
+    """
+    A Bio.Align.PairwiseAligner with the same scoring knobs as the Lab 02 engines.
+    `end_gap` overrides the score of terminal gaps (0 = free end gaps, as in task1).
+    """
+    from Bio import Align
+    from Bio.Align import substitution_matrices
+
+    aligner = Align.PairwiseAligner()
+    aligner.mode = mode
+    if matrix:
+        aligner.substitution_matrix = substitution_matrices.load(matrix.upper())
+    else:
+        aligner.match_score = match
+        aligner.mismatch_score = mismatch
+    aligner.open_gap_score = gap if gap_open is None else gap_open
+    aligner.extend_gap_score = gap if gap_extend is None else gap_extend
+    if end_gap is not None:
+        aligner.end_gap_score = end_gap
+    return aligner
+
+
+def biopython_align(seq1: str, seq2: str, mode: str = "global", aligner=None, **scoring) -> AlignmentResult:
+    """
+    First optimal alignment from PairwiseAligner, as an AlignmentResult (same type as the
+    custom engines). Only that one alignment is generated: len() on the result would
+    count every co-optimal path, which can be astronomically many.
+    """
+    aligner = aligner or pairwise_aligner(mode, **scoring)
+    best = next(iter(aligner.align(seq1, seq2)), None)
+    if best is None:  # local mode with no positive-scoring pair
+        return AlignmentResult(as_sequence(seq1), as_sequence(seq2), 0, [], [])
+    return AlignmentResult.from_biopython(best)
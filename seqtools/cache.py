@@ -0,0 +1,159 @@
+"""On-disk, content-addressed result cache (SQLite) shared by the lab scripts."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+__all__ = ["DEFAULT_CACHE_PATH", "DEFAULT_MAX_BYTES", "ResultCache", "make_key", "aligner_params", "open_cache"]
+
+# Override with SEQTOOLS_CACHE=/path/to/cache.sqlite, or SEQTOOLS_CACHE=off to disable.
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "seqtools" / "cache.sqlite"
+DEFAULT_MAX_BYTES = 256 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key      TEXT PRIMARY KEY,
+    value    BLOB NOT NULL,
+    size     INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+def make_key(namespace: str, *parts: Union[str, bytes], **params: Any) -> str:
+    """
+    sha256 over a namespace, the raw inputs (sequences, file contents) and the
+    parameters that affect the result. Parts are length-prefixed, so ("AB", "C")
+    and ("A", "BC") hash differently; params are hashed as sorted JSON.
+    """
+    h = hashlib.sha256(namespace.encode())
+    for part in parts:
+        data = part.encode() if isinstance(part, str) else bytes(part)
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def aligner_params(aligner) -> dict:
+    """The scoring settings of a Bio.Align.PairwiseAligner, for use in cache keys."""
+    matrix = aligner.substitution_matrix
+    return {
+        "mode": aligner.mode,
+        "match": aligner.match_score if matrix is None else None,
+        "mismatch": aligner.mismatch_score if matrix is None else None,
+        "matrix": None if matrix is None else str(matrix),
+        "gaps": [aligner.target_internal_open_gap_score, aligner.target_internal_extend_gap_score,
+                 aligner.target_left_open_gap_score, aligner.target_left_extend_gap_score,
+                 aligner.target_right_open_gap_score, aligner.target_right_extend_gap_score,
+                 aligner.query_internal_open_gap_score, aligner.query_internal_extend_gap_score,
+                 aligner.query_left_open_gap_score, aligner.query_left_extend_gap_score,
+                 aligner.query_right_open_gap_score, aligner.query_right_extend_gap_score],
+    }
+
+
+class ResultCache:
+    """
+    Key -> JSON value store in a single SQLite file, bounded by `max_bytes`.
+
+    Reads refresh an entry's access time; when the stored values outgrow the
+    budget, the least recently used entries are evicted. Several processes can
+    share one file (WAL mode); each process opens its own connection lazily,
+    so a cache object can be handed to a fork()ed worker pool. Threads may share
+    a cache object as long as they take turns (e.g. behind a lock).
+    """
+
+    _MISSING = object()
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._total = 0  # bytes stored, as last seen by this process
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_conn"] = state["_pid"] = None
+        return state
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self.conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        data = json.dumps(value).encode()
+        old = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        self.conn.execute("INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                          (key, data, len(data), time.time()))
+        self._total += len(data) - (old[0] if old else 0)  # a replaced value frees its old size
+        if self._total > self.max_bytes:
+            self._evict()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def _evict(self) -> None:
+        # Other processes may have written too: recount, then drop LRU entries down to 90% of the budget
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        excess = total - int(self.max_bytes * 0.9)
+        freed = 0
+        doomed = []
+        if excess > 0:
+            for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+                doomed.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            self.conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        self._total = total - freed
+
+    def clear(self) -> None:
+        self.conn.execute("DELETE FROM entries")
+        self._total = 0
+
+    def close(self) -> None:
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = self._pid = None
+
+
+def open_cache(path: Union[str, Path, None] = None, max_bytes: int = DEFAULT_MAX_BYTES) -> Optional[ResultCache]:
+    """
+    Cache at `path`, else $SEQTOOLS_CACHE, else DEFAULT_CACHE_PATH.
+    Returns None when caching is switched off (path or $SEQTOOLS_CACHE set to "off").
+    """
+    path = path or os.environ.get("SEQTOOLS_CACHE") or DEFAULT_CACHE_PATH
+    if str(path).lower() in ("off", "0", "none", ""):
+        return None
+    return ResultCache(path, max_bytes=max_bytes)
@@ -0,0 +1,99 @@
+"""Run-length alignment operations (extended CIGAR) and lazy rendering of aligned strings."""
+
+from __future__ import annotations
+
+import re
+from itertools import groupby
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+__all__ = ["MATCH", "MISMATCH", "INSERT", "DELETE", "Ops", "from_steps", "concat", "swap",
+           "render", "cigar_string", "parse_cigar", "op_counts", "identity", "p_distance"]
+
+# One column of the alignment, seen from seq1:
+MATCH = "="     # seq1[i] aligned to an identical seq2[j]
+MISMATCH = "X"  # seq1[i] aligned to a different seq2[j]
+INSERT = "I"    # seq1[i] against a gap
+DELETE = "D"    # a gap against seq2[j]
+
+Ops = List[Tuple[str, int]]
+
+
+def from_steps(steps: Sequence[str], reverse: bool = True) -> Ops:
+    """
+    Run-length encode one op character per alignment column. Tracebacks walk from the
+    end of the alignment, so by default `steps` is read back to front.
+    """
+    it = reversed(steps) if reverse else steps
+    return [(op, sum(1 for _ in run)) for op, run in groupby(it)]
+
+
+def concat(*parts: Ops) -> Ops:
+    """Join op lists, merging a run that continues across a boundary."""
+    out: Ops = []
+    for part in parts:
+        for op, n in part:
+            if n <= 0:
+                continue
+            if out and out[-1][0] == op:
+                out[-1] = (op, out[-1][1] + n)
+            else:
+                out.append((op, n))
+    return out
+
+
+def swap(ops: Ops) -> Ops:
+    """The same alignment with seq1 and seq2 exchanged (I <-> D)."""
+    flip = {INSERT: DELETE, DELETE: INSERT}
+    return [(flip.get(op, op), n) for op, n in ops]
+
+
+def render(ops: Iterable[Tuple[str, int]], seq1: str, seq2: str, start1: int = 0, start2: int = 0) -> Tuple[str, str]:
+    """
+    Build the two gapped strings, one slice per run: O(alignment length) overall.
+    `start1`/`start2` are the 0-based offsets where the alignment begins (local alignments).
+    """
+    parts1, parts2 = [], []
+    i, j = start1, start2
+    for op, n in ops:
+        if op == INSERT:
+            parts1.append(seq1[i:i + n]); parts2.append("-" * n)
+            i += n
+        elif op == DELETE:
+            parts1.append("-" * n); parts2.append(seq2[j:j + n])
+            j += n
+        else:
+            parts1.append(seq1[i:i + n]); parts2.append(seq2[j:j + n])
+            i += n; j += n
+    return "".join(parts1), "".join(parts2)
+
+
+def cigar_string(ops: Iterable[Tuple[str, int]]) -> str:
+    return "".join(f"{n}{op}" for op, n in ops)
+
+
+def parse_cigar(text: str) -> Ops:
+    ops = [(op, int(n)) for n, op in re.findall(r"(\d+)([=XID])", text)]
+    if cigar_string(ops) != text:
+        raise ValueError(f"Not an extended CIGAR string: {text!r}")
+    return ops
+
+
+def op_counts(ops: Iterable[Tuple[str, int]]) -> Dict[str, int]:
+    counts = {MATCH: 0, MISMATCH: 0, INSERT: 0, DELETE: 0}
+    for op, n in ops:
+        counts[op] += n
+    return counts
+
+
+def identity(ops: Iterable[Tuple[str, int]]) -> float:
+    """Identical columns / all columns (gaps included)."""
+    c = op_counts(ops)
+    columns = sum(c.values())
+    return c[MATCH] / columns if columns else 0.0
+
+
+def p_distance(ops: Iterable[Tuple[str, int]]) -> float:
+    """Mismatches / aligned (gap-free) columns, as in task1.p_distance_aligned."""
+    c = op_counts(ops)
+    aligned = c[MATCH] + c[MISMATCH]
+    return c[MISMATCH] / aligned if aligned else 0.0
@@ -0,0 +1,346 @@
+"""
+Nucleotide composition of FASTA records in one vectorised pass.
+
+np.bincount over the raw bytes gives a 256-bin byte histogram, and a 256-entry lookup
+table folds it into residue class codes (A, C, G, T/U, N, other IUPAC ambiguity, gap,
+other, each split by case for soft-masking; whitespace is dropped). That is one
+counting pass over the data, with no per-byte translation. GC, AT, N, ambiguity and
+soft-mask fractions all come from those counts:
+
+    gc, at           over unambiguous bases (A + C + G + T)
+    n, ambiguous,    over all residues (whitespace excluded)
+    soft_masked, gap
+
+fasta_composition() streams the file (seqtools.seqstore.stream_fasta), so memory
+stays O(chunk) whatever the genome size.
+
+Sliding windows (gc_windows / fasta_gc_windows) use cumulative sums of the G, C and
+A+C+G+T indicators: every window is two lookups in each prefix array, so the cost is
+O(length + windows) for any window / step. Per window:
+
+    gc      (G + C) / (A + C + G + T)
+    skew    (G - C) / (G + C)
+"""
+
+from __future__ import annotations
+
+import itertools
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, TextIO, Tuple, Union
+
+import numpy as np
+
+from .scoring import SeqLike, encode
+from .seqstore import DEFAULT_CHUNK_SIZE, SequenceStore, stream_fasta
+
+__all__ = ["CLASSES", "Composition", "residue_counts", "sequence_composition", "fasta_composition",
+           "GCWindows", "gc_windows", "fasta_gc_windows", "write_bedgraph"]
+
+CLASSES = ("A", "C", "G", "T", "N", "ambiguous", "gap", "other")
+_A, _C, _G, _T, _N, _AMBIGUOUS, _GAP, _OTHER = range(len(CLASSES))
+
+# code = 2 * class + (1 if lower-case); whitespace gets its own code and is not counted
+_N_CODES = 2 * len(CLASSES) + 1
+_IGNORED = _N_CODES - 1
+
+_CODE = np.full(256, 2 * _OTHER, dtype=np.uint8)
+for _chars, _cls in [("A", _A), ("C", _C), ("G", _G), ("TU", _T), ("N", _N), ("RYKMSWBDHV", _AMBIGUOUS)]:
+    for _ch in _chars:
+        _CODE[ord(_ch)] = 2 * _cls
+        _CODE[ord(_ch.lower())] = 2 * _cls + 1
+for _ch in "-.":
+    _CODE[ord(_ch)] = 2 * _GAP
+for _ch in " \t\r\n\v\f":
+    _CODE[ord(_ch)] = _IGNORED
+
+# Upper bound on residues per vectorised batch of records (one int64 key per residue)
+_BATCH_RESIDUES = 1 << 22
+
+
+# The lookup table as a (256, 17) one-hot matrix: byte histogram @ _FOLD = class code counts
+_FOLD = np.eye(_N_CODES, dtype=np.int64)[_CODE]
+
+
+def _fold(byte_counts: np.ndarray) -> np.ndarray:
+    """(..., 256) byte histograms -> (..., 17) class code counts."""
+    return np.asarray(byte_counts, dtype=np.int64) @ _FOLD
+
+
+def residue_counts(seq: SeqLike) -> np.ndarray:
+    """Class code counts of one sequence: (17,) int64, see the module docstring."""
+    return _fold(np.bincount(encode(seq), minlength=256))
+
+
+def _store_counts(store: SequenceStore) -> np.ndarray:
+    """(n, 17) code counts for every record, one bincount per batch of records."""
+    n = len(store)
+    out = np.zeros((n, 256), dtype=np.int64)
+    lengths = store.lengths
+    r0 = 0
+    while r0 < n:
+        # records [r0, r1) with about _BATCH_RESIDUES residues (at least one record)
+        r1 = max(r0 + 1, int(np.searchsorted(store.offsets, store.offsets[r0] + _BATCH_RESIDUES, "right")) - 1)
+        r1 = min(r1, n)
+        data = store.data[store.offsets[r0]:store.offsets[r1]]
+        if r1 - r0 == 1:
+            out[r0] = np.bincount(data, minlength=256)
+        else:
+            rows = np.repeat(np.arange(r1 - r0, dtype=np.int64), lengths[r0:r1])
+            out[r0:r1] = np.bincount((rows << 8) | data, minlength=(r1 - r0) * 256).reshape(r1 - r0, 256)
+        r0 = r1
+    return _fold(out)
+
+
+class Composition:
+    """
+    Residue class counts of a set of records (`counts`, (n, 8) int64, columns in
+    CLASSES order) and their soft-masked (lower-case) share (`soft_masked_counts`).
+    The fraction properties are (n,) float64 arrays; 0.0 where the denominator is 0.
+    """
+
+    __slots__ = ("ids", "counts", "soft_masked_counts")
+
+    def __init__(self, ids: Sequence[str], code_counts: np.ndarray):
+        code_counts = np.asarray(code_counts, dtype=np.int64).reshape(-1, _N_CODES)
+        by_case = code_counts[:, :_IGNORED].reshape(-1, len(CLASSES), 2)
+        self.ids = list(ids)
+        self.counts = by_case.sum(axis=2)
+        self.soft_masked_counts = by_case[:, :, 1].sum(axis=1)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __repr__(self) -> str:
+        return f"Composition({len(self)} records, {int(self.lengths.sum())} residues)"
+
+    @staticmethod
+    def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+        return np.divide(num, den, out=np.zeros(len(num), dtype=np.float64), where=den > 0)
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return self.counts.sum(axis=1)
+
+    @property
+    def acgt(self) -> np.ndarray:
+        return self.counts[:, [_A, _C, _G, _T]].sum(axis=1)
+
+    @property
+    def gc(self) -> np.ndarray:
+        return self._ratio(self.counts[:, _C] + self.counts[:, _G], self.acgt)
+
+    @property
+    def at(self) -> np.ndarray:
+        return self._ratio(self.counts[:, _A] + self.counts[:, _T], self.acgt)
+
+    @property
+    def n(self) -> np.ndarray:
+        return self._ratio(self.counts[:, _N], self.lengths)
+
+    @property
+    def ambiguous(self) -> np.ndarray:
+        return self._ratio(self.counts[:, _AMBIGUOUS], self.lengths)
+
+    @property
+    def soft_masked(self) -> np.ndarray:
+        return self._ratio(self.soft_masked_counts, self.lengths)
+
+    @property
+    def gap(self) -> np.ndarray:
+        return self._ratio(self.counts[:, _GAP], self.lengths)
+
+    def rows(self) -> List[Dict[str, Union[str, int, float]]]:
+        """One dict per record (id, length and every fraction), e.g. for csv.DictWriter."""
+        columns = {"length": self.lengths, "gc": self.gc, "at": self.at, "n": self.n,
+                   "ambiguous": self.ambiguous, "soft_masked": self.soft_masked, "gap": self.gap}
+        return [{"id": seq_id, **{k: v[i].item() for k, v in columns.items()}} for i, seq_id in enumerate(self.ids)]
+
+
+def sequence_composition(seqs: Union[SequenceStore, Sequence[SeqLike]], ids: Sequence[str] = None) -> Composition:
+    """Composition of in-memory sequences; a SequenceStore is counted straight from its buffer."""
+    if isinstance(seqs, SequenceStore):
+        return Composition(seqs.ids if ids is None else ids, _store_counts(seqs))
+    counts = np.array([residue_counts(s) for s in seqs], dtype=np.int64).reshape(-1, _N_CODES)
+    return Composition([str(k) for k in range(len(counts))] if ids is None else ids, counts)
+
+
+def fasta_composition(path: Union[str, Path], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Composition:
+    """Composition of every record of a FASTA (or .gz) file, read `chunk_size` bytes at a time."""
+    ids: List[str] = []
+    rows: List[np.ndarray] = []
+    for index, header, block in stream_fasta(path, chunk_size, strip=False):  # line breaks fold to "ignored"
+        if index == len(rows):
+            ids.append((header.split(None, 1) or [""])[0])
+            rows.append(np.zeros(256, dtype=np.int64))
+        if block.size:
+            rows[index] += np.bincount(block, minlength=256)
+    return Composition(ids, _fold(np.array(rows, dtype=np.int64).reshape(-1, 256)))
+
+
+# Per-byte G, C and A+C+G+T indicators (case-insensitive), stacked for one cumsum pass
+_GC_ACGT = np.zeros((256, 3), dtype=np.int8)
+for _ch in "Gg":
+    _GC_ACGT[ord(_ch)] = (1, 0, 1)
+for _ch in "Cc":
+    _GC_ACGT[ord(_ch)] = (0, 1, 1)
+for _ch in "AaTtUu":
+    _GC_ACGT[ord(_ch)] = (0, 0, 1)
+
+
+class GCWindows:
+    """
+    A batch of windows of one record: 0-based half-open [starts, ends) and the G, C and
+    A+C+G+T counts inside each. `gc` and `skew` are 0.0 where their denominator is 0
+    (`called` tells those windows apart).
+    """
+
+    __slots__ = ("chrom", "starts", "ends", "g", "c", "acgt")
+
+    def __init__(self, chrom: str, starts: np.ndarray, ends: np.ndarray, counts: np.ndarray):
+        self.chrom = chrom
+        self.starts = starts
+        self.ends = ends
+        self.g, self.c, self.acgt = np.asarray(counts, dtype=np.int64).reshape(-1, 3).T
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __repr__(self) -> str:
+        return f"GCWindows({self.chrom!r}, {len(self)} windows)"
+
+    @property
+    def gc(self) -> np.ndarray:
+        return Composition._ratio(self.g + self.c, self.acgt)
+
+    @property
+    def skew(self) -> np.ndarray:
+        return Composition._ratio(self.g - self.c, self.g + self.c)
+
+    def called(self, value: str = "gc") -> np.ndarray:
+        """Mask of windows where `value` ("gc" or "skew") is defined (non-zero denominator)."""
+        return (self.acgt if value == "gc" else self.g + self.c) > 0
+
+
+def _window_starts(first: int, limit: int, step: int) -> np.ndarray:
+    """Window starts first, first + step, ... below `limit` (empty if first >= limit)."""
+    return np.arange(first, max(first, limit), step, dtype=np.int64)
+
+
+class _PrefixCounts:
+    """
+    Running prefix sums of the (G, C, ACGT) indicators of one record, fed block by
+    block; only the part from the next window start onwards is kept.
+    """
+
+    def __init__(self, window: int, step: int):
+        self.window, self.step = window, step
+        self.base = 0            # record position of prefix[0]
+        self.prefix = np.zeros((1, 3), dtype=np.int64)
+        self.next_start = 0
+
+    @property
+    def end(self) -> int:
+        return self.base + len(self.prefix) - 1
+
+    def feed(self, block: np.ndarray) -> None:
+        steps = np.cumsum(_GC_ACGT[block], axis=0, dtype=np.int64)
+        self.prefix = np.concatenate([self.prefix, steps + self.prefix[-1]])
+
+    def emit(self, final: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Windows not emitted yet that fit in what has been fed (with `final`, clipped at the end)."""
+        last = self.end if final else self.end - self.window + 1
+        starts = _window_starts(self.next_start, last, self.step)
+        ends = np.minimum(starts + self.window, self.end)
+        counts = self.prefix[ends - self.base] - self.prefix[starts - self.base]
+        if starts.size:
+            self.next_start = int(starts[-1]) + self.step
+        keep_from = min(self.next_start, self.end) - self.base
+        self.prefix = self.prefix[keep_from:]
+        self.base += keep_from
+        return starts, ends, counts
+
+
+# Residues per prefix-sum update (the (n, 3) int64 prefix array is 24 bytes per residue)
+_WINDOW_BATCH = 1 << 20
+
+
+def _record_windows(chrom: str, blocks: Iterable[np.ndarray], window: int, step: int) -> Iterator[GCWindows]:
+    """Windows of one record whose residues arrive as consecutive blocks."""
+    prefix = _PrefixCounts(window, step)
+    for block in blocks:
+        for k in range(0, len(block), _WINDOW_BATCH):
+            prefix.feed(block[k:k + _WINDOW_BATCH])
+            batch = GCWindows(chrom, *prefix.emit())
+            if len(batch):
+                yield batch
+    batch = GCWindows(chrom, *prefix.emit(final=True))
+    if len(batch):
+        yield batch
+
+
+def gc_windows(seq: SeqLike, window: int, step: Optional[int] = None, chrom: str = "") -> GCWindows:
+    """
+    GC / skew windows of one in-memory sequence; `step` defaults to `window`
+    (adjacent windows). Windows near the end are clipped to the sequence, as in
+    `bedtools makewindows`.
+    """
+    step = window if step is None else step
+    _check_window(window, step)
+    batches = list(_record_windows(chrom, [encode(seq)], window, step))
+    if not batches:
+        return GCWindows(chrom, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros((0, 3)))
+    return GCWindows(chrom, np.concatenate([b.starts for b in batches]), np.concatenate([b.ends for b in batches]),
+                     np.concatenate([np.stack([b.g, b.c, b.acgt], axis=1) for b in batches]))
+
+
+def fasta_gc_windows(path: Union[str, Path], window: int, step: Optional[int] = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[GCWindows]:
+    """
+    GC / skew windows of every record of a FASTA (or .gz) file, streamed: the file is
+    read `chunk_size` bytes at a time and windows are yielded in batches as soon as
+    they are complete, so neither the sequence nor all of its windows are held in
+    memory. Batches follow file order; `chrom` is the record id.
+    """
+    step = window if step is None else step
+    _check_window(window, step)
+    records = itertools.groupby(stream_fasta(path, chunk_size), key=lambda item: (item[0], item[1]))
+    for (_, header), items in records:
+        chrom = (header.split(None, 1) or [""])[0]
+        yield from _record_windows(chrom, (block for _, _, block in items), window, step)
+
+
+def _check_window(window: int, step: int) -> None:
+    if window < 1 or step < 1:
+        raise ValueError(f"window and step must be positive (got window={window}, step={step})")
+
+
+def _bedgraph_lines(batch: GCWindows, value: str, precision: int) -> str:
+    mask = batch.called(value)
+    values = getattr(batch, value)[mask]
+    return "".join(f"{batch.chrom}\t{s}\t{e}\t{v:.{precision}f}\n"
+                   for s, e, v in zip(batch.starts[mask].tolist(), batch.ends[mask].tolist(), values.tolist()))
+
+
+def write_bedgraph(windows: Iterable[GCWindows], paths: Mapping[str, Union[str, Path]],
+                   precision: int = 4) -> int:
+    """
+    Write the windows as bedGraph tracks in one pass, e.g. paths={"gc": "x.gc.bedgraph",
+    "skew": "x.skew.bedgraph"}. Windows without called bases (all N) are left out of
+    the gc track, windows without G/C out of the skew track. Returns the window count.
+    """
+    handles: Dict[str, TextIO] = {}
+    total = 0
+    try:
+        for value, path in paths.items():
+            if value not in ("gc", "skew"):
+                raise ValueError(f"Unknown bedGraph value {value!r} (expected 'gc' or 'skew')")
+            handles[value] = open(path, "w", encoding="ascii")
+            handles[value].write(f'track type=bedGraph name="{Path(path).stem}"\n')
+        for batch in windows:
+            total += len(batch)
+            for value, fh in handles.items():
+                fh.write(_bedgraph_lines(batch, value, precision))
+    finally:
+        for fh in handles.values():
+            fh.close()
+    return total
@@ -0,0 +1,117 @@
+"""Pairwise Hamming / p-distance kernels for panels of equal-length sequences."""
+
+from __future__ import annotations
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .scoring import UPPER, SeqLike, encode
+
+__all__ = ["encode_panel", "pack_2bit", "prepare_panel", "hamming_block", "hamming_matrix", "p_distance_matrix"]
+
+# A/C/G/T (either case) -> 2-bit code; everything else marks the panel as "not packable"
+_NT_CODE = np.full(256, 255, dtype=np.uint8)
+for _code, _nt in enumerate("ACGT"):
+    _NT_CODE[ord(_nt)] = _NT_CODE[ord(_nt.lower())] = _code
+
+_LOW_BITS = np.uint64(0x5555555555555555)  # the low bit of every 2-bit slot
+_POPCOUNT8 = np.array([bin(x).count("1") for x in range(256)], dtype=np.uint8)
+
+# Upper bound on the temporary (block x block x width) array built per block pair
+_BLOCK_BYTES = 32 << 20
+
+
+def _popcount(words: np.ndarray) -> np.ndarray:
+    """Set bits per uint64 word (np.bitwise_count on NumPy >= 2, byte lookup table otherwise)."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    as_bytes = words.view(np.uint8).reshape(words.shape + (8,))
+    return _POPCOUNT8[as_bytes].sum(axis=-1, dtype=np.uint8)
+
+
+def encode_panel(seqs: Sequence[SeqLike]) -> np.ndarray:
+    """Stack equal-length sequences into an (n, L) uint8 matrix, one row per sequence."""
+    rows = [encode(s) for s in seqs]
+    lengths = {len(r) for r in rows}
+    if len(lengths) > 1:
+        raise ValueError(f"Sequences must have equal length (got {sorted(lengths)})")
+    if not rows:
+        return np.zeros((0, 0), dtype=np.uint8)
+    return np.stack(rows)
+
+
+def pack_2bit(panel: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Pack an (n, L) nucleotide panel at 2 bits per base into (n, ceil(L/32)) uint64 words.
+    Returns None if the panel holds anything besides A/C/G/T (N, gaps, protein residues),
+    so the caller can fall back to the byte-wise kernel. Case is ignored.
+    """
+    codes = _NT_CODE[panel]
+    if codes.size and codes.max() == 255:
+        return None
+    n, length = codes.shape
+    width = -(-length // 32)
+    padded = np.zeros((n, width * 32), dtype=np.uint64)  # padding is "A" on both sides: never a mismatch
+    padded[:, :length] = codes
+    shifts = (2 * np.arange(32, dtype=np.uint64))
+    return np.bitwise_or.reduce(padded.reshape(n, width, 32) << shifts, axis=2)
+
+
+def _block_rows(width: int, itemsize: int) -> int:
+    return max(1, int((_BLOCK_BYTES / max(width * itemsize, 1)) ** 0.5))
+
+
+def _block_distances(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    if x.dtype == np.uint64:
+        d = x[:, None, :] ^ y[None, :, :]
+        d = (d | (d >> np.uint64(1))) & _LOW_BITS  # one bit per differing base
+        return _popcount(d).sum(axis=2, dtype=np.int64)
+    return np.count_nonzero(x[:, None, :] != y[None, :, :], axis=2)
+
+
+def _hamming(x: np.ndarray, y: np.ndarray, symmetric: bool) -> np.ndarray:
+    out = np.zeros((len(x), len(y)), dtype=np.int64)
+    step = _block_rows(x.shape[1], x.itemsize)
+    for i0 in range(0, len(x), step):
+        for j0 in range(i0 if symmetric else 0, len(y), step):
+            out[i0:i0 + step, j0:j0 + step] = _block_distances(x[i0:i0 + step], y[j0:j0 + step])
+    return out
+
+
+def prepare_panel(seqs: Sequence[SeqLike], pack: bool = True) -> np.ndarray:
+    """
+    Encode equal-length sequences once for the Hamming kernels: 2-bit packed uint64
+    words when the panel is pure A/C/G/T (and `pack` is set), upper-cased bytes otherwise.
+    """
+    panel = UPPER[encode_panel(seqs)]
+    words = pack_2bit(panel) if pack else None
+    return words if words is not None else panel
+
+
+def hamming_block(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """(len(x), len(y)) int64 Hamming distances between rows of two prepare_panel() results."""
+    if x.dtype != y.dtype or x.shape[1:] != y.shape[1:]:
+        raise ValueError("Both blocks must come from the same prepared panel")
+    return _hamming(x, y, symmetric=False)
+
+
+def hamming_matrix(seqs: Sequence[SeqLike], pack: bool = True) -> np.ndarray:
+    """
+    Full symmetric (n, n) int64 matrix of Hamming distances for equal-length sequences.
+
+    Every sequence is encoded once. Pure A/C/G/T panels are packed at 2 bits per base
+    and compared with XOR + popcount, 32 bases per word; anything else is compared
+    byte by byte. Both kernels work on blocks of rows, so memory stays bounded.
+    Comparison is case-insensitive (soft-masked bases count as equal).
+    """
+    prepared = prepare_panel(seqs, pack)
+    upper = np.triu(_hamming(prepared, prepared, symmetric=True), 1)
+    return upper + upper.T
+
+
+def p_distance_matrix(seqs: Sequence[SeqLike], pack: bool = True) -> np.ndarray:
+    """Hamming matrix divided by the common length (float64)."""
+    dist = hamming_matrix(seqs, pack=pack)
+    length = len(encode(seqs[0])) if len(seqs) else 0
+    return dist / length if length else dist.astype(np.float64)
@@ -0,0 +1,421 @@
+"""
+Batch downloads from NCBI E-utilities through the History server.
+
+A query (esearch) or an id list (epost) is stored on the History server once, then
+efetch pulls it in batches of `batch_size` records (retstart / retmax on the same
+WebEnv + query_key). Batches run on a thread pool while one shared limiter keeps
+the whole client under NCBI's request rate (3/s, or 10/s with an API key).
+Failed requests (network errors, HTTP 429 / 5xx, truncated batches) are retried
+with exponential backoff.
+
+download() writes each finished batch to <out>.parts/ and records it in a JSON
+checkpoint (<out>.ckpt.json), so an interrupted pull resumes where it stopped;
+the parts are joined in order into <out> at the end. A session read back from the
+cache is posted again before its first uncached fetch (WebEnvs expire); if the
+record count changed, the checkpoint is refused instead of mixing two result sets.
+Cached batches are likewise tied to the result set they came from: once the cached
+esearch / epost reply expires and is posted again, older batches count as misses.
+
+Replies are cached on disk (seqtools.cache, a separate entrez.sqlite) with a TTL
+and an LRU size bound, so reruns skip the network; offline mode serves only from
+the cache (SEQTOOLS_ENTREZ_OFFLINE=1, e.g. in CI). download() batches skip the
+reply cache unless asked (cache_batches=True): the .parts/ checkpoint already
+keeps them, and bulk data would evict the small esearch / esummary replies.
+
+Only the standard library is used (urllib), so base_url can point at a mirror or
+a local stub server.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple, Union
+
+from .cache import DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES, ResultCache, make_key, open_cache
+
+__all__ = ["DEFAULT_BASE_URL", "DEFAULT_BATCH_SIZE", "DEFAULT_ENTREZ_CACHE", "DEFAULT_TTL", "EntrezError",
+           "EntrezClient", "HistoryQuery", "RateLimiter", "download", "checkpoint_path", "open_entrez_cache"]
+
+DEFAULT_BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_ENTREZ_CACHE = DEFAULT_CACHE_PATH.with_name("entrez.sqlite")
+DEFAULT_TTL = 7 * 24 * 3600.0
+
+# Requests per second without / with an API key: a little under NCBI's 3 / 10, since
+# arrival times at the server jitter by the network latency
+_RATE = {False: 2.8, True: 9.5}
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class EntrezError(RuntimeError):
+    """An E-utilities request failed for good (bad query, expired session, retries exhausted)."""
+
+
+class RateLimiter:
+    """Spaces calls to acquire() at least 1 / rate seconds apart, across threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class HistoryQuery(NamedTuple):
+    """
+    A result set stored on the History server, with the query (`term`) or id list
+    (`ids`) it came from. `cached` marks a session read back from the response cache,
+    whose WebEnv may have expired by now. `stamp` is the time the result set was first
+    posted; cached efetch batches carry it, so batches of an older result set are not
+    mixed with this one.
+    """
+    db: str
+    webenv: str
+    query_key: str
+    count: int
+    term: Optional[str] = None
+    ids: Optional[Tuple[str, ...]] = None
+    cached: bool = False
+    stamp: Optional[float] = None
+
+
+def open_entrez_cache(path: Union[str, Path, None] = None,
+                      max_bytes: int = DEFAULT_MAX_BYTES) -> Optional[ResultCache]:
+    """
+    Response cache at `path`, else $SEQTOOLS_ENTREZ_CACHE, else DEFAULT_ENTREZ_CACHE
+    (a file of its own, so downloads do not evict alignment results). None when
+    switched off ("off").
+    """
+    return open_cache(path or os.environ.get("SEQTOOLS_ENTREZ_CACHE") or DEFAULT_ENTREZ_CACHE, max_bytes)
+
+
+class EntrezClient:
+    """
+    Minimal thread-safe E-utilities client. `email` and `api_key` default to
+    $NCBI_EMAIL / $NCBI_API_KEY; `rate` defaults to NCBI's limit for the key.
+
+    Replies are cached on disk (`cache`, open_entrez_cache() by default; None to
+    disable) for `ttl` seconds (None: no expiry), keyed by the utility and its
+    parameters (db, term / ids, rettype, retmode, ...) but never by the WebEnv, so
+    History server fetches hit the cache across runs too. With `offline` (default
+    $SEQTOOLS_ENTREZ_OFFLINE) nothing goes to the network: cached replies are served
+    even when expired, anything else raises EntrezError.
+    """
+
+    def __init__(self, email: Optional[str] = None, api_key: Optional[str] = None,
+                 base_url: str = DEFAULT_BASE_URL, tool: str = "seqtools", rate: Optional[float] = None,
+                 max_retries: int = 5, backoff: float = 1.0, timeout: float = 120.0,
+                 cache: Union[ResultCache, None, str] = "default", ttl: Optional[float] = DEFAULT_TTL,
+                 offline: Optional[bool] = None):
+        self.email = email or os.environ.get("NCBI_EMAIL")
+        self.api_key = api_key or os.environ.get("NCBI_API_KEY")
+        self.base_url = base_url.rstrip("/") + "/"
+        self.tool = tool
+        self.limiter = RateLimiter(rate or _RATE[bool(self.api_key)])
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = open_entrez_cache() if cache == "default" else cache
+        self.ttl = ttl
+        if offline is None:
+            offline = os.environ.get("SEQTOOLS_ENTREZ_OFFLINE", "").lower() in ("1", "true", "yes", "on")
+        self.offline = offline
+        self.requests = 0
+        self.retries = 0
+        self._lock = threading.Lock()  # cache access
+        self._session_lock = threading.Lock()
+        self._live: Dict[Tuple, HistoryQuery] = {}
+
+    def request(self, utility: str, **params) -> bytes:
+        """POST one E-utility call (e.g. "efetch") and return the body, retrying transient failures."""
+        if self.offline:
+            raise EntrezError(f"{utility}: offline, and this reply is not in the cache ({params.get('db')})")
+        fields = {k: v for k, v in params.items() if v is not None}
+        fields.update({"tool": self.tool, "email": self.email, "api_key": self.api_key})
+        data = urllib.parse.urlencode({k: v for k, v in fields.items() if v is not None}).encode()
+        url = f"{self.base_url}{utility}.fcgi"
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            self.requests += 1
+            delay = self.backoff * 2 ** attempt * (1 + random.random())
+            try:
+                with urllib.request.urlopen(url, data=data, timeout=self.timeout) as resp:
+                    body = resp.read()
+                _raise_for_error(utility, body)
+                return body
+            except urllib.error.HTTPError as exc:
+                if exc.code not in _RETRY_STATUS or attempt == self.max_retries:
+                    raise EntrezError(f"{utility}: HTTP {exc.code} {exc.reason}") from exc
+                retry_after = exc.headers.get("Retry-After") if exc.headers else None
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+            except (urllib.error.URLError, TimeoutError, ConnectionError) as exc:
+                if attempt == self.max_retries:
+                    raise EntrezError(f"{utility}: {exc}") from exc
+            self.retries += 1
+            time.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def _cache_key(self, utility: str, **params) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return make_key("entrez", self.base_url, utility, **{k: v for k, v in params.items() if v is not None})
+
+    def _cache_get(self, key: Optional[str], stamp: Optional[float] = None) -> Optional[bytes]:
+        """The cached body, unless expired or stored for another result set (`stamp`)."""
+        if key is None:
+            return None
+        with self._lock:
+            entry = self.cache.get(key)
+        if entry is None or (not self.offline and self.ttl is not None and time.time() - entry["t"] > self.ttl):
+            return None
+        if entry.get("stamp") != stamp:
+            return None
+        return entry["body"].encode("latin-1")
+
+    def _cache_set(self, key: Optional[str], body: bytes, stamp: Optional[float] = None) -> None:
+        if key is not None:
+            entry = {"t": time.time(), "body": body.decode("latin-1")}
+            if stamp is not None:
+                entry["stamp"] = stamp
+            with self._lock:
+                self.cache.set(key, entry)
+
+    def call(self, utility: str, **params) -> bytes:
+        """
+        request() through the cache, for calls that do not use the History server,
+        e.g. call("esummary", db="snp", id="...", retmode="xml") for Bio.Entrez.read().
+        """
+        key = self._cache_key(utility, **params)
+        body = self._cache_get(key)
+        if body is None:
+            body = self.request(utility, **params)
+            self._cache_set(key, body)
+        return body
+
+    def esearch(self, db: str, term: str) -> HistoryQuery:
+        """Run a query and keep its results on the History server."""
+        key = self._cache_key("esearch+history", db=db, term=term)
+        body = self._cache_get(key)
+        if body is not None:
+            result = json.loads(body)
+            if "stamp" in result:
+                return HistoryQuery(db, result["webenv"], result["querykey"], int(result["count"]),
+                                    term=term, cached=True, stamp=result["stamp"])
+        query = self._post_esearch(db, term)._replace(stamp=time.time())
+        self._cache_set(key, _session_body(query))
+        return query
+
+    def _post_esearch(self, db: str, term: str) -> HistoryQuery:
+        body = self.request("esearch", db=db, term=term, usehistory="y", retmax=0, retmode="json")
+        result = json.loads(body)["esearchresult"]
+        if "ERROR" in result:
+            raise EntrezError(f"esearch: {result['ERROR']}")
+        return HistoryQuery(db, result["webenv"], result["querykey"], int(result["count"]), term=term)
+
+    def epost(self, db: str, ids: Sequence[str]) -> HistoryQuery:
+        """Upload an id (or accession) list to the History server."""
+        ids = tuple(map(str, ids))
+        key = self._cache_key("epost", db=db, id=",".join(ids))
+        body = self._cache_get(key)
+        if body is not None:
+            result = json.loads(body)
+            if "stamp" in result:
+                return HistoryQuery(db, "", "", result["count"], ids=ids, cached=True, stamp=result["stamp"])
+        query = self._post_ids(db, ids)._replace(stamp=time.time())
+        self._cache_set(key, json.dumps({"count": query.count, "stamp": query.stamp}).encode())
+        return query
+
+    def _post_ids(self, db: str, ids: Tuple[str, ...]) -> HistoryQuery:
+        root = ET.fromstring(self.request("epost", db=db, id=",".join(ids)))
+        webenv, query_key = root.findtext("WebEnv"), root.findtext("QueryKey")
+        if not webenv or not query_key:
+            raise EntrezError(f"epost: {root.findtext('ERROR') or 'no WebEnv in the reply'}")
+        invalid = root.findall("InvalidIdList/Id")  # skipped by the History server
+        return HistoryQuery(db, webenv, query_key, len(ids) - len(invalid), ids=ids)
+
+    def _live_session(self, query: HistoryQuery) -> HistoryQuery:
+        """A session known to be live this run: cached ones are posted again (once per client)."""
+        if not query.cached:
+            return query
+        source = (query.db, query.term, query.ids)
+        with self._session_lock:  # one refresh, however many threads need it
+            if source not in self._live:
+                if query.term is not None:
+                    live = self._post_esearch(query.db, query.term)
+                else:
+                    live = self._post_ids(query.db, query.ids)
+                if live.count != query.count:
+                    if query.term is not None:  # the next run starts from the new result set
+                        self._cache_set(self._cache_key("esearch+history", db=query.db, term=query.term),
+                                        _session_body(live._replace(stamp=time.time())))
+                    raise EntrezError(f"The query now matches {live.count} records, the cached reply "
+                                      f"{query.count}; run again to use the new results")
+                # same result set: keep its stamp, so the batches already cached stay valid
+                live = live._replace(stamp=query.stamp)
+                if query.term is not None:
+                    self._cache_set(self._cache_key("esearch+history", db=query.db, term=query.term),
+                                    _session_body(live))
+                self._live[source] = live
+            return self._live[source]
+
+    def efetch(self, query: HistoryQuery, retstart: int = 0, retmax: Optional[int] = None,
+               rettype: str = "fasta", retmode: str = "text", cache: bool = True) -> bytes:
+        """
+        Records [retstart, retstart + retmax) of a History server result set. FASTA and
+        GenBank batches with fewer records than asked for (truncated replies) are retried.
+        With `cache` False the reply cache is neither read nor written for this batch.
+        """
+        key = None
+        if cache:
+            key = self._cache_key("efetch+history", db=query.db, term=query.term,
+                                  id=None if query.ids is None else ",".join(query.ids),
+                                  retstart=retstart, retmax=retmax, rettype=rettype, retmode=retmode)
+        body = self._cache_get(key, query.stamp)
+        if body is not None:
+            return body
+        live = self._live_session(query)
+        expected = max(0, min(query.count if retmax is None else retmax, query.count - retstart))
+        for attempt in range(self.max_retries + 1):
+            body = self.request("efetch", db=query.db, WebEnv=live.webenv, query_key=live.query_key,
+                                retstart=retstart, retmax=retmax, rettype=rettype, retmode=retmode)
+            got = _count_records(body, rettype)
+            if got is None or got == expected:
+                break
+            if attempt == self.max_retries:
+                raise EntrezError(f"efetch retstart={retstart}: {got} of {expected} records after retries")
+            self.retries += 1
+            time.sleep(self.backoff * 2 ** attempt)
+        self._cache_set(key, body, query.stamp)
+        return body
+
+
+def _session_body(query: HistoryQuery) -> bytes:
+    """The cached esearch reply: the History server session and its result-set stamp."""
+    return json.dumps({"webenv": query.webenv, "querykey": query.query_key,
+                       "count": query.count, "stamp": query.stamp}).encode()
+
+
+def _raise_for_error(utility: str, body: bytes) -> None:
+    """E-utilities report some failures (e.g. an expired WebEnv) in a 200 reply."""
+    head = body[:4096]
+    if b"<ERROR>" in head and utility == "efetch":
+        message = head.split(b"<ERROR>", 1)[1].split(b"</ERROR>", 1)[0].decode(errors="replace")
+        raise EntrezError(f"{utility}: {message}")
+
+
+def _count_records(data: bytes, rettype: str) -> Optional[int]:
+    """Records in an efetch batch, for the formats we can count cheaply (else None)."""
+    if rettype == "fasta":
+        return data.count(b"\n>") + data.startswith(b">")
+    if rettype in ("gb", "gbwithparts", "gp"):
+        return data.count(b"\n//")
+    return None
+
+
+def checkpoint_path(out_path: Union[str, Path]) -> Path:
+    out_path = Path(out_path)
+    return out_path.with_name(out_path.name + ".ckpt.json")
+
+
+def _write_json(path: Path, data: dict) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def download(client: EntrezClient, out_path: Union[str, Path], db: str = "nuccore",
+             term: Optional[str] = None, ids: Optional[Sequence[str]] = None,
+             rettype: str = "fasta", retmode: str = "text", max_records: Optional[int] = None,
+             batch_size: int = DEFAULT_BATCH_SIZE, workers: int = 3,
+             progress: Optional[Callable[[int, int], None]] = None, cache_batches: bool = False) -> int:
+    """
+    Fetch every record of `term` (or of `ids`) into `out_path`, at most `max_records`.
+    Resumes from <out>.ckpt.json when it describes the same request. `progress` is
+    called with (records done, total) after each batch. Returns the record count.
+    The esearch / epost reply is cached as usual; the batches themselves only with
+    `cache_batches` (e.g. small pulls rerun offline).
+    """
+    if (term is None) == (ids is None):
+        raise ValueError("Give exactly one of term / ids")
+    out_path = Path(out_path)
+    parts_dir = out_path.with_name(out_path.name + ".parts")
+    ckpt_path = checkpoint_path(out_path)
+    request = {"db": db, "term": term, "ids": list(map(str, ids)) if ids is not None else None,
+               "rettype": rettype, "retmode": retmode, "max_records": max_records, "batch_size": batch_size}
+
+    query = client.esearch(db, term) if term is not None else client.epost(db, request["ids"])
+    total = query.count if max_records is None else min(query.count, max_records)
+
+    done: Dict[str, int] = {}
+    if ckpt_path.exists():
+        ckpt = json.loads(ckpt_path.read_text(encoding="utf-8"))
+        if ckpt.get("request") != request:
+            raise EntrezError(f"{ckpt_path} belongs to another download; delete it to start over")
+        if ckpt.get("total") != total:
+            raise EntrezError(f"The query now matches {total} records, the checkpoint {ckpt.get('total')}; "
+                              f"delete {ckpt_path} to start over")
+        done = {k: v for k, v in ckpt["done"].items() if (parts_dir / f"{int(k):010d}.part").exists()}
+    parts_dir.mkdir(parents=True, exist_ok=True)
+
+    lock = threading.Lock()
+
+    def save() -> None:
+        _write_json(ckpt_path, {"request": request, "total": total, "done": done})
+
+    def fetch(start: int) -> int:
+        expected = min(batch_size, total - start)
+        data = client.efetch(query, start, expected, rettype, retmode, cache=cache_batches)
+        part = parts_dir / f"{start:010d}.part"
+        tmp = part.with_name(part.name + ".tmp")
+        tmp.write_bytes(data if data.endswith(b"\n") or not data else data + b"\n")
+        os.replace(tmp, part)
+        with lock:
+            done[str(start)] = expected
+            save()
+        return expected
+
+    save()
+    pending = [s for s in range(0, total, batch_size) if str(s) not in done]
+    finished = sum(done.values())
+    if progress:
+        progress(finished, total)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(fetch, s) for s in pending]
+        try:
+            for future in as_completed(futures):
+                finished += future.result()
+                if progress:
+                    progress(finished, total)
+        except BaseException:
+            # keep what is done (the checkpoint has it) and stop queueing new batches
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    with open(tmp, "wb") as out:
+        for start in range(0, total, batch_size):
+            with open(parts_dir / f"{start:010d}.part", "rb") as part:
+                shutil.copyfileobj(part, out)
+    os.replace(tmp, out_path)
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    ckpt_path.unlink()
+    return total
@@ -0,0 +1,480 @@
+"""
+samtools-compatible FASTA index (.fai) and random access to single records.
+
+A .fai line is  name, length, offset, linebases, linewidth  (tab-separated): the
+record's residue count, the byte offset of its first residue in the uncompressed
+file, and the residues / bytes per sequence line. With those, residue k of a record
+sits at byte offset + (k // linebases) * linewidth + k % linebases, so fetching a
+record (or a slice of it) reads exactly its own bytes:
+
+    plain FASTA   memory-mapped, slices are read straight from the page cache
+    BGZF (.gz)    only the compressed blocks covering the range are inflated; the
+                  block table is kept in a samtools-compatible <fasta>.gzi
+    plain gzip    no random access in the format: the stream is decompressed up to
+                  the record (forward seeks only), still in constant memory
+
+build_fai() scans the file in fixed-size chunks (constant memory) and, like
+samtools faidx, rejects records whose sequence lines are not all the same length
+(except the last). IndexedFasta reads such files whole (seqstore.load_fasta) instead,
+so callers do not have to care.
+"""
+
+from __future__ import annotations
+
+import gzip
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from .scoring import UPPER, decode
+from .seqstore import _WHITESPACE, DEFAULT_CHUNK_SIZE, SequenceStore, load_fasta
+
+__all__ = ["FaiRecord", "FastaIndex", "IndexedFasta", "build_fai", "load_fai", "fai_path", "is_bgzf"]
+
+Key = Union[int, str]
+
+_NEWLINE, _CR, _GT = ord("\n"), ord("\r"), ord(">")
+
+
+class FaiRecord(NamedTuple):
+    name: str
+    length: int
+    offset: int
+    linebases: int
+    linewidth: int
+
+    def byte_range(self, start: int, end: int) -> Tuple[int, int]:
+        """[first, last) byte offsets holding residues [start, end) of this record."""
+        if end <= start:
+            return self.offset, self.offset
+        first = self.offset + (start // self.linebases) * self.linewidth + start % self.linebases
+        last = self.offset + ((end - 1) // self.linebases) * self.linewidth + (end - 1) % self.linebases + 1
+        return first, last
+
+
+class FastaIndex:
+    """The records of a .fai file, in file order, addressable by position or name."""
+
+    __slots__ = ("records", "_by_name")
+
+    def __init__(self, records: Iterable[FaiRecord]):
+        self.records = list(records)
+        self._by_name: Dict[str, int] = {}
+        for i, rec in enumerate(self.records):
+            self._by_name.setdefault(rec.name, i)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[FaiRecord]:
+        return iter(self.records)
+
+    def __repr__(self) -> str:
+        return f"FastaIndex({len(self)} records)"
+
+    @property
+    def names(self) -> List[str]:
+        return [rec.name for rec in self.records]
+
+    def position(self, key: Key) -> int:
+        """
+        Record position for an int index or a name; a str of digits that is not a
+        record name is read as an index (so CLI values like "--i1 0" work as is).
+        """
+        if isinstance(key, str):
+            if key in self._by_name:
+                return self._by_name[key]
+            if not key.lstrip("-").isdigit():
+                raise KeyError(f"No record named {key!r}")
+            key = int(key)
+        i = key + len(self) if key < 0 else key
+        if not 0 <= i < len(self):
+            raise IndexError(f"record index {key} out of range (0..{len(self) - 1})")
+        return i
+
+    def __getitem__(self, key: Key) -> FaiRecord:
+        return self.records[self.position(key)]
+
+    def write(self, path: Union[str, Path]) -> None:
+        with open(path, "w", encoding="utf-8") as fh:
+            for rec in self.records:
+                fh.write("\t".join(map(str, rec)) + "\n")
+
+    @classmethod
+    def read(cls, path: Union[str, Path]) -> "FastaIndex":
+        records = []
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    name, *numbers = line.rstrip("\n").split("\t")[:5]
+                    records.append(FaiRecord(name, *map(int, numbers)))
+        return cls(records)
+
+
+def fai_path(fasta_path: Union[str, Path]) -> Path:
+    """<fasta>.fai, where samtools looks for it."""
+    fasta_path = Path(fasta_path)
+    return fasta_path.with_name(fasta_path.name + ".fai")
+
+
+def _gzi_path(fasta_path: Path) -> Path:
+    return fasta_path.with_name(fasta_path.name + ".gzi")
+
+
+def _is_gzip(path: Path) -> bool:
+    with open(path, "rb") as fh:
+        return fh.read(2) == b"\x1f\x8b"
+
+
+def is_bgzf(path: Union[str, Path]) -> bool:
+    """True for BGZF files (gzip members carrying the 'BC' block-size field, as written by bgzip)."""
+    with open(path, "rb") as fh:
+        head = fh.read(18)
+    return len(head) == 18 and head[:4] == b"\x1f\x8b\x08\x04" and head[12:14] == b"BC"
+
+
+class _IndexBuilder:
+    """Line-by-line .fai state machine, fed whole chunks of line metadata at a time."""
+
+    def __init__(self):
+        self.records: List[FaiRecord] = []
+        self.name: Optional[str] = None
+
+    def _close(self) -> None:
+        if self.name is not None:
+            self.records.append(FaiRecord(self.name, self.length, self.offset,
+                                          max(self.linebases, 0), max(self.linewidth, 0)))
+
+    def header(self, text: str, next_line: int) -> None:
+        self._close()
+        self.name = (text.split(None, 1) or [""])[0]
+        self.length, self.offset = 0, next_line
+        self.linebases = self.linewidth = -1
+        self.short = False  # a shorter (last) line was seen: only blank lines may follow
+
+    def lines(self, starts: np.ndarray, bases: np.ndarray, widths: np.ndarray) -> None:
+        """Sequence lines of the current record (before any header: ignored, as samtools does)."""
+        if self.name is None or not len(starts):
+            return
+        if self.linebases < 0:
+            self.offset, self.linebases, self.linewidth = int(starts[0]), int(bases[0]), int(widths[0])
+        full = (bases == self.linebases) & (widths == self.linewidth)
+        partial = np.flatnonzero(~full)
+        first_partial = 0 if self.short else (int(partial[0]) if partial.size else len(starts))
+        if np.any(bases[first_partial + 1:]) or (self.short and bases[0]):
+            raise ValueError(f"Different line length in sequence {self.name!r} (cannot index)")
+        self.short = self.short or bool(partial.size)
+        self.length += int(bases.sum())
+
+    def finish(self) -> FastaIndex:
+        self._close()
+        self.name = None
+        return FastaIndex(self.records)
+
+
+def build_fai(path: Union[str, Path], chunk_size: int = DEFAULT_CHUNK_SIZE) -> FastaIndex:
+    """
+    Index a FASTA (plain, gzip or BGZF) file in one streaming pass. Offsets refer to the
+    uncompressed bytes, as in samtools faidx.
+    """
+    path = Path(path)
+    builder = _IndexBuilder()
+    pos = 0                       # absolute offset of the current chunk
+    pending = None                # (start, byte count, first byte, last byte, header parts) of an open line
+    with (gzip.open(path, "rb") if _is_gzip(path) else open(path, "rb")) as fh:
+        while True:
+            raw = fh.read(chunk_size)
+            if not raw:
+                break
+            buf = np.frombuffer(raw, dtype=np.uint8)
+            newlines = np.flatnonzero(buf == _NEWLINE)
+            if not newlines.size:
+                pending = _extend_line(pending, pos, raw)
+                pos += len(raw)
+                continue
+            starts = np.concatenate([[0], newlines[:-1] + 1])
+            widths = newlines + 1 - starts
+            firsts = buf[starts]
+            cr = (newlines > starts) & (buf[np.maximum(newlines - 1, 0)] == _CR)
+            heads: Dict[int, bytes] = {}
+            if pending is not None:  # the first line started in an earlier chunk
+                p_start, p_len, p_first, p_last, p_head = pending
+                firsts[0] = p_first
+                cr[0] = cr[0] or (newlines[0] == 0 and p_last == _CR)
+                widths[0] += p_len
+                if p_first == _GT:
+                    heads[0] = b"".join(p_head) + raw[:newlines[0]]
+            abs_starts = starts + pos
+            if pending is not None:
+                abs_starts[0] = pending[0]
+            bases = widths - 1 - cr
+            _feed_lines(builder, raw, abs_starts, starts, newlines, bases, widths, firsts, heads)
+            tail = int(newlines[-1]) + 1
+            pending = _extend_line(None, pos + tail, raw[tail:]) if tail < len(raw) else None
+            pos += len(raw)
+    if pending is not None:  # last line without a trailing newline
+        p_start, p_len, p_first, p_last, p_head = pending
+        if p_first == _GT:
+            builder.header(b"".join(p_head)[1:].decode().strip(), p_start + p_len)
+        else:
+            base = p_len - (p_last == _CR)
+            builder.lines(np.array([p_start]), np.array([base]), np.array([p_len]))
+    return builder.finish()
+
+
+def _extend_line(pending, start: int, raw: bytes):
+    """Carry an unterminated line (only header lines keep their text) over to the next chunk."""
+    if pending is None:
+        pending = (start, 0, raw[0], raw[-1], [])
+    p_start, p_len, p_first, _, p_head = pending
+    if p_first == _GT:
+        p_head.append(raw)
+    return p_start, p_len + len(raw), p_first, raw[-1], p_head
+
+
+def _feed_lines(builder: _IndexBuilder, raw: bytes, abs_starts, starts, newlines, bases, widths, firsts, heads):
+    """Hand the complete lines of one chunk to the builder, header by header."""
+    header_rows = np.flatnonzero(firsts == _GT)
+    bounds = np.concatenate([[0], header_rows, [len(starts)]])
+    for k in range(len(bounds) - 1):
+        lo, hi = int(bounds[k]), int(bounds[k + 1])
+        if k > 0:  # row lo is a header line
+            text = heads.get(lo, raw[starts[lo]:newlines[lo]])
+            builder.header(text[1:].decode().strip(), int(abs_starts[lo] + widths[lo]))
+            lo += 1
+        builder.lines(abs_starts[lo:hi], bases[lo:hi], widths[lo:hi])
+
+
+def load_fai(path: Union[str, Path], build: bool = True) -> FastaIndex:
+    """
+    The index of a FASTA file: <fasta>.fai when it is not older than the FASTA,
+    otherwise (with `build`) a fresh one, saved next to it if the directory is writable.
+    """
+    path = Path(path)
+    index_path = fai_path(path)
+    try:
+        if index_path.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+            return FastaIndex.read(index_path)
+    except OSError:
+        pass
+    if not build:
+        raise FileNotFoundError(f"No up-to-date index for {path} (expected {index_path})")
+    index = build_fai(path)
+    try:
+        index.write(index_path)
+    except OSError:
+        pass
+    return index
+
+
+class _MappedSource:
+    """Plain file, memory-mapped."""
+
+    def __init__(self, path: Path):
+        self._fh = open(path, "rb")
+        size = os.fstat(self._fh.fileno()).st_size
+        self._map = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._buf = np.frombuffer(self._map, dtype=np.uint8) if size else np.zeros(0, dtype=np.uint8)
+
+    def read(self, first: int, last: int) -> np.ndarray:
+        return self._buf[first:last]
+
+    def close(self) -> None:
+        self._buf = None
+        if self._map is not None:
+            self._map.close()
+        self._fh.close()
+
+
+class _BgzfSource:
+    """BGZF file: a table of (compressed, uncompressed) block starts, inflating only the blocks needed."""
+
+    def __init__(self, path: Path):
+        self._fh = open(path, "rb")
+        self.coffsets, self.uoffsets = _bgzf_blocks(path)
+
+    def read(self, first: int, last: int) -> np.ndarray:
+        if last <= first:
+            return np.zeros(0, dtype=np.uint8)
+        b0 = int(np.searchsorted(self.uoffsets, first, "right")) - 1
+        b1 = int(np.searchsorted(self.uoffsets, last - 1, "right")) - 1
+        bounds = self.coffsets[b0:b1 + 2] - self.coffsets[b0]
+        self._fh.seek(int(self.coffsets[b0]))
+        raw = memoryview(self._fh.read(int(bounds[-1])))
+        # one gzip member per block; anything after a member (the empty EOF block) is dropped
+        data = np.frombuffer(b"".join(zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(raw[c0:c1])
+                                      for c0, c1 in zip(bounds[:-1].tolist(), bounds[1:].tolist())),
+                             dtype=np.uint8)
+        skip = first - int(self.uoffsets[b0])
+        return data[skip:skip + last - first]
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class _GzipSource:
+    """Plain gzip: forward-only decompression up to the requested bytes."""
+
+    def __init__(self, path: Path):
+        self._fh = gzip.open(path, "rb")
+
+    def read(self, first: int, last: int) -> np.ndarray:
+        self._fh.seek(first)  # rewinds and re-inflates if `first` is behind the current position
+        return np.frombuffer(self._fh.read(last - first), dtype=np.uint8)
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def _scan_bgzf_blocks(path: Path) -> Tuple[np.ndarray, np.ndarray]:
+    """Block starts from the BGZF headers (BSIZE) and trailers (ISIZE), without inflating anything."""
+    coffsets, uoffsets = [0], [0]
+    with open(path, "rb") as fh:
+        while True:
+            head = fh.read(12)
+            if len(head) < 12:
+                break
+            extra = fh.read(struct.unpack("<H", head[10:12])[0])
+            k, bsize = 0, None
+            while k + 4 <= len(extra):  # subfields: SI1 SI2 SLEN data
+                slen = struct.unpack("<H", extra[k + 2:k + 4])[0]
+                if extra[k:k + 2] == b"BC":
+                    bsize = struct.unpack("<H", extra[k + 4:k + 6])[0]
+                k += 4 + slen
+            if bsize is None:
+                raise ValueError(f"{path} is not BGZF (block at byte {coffsets[-1]} has no BC field)")
+            block_end = coffsets[-1] + bsize + 1
+            fh.seek(block_end - 4)
+            isize = struct.unpack("<I", fh.read(4))[0]
+            coffsets.append(block_end)
+            uoffsets.append(uoffsets[-1] + isize)
+    return np.array(coffsets, dtype=np.int64), np.array(uoffsets, dtype=np.int64)
+
+
+def _bgzf_blocks(path: Path) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (compressed, uncompressed) starts of every block plus the end of the file, from
+    <fasta>.gzi (samtools format: count, then the pairs after the implicit (0, 0))
+    when it is up to date, otherwise from a header scan that is then saved there.
+    """
+    gzi = _gzi_path(path)
+    size = path.stat().st_size
+    try:
+        if gzi.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+            raw = gzi.read_bytes()
+            count = struct.unpack("<Q", raw[:8])[0]
+            pairs = np.frombuffer(raw[8:8 + 16 * count], dtype="<u8").reshape(-1, 2).astype(np.int64)
+            # the .gzi has no end entry: the last block runs to the end of the file
+            coffsets = np.concatenate([[0], pairs[:, 0], [size]])
+            uoffsets = np.concatenate([[0], pairs[:, 1], [np.iinfo(np.int64).max]])
+            return coffsets, uoffsets
+    except (OSError, struct.error, ValueError):
+        pass
+    coffsets, uoffsets = _scan_bgzf_blocks(path)
+    try:
+        pairs = np.stack([coffsets[1:-1], uoffsets[1:-1]], axis=1).astype("<u8")
+        gzi.write_bytes(struct.pack("<Q", len(pairs)) + pairs.tobytes())
+    except OSError:
+        pass
+    return coffsets, uoffsets
+
+
+class IndexedFasta:
+    """
+    Random access to the records of a FASTA file through its .fai index (built on
+    first use). Records are addressed by position or name (see FastaIndex.position)
+    and come back as uint8 arrays, which the seqtools kernels accept directly.
+    A file that cannot be indexed (ragged line lengths) is loaded whole instead.
+
+        with IndexedFasta("data/sample/tp53_dna_multi.fasta") as fa:
+            seq = fa.fetch("NM_000546.6", 0, 100)
+    """
+
+    def __init__(self, path: Union[str, Path], index: Optional[FastaIndex] = None):
+        self.path = Path(path)
+        self._store: Optional[SequenceStore] = None
+        if index is None:
+            try:
+                index = load_fai(self.path)
+            except ValueError:
+                self._store = load_fasta(self.path)
+                index = FastaIndex(FaiRecord(name, int(n), -1, 0, 0)
+                                   for name, n in zip(self._store.ids, self._store.lengths))
+        self.index = index
+        if self._store is not None:
+            self._source = None
+        elif not _is_gzip(self.path):
+            self._source = _MappedSource(self.path)
+        elif is_bgzf(self.path):
+            self._source = _BgzfSource(self.path)
+        else:
+            self._source = _GzipSource(self.path)
+
+    def __enter__(self) -> "IndexedFasta":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._source is not None:
+            self._source.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __repr__(self) -> str:
+        return f"IndexedFasta({str(self.path)!r}, {len(self)} records)"
+
+    @property
+    def ids(self) -> List[str]:
+        return self.index.names
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.array([rec.length for rec in self.index], dtype=np.int64)
+
+    def fetch(self, key: Key, start: int = 0, end: Optional[int] = None, upper: bool = False) -> np.ndarray:
+        """Residues [start, end) of one record (0-based, clipped to the record)."""
+        i = self.index.position(key)
+        rec = self.index.records[i]
+        end = rec.length if end is None else min(end, rec.length)
+        start = max(0, min(start, end))
+        if self._store is not None:
+            seq = self._store[i][start:end]
+        else:
+            raw = self._source.read(*rec.byte_range(start, end))
+            seq = raw[~_WHITESPACE[raw]]
+        return UPPER[seq] if upper else seq
+
+    def __getitem__(self, key: Key) -> np.ndarray:
+        return self.fetch(key)
+
+    def text(self, key: Key, start: int = 0, end: Optional[int] = None) -> str:
+        return decode(self.fetch(key, start, end))
+
+    def description(self, key: Key) -> str:
+        """Full header line of a record (without ">"): the line that ends where its residues start."""
+        if self._store is not None:
+            return self._store.descriptions[self.index.position(key)]
+        rec = self.index[key]
+        span = 256
+        while True:
+            first = max(0, rec.offset - span)
+            line = self._source.read(first, rec.offset).tobytes().rstrip(b"\r\n")
+            cut = line.rfind(b"\n")
+            if cut >= 0 or first == 0:
+                return line[cut + 1:].decode().lstrip(">").strip()
+            span *= 4
+
+    def store(self, keys: Optional[Iterable[Key]] = None, upper: bool = False) -> SequenceStore:
+        """The given records (all by default) as a SequenceStore, reading only their bytes."""
+        positions = range(len(self)) if keys is None else [self.index.position(k) for k in keys]
+        return SequenceStore.from_sequences(((self.index.records[i].name, self.fetch(i, upper=upper))
+                                             for i in positions),
+                                            [self.description(i) for i in positions])
@@ -0,0 +1,158 @@
+"""
+Alignment-free k-mer distances, for MSA guide trees and quick phylogenies.
+
+Three methods:
+  shared  - fraction of shared k-mers (MUSCLE's guide-tree distance); exact, O(n^2) pair loop
+  cosine  - 1 - cosine similarity of k-mer count vectors; one matrix product, (n, distinct k-mers) memory
+  minhash - Mash distance from fixed-size MinHash sketches; (n, sketch) memory, blockwise comparison
+"cosine" and "minhash" are vectorised over the whole panel and scale to thousands of sequences.
+"""
+
+from __future__ import annotations
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .scoring import UPPER, SeqLike, encode
+
+__all__ = ["MAX_K", "KMER_METHODS", "kmer_codes", "kmer_counts", "kmer_count_vectors", "minhash_sketches",
+           "shared_kmer_distances", "cosine_distances", "mash_distances", "kmer_distance_matrix"]
+
+MAX_K = 8  # one residue byte per k-mer position, packed into a uint64
+KMER_METHODS = ("shared", "cosine", "minhash")
+
+# Upper bound on the (rows x n x sketch) temporary compared per block of sketches
+_BLOCK_BYTES = 32 << 20
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finaliser: a cheap, well-spread 64-bit hash (uint64 arithmetic wraps)."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def kmer_codes(seq: SeqLike, k: int) -> np.ndarray:
+    """
+    Every overlapping k-mer of `seq` as a uint64 (the k upper-cased bytes, big-endian),
+    in sequence order. Exact for k <= MAX_K; shorter sequences give an empty array.
+    """
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"k must be between 1 and {MAX_K} (got {k})")
+    residues = UPPER[encode(seq)]
+    if len(residues) < k:
+        return np.zeros(0, dtype=np.uint64)
+    windows = sliding_window_view(residues, k).astype(np.uint64)
+    shifts = np.arange(8 * (k - 1), -1, -8, dtype=np.uint64)
+    return np.bitwise_or.reduce(windows << shifts, axis=1)
+
+
+def kmer_counts(seq: SeqLike, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted distinct k-mer codes of `seq` and how often each occurs."""
+    return np.unique(kmer_codes(seq, k), return_counts=True)
+
+
+def kmer_count_vectors(seqs: Sequence[SeqLike], k: int, max_dims: int = 1 << 14) -> np.ndarray:
+    """
+    (n, d) float32 matrix of k-mer counts, one column per distinct k-mer of the panel.
+    DNA 6-mers (4096) and protein 3-mers (8000) fit exactly; when the panel has more
+    than `max_dims` distinct k-mers, they are hashed into `max_dims` buckets instead.
+    """
+    codes = [kmer_codes(s, k) for s in seqs]
+    vocab = np.unique(np.concatenate(codes)) if codes else np.zeros(0, dtype=np.uint64)
+    dims = min(len(vocab), max_dims)
+    out = np.zeros((len(seqs), max(dims, 1)), dtype=np.float32)
+    for row, c in zip(out, codes):
+        if len(vocab) <= max_dims:
+            columns = np.searchsorted(vocab, c)
+        else:
+            columns = (_mix64(c) % np.uint64(max_dims)).astype(np.int64)
+        row[:] = np.bincount(columns, minlength=len(row))
+    return out
+
+
+def minhash_sketches(seqs: Sequence[SeqLike], k: int, size: int = 256, seed: int = 42) -> np.ndarray:
+    """
+    (n, size) uint64 MinHash sketches: column s is the minimum over the sequence's
+    k-mers of the s-th hash function. Two sequences agree in a column with probability
+    equal to the Jaccard index of their k-mer sets. Sequences shorter than k get an
+    all-ones sketch (they match nothing but each other).
+    """
+    salts = _mix64(np.arange(size, dtype=np.uint64) + np.uint64(seed))
+    out = np.full((len(seqs), size), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for row, seq in zip(out, seqs):
+        codes = np.unique(kmer_codes(seq, k))
+        if not codes.size:
+            continue
+        step = max(1, _BLOCK_BYTES // (8 * codes.size))  # hash functions evaluated per pass
+        for s0 in range(0, size, step):
+            row[s0:s0 + step] = _mix64(codes[None, :] ^ salts[s0:s0 + step, None]).min(axis=1)
+    return out
+
+
+def shared_kmer_distances(seqs: Sequence[SeqLike], k: int) -> np.ndarray:
+    """
+    (n, n) float64 matrix of 1 - F, where F is the fraction of shared k-mers
+    (sum of min(count_x, count_y) over common k-mers / (min(len) - k + 1)), the
+    guide-tree distance of MUSCLE's first stage. 0 for identical sequences,
+    1 when nothing is shared (or a sequence is shorter than k). O(n^2) pair loop.
+    """
+    profiles: List[Tuple[np.ndarray, np.ndarray]] = [kmer_counts(s, k) for s in seqs]
+    windows = np.array([int(c.sum()) for _, c in profiles], dtype=np.int64)
+    n = len(profiles)
+    dist = np.zeros((n, n), dtype=np.float64)
+    for x in range(n):
+        codes_x, counts_x = profiles[x]
+        for y in range(x + 1, n):
+            codes_y, counts_y = profiles[y]
+            _, ix, iy = np.intersect1d(codes_x, codes_y, assume_unique=True, return_indices=True)
+            shared = np.minimum(counts_x[ix], counts_y[iy]).sum()
+            denom = min(windows[x], windows[y])
+            dist[x, y] = dist[y, x] = 1.0 - shared / denom if denom else 1.0
+    return dist
+
+
+def cosine_distances(vectors: np.ndarray) -> np.ndarray:
+    """(n, n) float64 matrix of 1 - cosine similarity between rows of kmer_count_vectors()."""
+    norms = np.linalg.norm(vectors, axis=1)
+    unit = vectors / np.where(norms > 0, norms, 1)[:, None]
+    dist = 1.0 - (unit @ unit.T).astype(np.float64)
+    np.clip(dist, 0.0, 1.0, out=dist)
+    empty = norms == 0
+    dist[empty, :] = dist[:, empty] = 1.0
+    np.fill_diagonal(dist, 0.0)
+    return dist
+
+
+def mash_distances(sketches: np.ndarray, k: int) -> np.ndarray:
+    """
+    (n, n) float64 Mash distances from minhash_sketches(): with j the fraction of
+    equal sketch columns (Jaccard estimate), d = -ln(2j / (1 + j)) / k, capped at 1.
+    """
+    n, size = sketches.shape
+    equal = np.zeros((n, n), dtype=np.int64)
+    step = max(1, _BLOCK_BYTES // max(n * size, 1))
+    for i0 in range(0, n, step):
+        equal[i0:i0 + step] = (sketches[i0:i0 + step, None, :] == sketches[None, :, :]).sum(axis=2)
+    jaccard = equal / size
+    with np.errstate(divide="ignore"):
+        dist = -np.log(2 * jaccard / (1 + jaccard)) / k
+    dist = np.minimum(dist, 1.0)
+    np.fill_diagonal(dist, 0.0)
+    return dist
+
+
+def kmer_distance_matrix(seqs: Sequence[SeqLike], k: int, method: str = "shared",
+                         max_dims: int = 1 << 14, sketch_size: int = 256) -> np.ndarray:
+    """(n, n) alignment-free distances between `seqs` by one of KMER_METHODS (see the module docstring)."""
+    if method == "shared":
+        return shared_kmer_distances(seqs, k)
+    if method == "cosine":
+        return cosine_distances(kmer_count_vectors(seqs, k, max_dims))
+    if method == "minhash":
+        return mash_distances(minhash_sketches(seqs, k, sketch_size), k)
+    raise ValueError(f"Unknown k-mer distance method {method!r} (expected one of {', '.join(KMER_METHODS)})")
@@ -0,0 +1,251 @@
+"""
+In-process progressive multiple sequence alignment (no Clustal Omega needed).
+
+1. Guide tree: UPGMA over alignment-free k-mer distances (seqtools.kmer).
+2. Following the tree bottom-up, the two child profiles of every node are aligned
+   with a profile-profile Needleman-Wunsch with affine gaps, using the same
+   row-vectorised Gotoh recurrence as the Lab 02 affine engine.
+3. Merges whose subtrees are independent can run in a process pool.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .kmer import kmer_distance_matrix
+from .scoring import UPPER, SeqLike, encode, score_table
+
+__all__ = ["GAP", "MATRIX_GAPS", "SHARED_KMER_MAX_SEQS", "upgma", "default_k", "guide_tree", "default_gaps",
+           "align_profiles", "progressive_align"]
+
+GAP = ord("-")
+
+# Column scores are averages over residue pairs; scaling them to integers keeps
+# the DP exact, so the traceback can re-derive each move by equality.
+_SCALE = 100
+
+_NEG_INF = np.int32(-(2**30))
+
+_NUCLEOTIDES = frozenset(b"ACGTUN")
+
+# Affine gap penalties used with a substitution matrix unless the caller sets them
+MATRIX_GAPS = (-10, -1)
+
+# Above this many sequences the pairwise "shared" k-mer loop gives way to cosine distances
+SHARED_KMER_MAX_SEQS = 200
+
+Profile = Tuple[List[int], np.ndarray]  # (input indices of the rows, (rows, columns) uint8 with GAP)
+
+
+def upgma(dist: np.ndarray) -> np.ndarray:
+    """
+    Average-linkage clustering of a symmetric distance matrix, by the nearest-neighbour
+    chain algorithm (O(n^2) time). Returns an (n - 1, 4) float64 array in SciPy's
+    `linkage` layout: child a, child b, distance between them, size of the new cluster.
+    Leaves are 0..n-1 and the cluster formed in row t is n + t.
+    """
+    n = len(dist)
+    d = np.array(dist, dtype=np.float64)
+    np.fill_diagonal(d, np.inf)
+    size = np.ones(n, dtype=np.int64)
+    node = np.arange(n)
+    merges = np.zeros((max(n - 1, 0), 4), dtype=np.float64)
+    chain: List[int] = []
+    for t in range(n - 1):
+        if not chain:
+            chain.append(int(np.argmin(size == 0)))  # any live slot
+        while True:
+            a = chain[-1]
+            b = int(np.argmin(d[a]))
+            if len(chain) > 1 and d[a, chain[-2]] <= d[a, b]:
+                break
+            chain.append(b)
+        a, b = chain.pop(), chain.pop()
+        merges[t] = (min(node[a], node[b]), max(node[a], node[b]), d[a, b], size[a] + size[b])
+        # Lance-Williams update for the average link; the merged cluster reuses slot `a`
+        row = (size[a] * d[a] + size[b] * d[b]) / (size[a] + size[b])
+        d[a], d[:, a] = row, row
+        d[b], d[:, b] = np.inf, np.inf
+        d[a, a] = np.inf
+        size[a] += size[b]
+        size[b] = 0
+        node[a] = n + t
+    return merges
+
+
+def default_k(seqs: Sequence[SeqLike]) -> int:
+    """k-mer length for guide trees: 6 for nucleotide panels, 3 for proteins."""
+    residues = set(np.unique(np.concatenate([UPPER[encode(s)] for s in seqs])).tolist()) if len(seqs) else set()
+    return 6 if residues <= _NUCLEOTIDES else 3
+
+
+def guide_tree(seqs: Sequence[SeqLike], k: Optional[int] = None, method: Optional[str] = None) -> np.ndarray:
+    """
+    UPGMA guide tree over k-mer distances (seqtools.kmer). `method` defaults to the
+    exact "shared" distance up to SHARED_KMER_MAX_SEQS sequences and to the
+    vectorised "cosine" distance for larger panels.
+    """
+    k = default_k(seqs) if k is None else k
+    if method is None:
+        method = "shared" if len(seqs) <= SHARED_KMER_MAX_SEQS else "cosine"
+    return upgma(kmer_distance_matrix(seqs, k, method))
+
+
+def _frequencies(rows: np.ndarray, index: np.ndarray, size: int) -> np.ndarray:
+    """(columns, size) fraction of the rows holding each residue; gaps (index == size) are dropped."""
+    n, length = rows.shape
+    flat = index[rows] + (size + 1) * np.arange(length)[None, :]
+    counts = np.bincount(flat.ravel(), minlength=length * (size + 1)).reshape(length, size + 1)
+    return counts[:, :size] / n
+
+
+def default_gaps(matrix: Optional[str] = None, gap: int = -2) -> Tuple[int, int]:
+    """
+    (gap_open, gap_extend) matching the scoring scheme: affine -10 / -1 for a
+    substitution matrix (BLOSUM62 scores run from -4 to +11, so a small linear
+    penalty riddles protein profiles with gaps), linear `gap` for match/mismatch.
+    """
+    return MATRIX_GAPS if matrix else (gap, gap)
+
+
+def align_profiles(rows1: np.ndarray, rows2: np.ndarray, table: np.ndarray, gap_open: int,
+                   gap_extend: Optional[int] = None) -> np.ndarray:
+    """
+    Align two profiles ((rows, columns) uint8 arrays, GAP for gaps) and return the
+    merged block, rows1 on top of rows2.
+
+    The column-pair score is the average substitution score over all residue pairs
+    (gaps score 0). A run of L gap columns costs gap_open + (L - 1) * gap_extend,
+    filled with the Gotoh recurrence of the Lab 02 affine engine; gap_extend=None
+    means a linear penalty (gap_extend = gap_open). Terminal gaps are free, so
+    profiles of sequences with different UTR lengths are not forced end to end.
+    """
+    gap_extend = gap_open if gap_extend is None else gap_extend
+    alphabet = np.setdiff1d(np.union1d(np.unique(rows1), np.unique(rows2)), [GAP])
+    index = np.full(256, len(alphabet), dtype=np.int64)
+    index[alphabet] = np.arange(len(alphabet))
+    sub = table[np.ix_(alphabet, alphabet)].astype(np.float64)
+    f1 = _frequencies(rows1, index, len(alphabet))
+    f2 = _frequencies(rows2, index, len(alphabet))
+    pair = np.rint(f1 @ sub @ f2.T * _SCALE).astype(np.int32)
+
+    # M ends in a column pair, X in a gap in profile 2 (rows1 column over gaps), Y in a gap in profile 1.
+    # Row / column 0 of M stay 0: leading gaps are free.
+    m, n = pair.shape
+    go, ge = np.int32(round(gap_open * _SCALE)), np.int32(round(gap_extend * _SCALE))
+    col_ext = np.arange(n + 1, dtype=np.int32) * ge
+    M = np.zeros((m + 1, n + 1), dtype=np.int32)
+    X = np.full((m + 1, n + 1), _NEG_INF, dtype=np.int32)
+    Y = np.full((m + 1, n + 1), _NEG_INF, dtype=np.int32)
+    w = np.empty(n + 1, dtype=np.int32)
+    for i in range(1, m + 1):
+        best_prev = np.maximum(np.maximum(M[i - 1], X[i - 1]), Y[i - 1])
+        M[i, 1:] = best_prev[:-1] + pair[i - 1]
+        np.maximum(np.maximum(M[i - 1], Y[i - 1]) + go, X[i - 1] + ge, out=X[i])
+        np.maximum(M[i], X[i], out=w)
+        w += go
+        w -= col_ext
+        np.maximum.accumulate(w[:-1], out=Y[i, 1:])
+        Y[i, 1:] += col_ext[:-1]
+    mats = (M, X, Y)
+    best = np.maximum(np.maximum(M, X), Y)
+
+    # Free trailing gaps: the alignment ends at the best cell of the last row or column
+    j_best = int(np.argmax(best[m]))
+    i_best = int(np.argmax(best[:, n]))
+    i, j = (m, j_best) if best[m, j_best] >= best[i_best, n] else (i_best, n)
+    state = [int(mat[i, j]) for mat in mats].index(int(best[i, j]))
+    cols1: List[int] = list(range(m - 1, i - 1, -1))
+    cols2: List[int] = [-1] * len(cols1)
+    cols2 += list(range(n - 1, j - 1, -1))
+    cols1 += [-1] * (n - j)
+    while i > 0 and j > 0:
+        current = int(mats[state][i, j])
+        if state == 0:
+            previous = current - int(pair[i - 1, j - 1])
+            i -= 1; j -= 1
+            cols1.append(i); cols2.append(j)
+            state = [int(M[i, j]), int(X[i, j]), int(Y[i, j])].index(previous)
+        elif state == 1:
+            i -= 1
+            cols1.append(i); cols2.append(-1)
+            if current == M[i, j] + go:
+                state = 0
+            elif current == Y[i, j] + go:
+                state = 2
+        else:
+            j -= 1
+            cols1.append(-1); cols2.append(j)
+            if current == M[i, j] + go:
+                state = 0
+            elif current == X[i, j] + go:
+                state = 1
+    cols1 += list(range(i - 1, -1, -1)) + [-1] * j
+    cols2 += [-1] * i + list(range(j - 1, -1, -1))
+
+    idx1 = np.array(cols1[::-1], dtype=np.int64)
+    idx2 = np.array(cols2[::-1], dtype=np.int64)
+    merged = np.full((len(rows1) + len(rows2), len(idx1)), GAP, dtype=np.uint8)
+    merged[:len(rows1), idx1 >= 0] = rows1[:, idx1[idx1 >= 0]]
+    merged[len(rows1):, idx2 >= 0] = rows2[:, idx2[idx2 >= 0]]
+    return merged
+
+
+_WORKER: Dict[str, object] = {}
+
+
+def _init_worker(table: np.ndarray, gap_open: int, gap_extend: int) -> None:
+    _WORKER["table"], _WORKER["gaps"] = table, (gap_open, gap_extend)
+
+
+def _merge(p1: Profile, p2: Profile) -> Profile:
+    return p1[0] + p2[0], align_profiles(p1[1], p2[1], _WORKER["table"], *_WORKER["gaps"])
+
+
+def progressive_align(seqs: Sequence[SeqLike], match: int = 2, mismatch: int = -1, gap: int = -2,
+                      matrix: Optional[str] = None, k: Optional[int] = None, workers: int = 1,
+                      tree: Optional[np.ndarray] = None, kmer_method: Optional[str] = None,
+                      gap_open: Optional[int] = None, gap_extend: Optional[int] = None) -> List[str]:
+    """
+    Multiple alignment of `seqs`; returns the gapped rows (upper case) in input order.
+
+    Gap penalties not given default to default_gaps(matrix, gap): affine MATRIX_GAPS
+    with a substitution matrix, linear `gap` with match/mismatch scoring.
+
+    `tree` is a guide tree in upgma() layout; when omitted it is built by guide_tree()
+    with `k` and `kmer_method`.
+    With workers > 1, every merge whose two subtrees are finished is handed to a
+    process pool, so independent branches of the tree are aligned concurrently.
+    """
+    if not len(seqs):
+        return []
+    table = score_table(match, mismatch, matrix)
+    default_open, default_extend = default_gaps(matrix, gap)
+    gaps = (default_open if gap_open is None else gap_open, default_extend if gap_extend is None else gap_extend)
+    tree = guide_tree(seqs, k, kmer_method) if tree is None else tree
+    n = len(seqs)
+    profiles: Dict[int, Profile] = {i: ([i], UPPER[encode(s)][None, :].copy()) for i, s in enumerate(seqs)}
+
+    if workers <= 1 or n < 3:
+        _init_worker(table, *gaps)
+        for t, (a, b, _, _) in enumerate(tree):
+            profiles[n + t] = _merge(profiles.pop(int(a)), profiles.pop(int(b)))
+    else:
+        waiting = {n + t: (int(a), int(b)) for t, (a, b, _, _) in enumerate(tree)}
+        running = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(table, *gaps)) as pool:
+            while waiting or running:
+                for node, (a, b) in list(waiting.items()):
+                    if a in profiles and b in profiles:
+                        running[pool.submit(_merge, profiles.pop(a), profiles.pop(b))] = node
+                        del waiting[node]
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    profiles[running.pop(future)] = future.result()
+
+    (members, rows), = profiles.values()
+    order = np.argsort(members)
+    return [row.tobytes().decode("ascii") for row in rows[order]]
@@ -0,0 +1,168 @@
+"""
+Batched pairwise alignment on Bio.Align.PairwiseAligner: the single entry point the
+Lab 02 scripts use to align (query, target) pairs.
+
+- An aligner is configured once per process and scoring scheme (get_aligner) and
+  reused for every pair.
+- Only the best score / first optimal alignment is produced; the iterator of
+  co-optimal alignments is never enumerated.
+- Batches run in a process pool (chunks of pairs per task) and can be memoised in
+  a seqtools.cache.ResultCache, looked up and filled by the calling process.
+- align_store_pairs() aligns records of one SequenceStore by (i, j) index: the
+  residue buffer goes to shared memory once and tasks carry only index chunks.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import shared_memory
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .alignment import AlignmentResult, biopython_align, pairwise_aligner
+from .cache import ResultCache, aligner_params, make_key
+from .scoring import SeqLike, as_sequence
+from .seqstore import SequenceStore
+
+__all__ = ["get_aligner", "align_pairs", "align_store_pairs", "score_pairs"]
+
+Pair = Tuple[SeqLike, SeqLike]
+
+# The shared residue buffer as seen by each pool process (set once by _init_store_worker)
+_STORE = {}
+
+
+@lru_cache(maxsize=16)
+def get_aligner(mode: str = "global", match=1, mismatch=-1, gap=-2, gap_open=None, gap_extend=None,
+                matrix: Optional[str] = None, end_gap=None):
+    """
+    The PairwiseAligner for one scoring scheme (see seqtools.alignment.pairwise_aligner),
+    built on first use and then shared by every caller in this process.
+    Treat it as read-only: changing its settings would affect all other callers.
+    """
+    return pairwise_aligner(mode, match, mismatch, gap, gap_open, gap_extend, matrix, end_gap)
+
+
+def _align_chunk(pairs: Sequence[Pair], score_only: bool, scoring: dict) -> list:
+    aligner = get_aligner(**scoring)
+    if score_only:
+        return [aligner.score(a, b) for a, b in pairs]
+    return [biopython_align(a, b, aligner=aligner) for a, b in pairs]
+
+
+def _init_store_worker(shm_name: str, size: int, offsets: np.ndarray) -> None:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _STORE["shm"] = shm  # keep the mapping open for the life of the process
+    _STORE["data"] = np.ndarray((size,), dtype=np.uint8, buffer=shm.buf)
+    _STORE["offsets"] = offsets
+
+
+def _align_index_chunk(index_pairs: np.ndarray, score_only: bool, scoring: dict,
+                       data: Optional[np.ndarray] = None, offsets: Optional[np.ndarray] = None) -> list:
+    """Scores, or alignments in to_dict() form (no sequences), of records (i, j) of the buffer."""
+    if data is None:
+        data, offsets = _STORE["data"], _STORE["offsets"]
+    aligner = get_aligner(**scoring)
+    out = []
+    for i, j in index_pairs:
+        a, b = data[offsets[i]:offsets[i + 1]], data[offsets[j]:offsets[j + 1]]
+        out.append(aligner.score(a, b) if score_only else biopython_align(a, b, aligner=aligner).to_dict())
+    return out
+
+
+def _cache_lookup(pairs: Sequence[Pair], score_only: bool, cache: Optional[ResultCache], scoring: dict):
+    """(results, keys, todo): cached results in place, the indices of the pairs still to align."""
+    results: list = [None] * len(pairs)
+    keys = [None] * len(pairs)
+    if cache is None:
+        return results, keys, list(range(len(pairs)))
+    params = aligner_params(get_aligner(**scoring))
+    namespace = "pairwise_score" if score_only else "pairwise_best"
+    todo = []
+    for i, (a, b) in enumerate(pairs):
+        keys[i] = make_key(namespace, a, b, **params)
+        hit = cache.get(keys[i])
+        if hit is None:
+            todo.append(i)
+        else:
+            results[i] = hit if score_only else AlignmentResult.from_dict(hit, a, b)
+    return results, keys, todo
+
+
+def align_pairs(pairs: Sequence[Pair], score_only: bool = False, workers: int = 1, chunksize: int = 32,
+                cache: Optional[ResultCache] = None, **scoring) -> List[Union[float, AlignmentResult]]:
+    """
+    Align every (seq1, seq2) pair with one scoring scheme (keyword arguments of
+    get_aligner). Returns, in input order, the best score of each pair (score_only)
+    or its first optimal alignment as an AlignmentResult.
+
+    Sequences may be str / Seq or uint8 arrays (e.g. seqtools.seqstore views, aligned
+    without conversion). With workers > 1 the pairs are sent to a process pool in chunks of `chunksize`;
+    each worker builds its aligner once. With a cache, known pairs are served from it
+    and only the rest are aligned. For all-vs-all work on one set of sequences use
+    align_store_pairs(), which does not send the sequences with every pair.
+    """
+    pairs = [(as_sequence(a), as_sequence(b)) for a, b in pairs]
+    results, keys, todo = _cache_lookup(pairs, score_only, cache, scoring)
+
+    chunks = [todo[c:c + chunksize] for c in range(0, len(todo), chunksize)]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_align_chunk, [pairs[i] for i in chunk], score_only, scoring)
+                       for chunk in chunks]
+            computed = [r for future in futures for r in future.result()]
+    else:
+        computed = _align_chunk([pairs[i] for i in todo], score_only, scoring)
+
+    for i, value in zip(todo, computed):
+        results[i] = value
+        if cache is not None:
+            cache.set(keys[i], value if score_only else value.to_dict())
+    return results
+
+
+def align_store_pairs(store: SequenceStore, index_pairs: Iterable[Tuple[int, int]], score_only: bool = False,
+                      workers: int = 1, chunksize: int = 256, cache: Optional[ResultCache] = None,
+                      **scoring) -> List[Union[float, AlignmentResult]]:
+    """
+    align_pairs() for records of one store, given as (i, j) indices, e.g.
+    zip(*np.triu_indices(len(store), 1)) for all-vs-all.
+
+    With workers > 1 the store's residue buffer is copied once into shared memory,
+    which each worker maps in its initializer (with the offsets); tasks carry only
+    chunks of `chunksize` index pairs, and alignments come back without their
+    sequences (to_dict()), rebuilt here on views of `store`.
+    """
+    index_pairs = np.asarray(list(index_pairs), dtype=np.int64).reshape(-1, 2)
+    pairs = [(store[i], store[j]) for i, j in index_pairs]
+    results, keys, todo = _cache_lookup(pairs, score_only, cache, scoring)
+
+    todo_pairs = index_pairs[todo]
+    chunks = [todo_pairs[c:c + chunksize] for c in range(0, len(todo_pairs), chunksize)]
+    if workers > 1 and len(chunks) > 1:
+        shm = shared_memory.SharedMemory(create=True, size=max(store.data.nbytes, 1))
+        try:
+            np.ndarray((len(store.data),), dtype=np.uint8, buffer=shm.buf)[:] = store.data
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_store_worker,
+                                     initargs=(shm.name, len(store.data), store.offsets)) as pool:
+                futures = [pool.submit(_align_index_chunk, chunk, score_only, scoring) for chunk in chunks]
+                computed = [r for future in futures for r in future.result()]
+        finally:
+            shm.close()
+            shm.unlink()
+    else:
+        computed = _align_index_chunk(todo_pairs, score_only, scoring, store.data, store.offsets)
+
+    for i, value in zip(todo, computed):
+        if cache is not None:
+            cache.set(keys[i], value)
+        results[i] = value if score_only else AlignmentResult.from_dict(value, *pairs[i])
+    return results
+
+
+def score_pairs(pairs: Sequence[Pair], workers: int = 1, cache: Optional[ResultCache] = None,
+                **scoring) -> List[float]:
+    """Best alignment score of every pair; shorthand for align_pairs(score_only=True)."""
+    return align_pairs(pairs, score_only=True, workers=workers, cache=cache, **scoring)
@@ -0,0 +1,48 @@
+"""Distance-based trees for large panels, as Bio.Phylo objects."""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+from .msa import upgma
+
+__all__ = ["linkage_to_tree", "upgma_tree", "to_distance_matrix"]
+
+
+def linkage_to_tree(merges: np.ndarray, names: Sequence[str]):
+    """
+    Rooted Bio.Phylo tree from an upgma() merge table. Node heights are half the
+    merge distance, and branch lengths are parent height - child height.
+    """
+    from Bio.Phylo.BaseTree import Clade, Tree
+
+    n = len(names)
+    clades = [Clade(branch_length=0.0, name=str(name)) for name in names]
+    heights = [0.0] * n
+    for t, (a, b, distance, _) in enumerate(merges):
+        height = distance / 2
+        children = [clades[int(a)], clades[int(b)]]
+        for child, child_height in zip(children, (heights[int(a)], heights[int(b)])):
+            child.branch_length = max(height - child_height, 0.0)
+        clades.append(Clade(branch_length=0.0, name=f"Inner{t + 1}", clades=children))
+        heights.append(height)
+    return Tree(root=clades[-1], rooted=True)
+
+
+def upgma_tree(dist: np.ndarray, names: Sequence[str]):
+    """
+    UPGMA tree straight from an (n, n) distance matrix, e.g. a seqtools.kmer distance
+    or an alignment p-distance. O(n^2), unlike Bio's DistanceTreeConstructor (O(n^3)).
+    """
+    return linkage_to_tree(upgma(dist), names)
+
+
+def to_distance_matrix(dist: np.ndarray, names: Sequence[str]):
+    """Bio.Phylo DistanceMatrix (lower triangle) from an (n, n) array, for DistanceTreeConstructor.nj()."""
+    from Bio.Phylo.TreeConstruction import DistanceMatrix
+
+    dist = np.asarray(dist, dtype=np.float64)
+    return DistanceMatrix([str(name) for name in names],
+                          [dist[i, :i + 1].tolist() for i in range(len(names))])
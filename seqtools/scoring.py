@@ -0,0 +1,93 @@
+"""Substitution scoring tables shared by the Lab 02 aligners."""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Optional, Union
+
+import numpy as np
+
+__all__ = ["UPPER", "encode", "decode", "as_sequence", "match_mismatch_table", "substitution_table",
+           "score_table", "pair_score"]
+
+SeqLike = Union[str, bytes, np.ndarray]
+
+
+def encode(seq: SeqLike) -> np.ndarray:
+    """Residues as a uint8 vector (one byte per residue); ndarrays pass through unchanged."""
+    if isinstance(seq, np.ndarray):
+        return seq
+    if isinstance(seq, str):
+        seq = seq.encode("ascii")
+    return np.frombuffer(seq, dtype=np.uint8)
+
+
+def decode(seq: SeqLike) -> str:
+    """Inverse of encode(): residues as a str (one copy); anything else goes through str()."""
+    if isinstance(seq, np.ndarray):
+        return seq.tobytes().decode("ascii")
+    if isinstance(seq, bytes):
+        return seq.decode("ascii")
+    return str(seq)
+
+
+def as_sequence(seq) -> SeqLike:
+    """A sequence argument normalised for the aligners: uint8 arrays are kept (no copy), the rest becomes str."""
+    return seq if isinstance(seq, np.ndarray) else decode(seq)
+
+
+def _freeze(table: np.ndarray) -> np.ndarray:
+    table.flags.writeable = False
+    return table
+
+
+# Byte -> upper-case byte lookup table: UPPER[encode(seq)] upper-cases in one pass
+UPPER = np.arange(256, dtype=np.uint8)
+UPPER[ord("a"):ord("z") + 1] -= 32
+UPPER = _freeze(UPPER)
+
+
+@lru_cache(maxsize=None)
+def match_mismatch_table(match: int, mismatch: int) -> np.ndarray:
+    """
+    256 x 256 int32 table indexed by residue bytes: `match` on the diagonal,
+    `mismatch` everywhere else (same as comparing characters with ==).
+    """
+    table = np.full((256, 256), mismatch, dtype=np.int32)
+    np.fill_diagonal(table, match)
+    return _freeze(table)
+
+
+@lru_cache(maxsize=None)
+def substitution_table(name: str) -> np.ndarray:
+    """
+    Compile a Biopython substitution matrix (BLOSUM62, PAM250, ...) into a
+    256 x 256 int32 table indexed by residue bytes. Upper- and lower-case letters
+    score the same; bytes outside the matrix alphabet get the matrix minimum.
+    """
+    from Bio.Align import substitution_matrices
+
+    matrix = substitution_matrices.load(name.upper())
+    values = np.asarray(matrix)
+    if not np.array_equal(values, np.round(values)):
+        raise ValueError(f"Substitution matrix {name} has non-integer scores")
+
+    table = np.full((256, 256), int(values.min()), dtype=np.int32)
+    for x, row in zip(matrix.alphabet, values):
+        for y, v in zip(matrix.alphabet, row):
+            for cx in {x.upper(), x.lower()}:
+                for cy in {y.upper(), y.lower()}:
+                    table[ord(cx), ord(cy)] = int(v)
+    return _freeze(table)
+
+
+def score_table(match: int = 1, mismatch: int = -1, matrix: Optional[str] = None) -> np.ndarray:
+    """Scoring table for an aligner: the named substitution matrix, or plain match/mismatch."""
+    if matrix:
+        return substitution_table(matrix)
+    return match_mismatch_table(match, mismatch)
+
+
+def pair_score(table: np.ndarray, a: str, b: str) -> int:
+    """Score of a single residue pair (used while backtracking)."""
+    return int(table[ord(a), ord(b)])
@@ -0,0 +1,267 @@
+"""
+Encoded sequence store: every record of a FASTA file in one contiguous uint8 buffer.
+
+Record i is data[offsets[i]:offsets[i + 1]], handed out as a zero-copy NumPy view that
+the seqtools kernels (scoring.encode, distance, kmer, msa, pairwise) accept directly.
+load_fasta() parses the file once and caches the buffer next to it:
+
+    <fasta>.seqs.npy   residue bytes (memory-mapped on later loads)
+    <fasta>.seqs.json  ids, headers, offsets and the size / mtime of the FASTA they came from
+
+The cache is rebuilt whenever the FASTA changes; unwritable directories just skip it.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .scoring import UPPER, SeqLike, decode, encode
+
+__all__ = ["SequenceStore", "parse_fasta", "load_fasta", "cache_paths", "stream_fasta"]
+
+DEFAULT_CHUNK_SIZE = 1 << 24
+
+_CACHE_VERSION = 1
+
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[[ord(c) for c in " \t\r\n\v\f"]] = True
+
+
+class SequenceStore:
+    """
+    Ids plus one uint8 buffer holding all residues back to back, with an (n + 1)
+    int64 offsets array. Indexing returns views into the buffer, never copies.
+    `descriptions` are the full header lines (without ">"), defaulting to the ids.
+    """
+
+    __slots__ = ("ids", "descriptions", "data", "offsets", "_index")
+
+    def __init__(self, ids: Sequence[str], data: np.ndarray, offsets: np.ndarray,
+                 descriptions: Optional[Sequence[str]] = None):
+        self.ids = list(ids)
+        self.descriptions = list(ids if descriptions is None else descriptions)
+        self.data = data
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        if len(self.offsets) != len(self.ids) + 1:
+            raise ValueError(f"Expected {len(self.ids) + 1} offsets, got {len(self.offsets)}")
+        self._index = None
+
+    @classmethod
+    def from_sequences(cls, records: Iterable[Tuple[str, SeqLike]],
+                       descriptions: Optional[Sequence[str]] = None) -> "SequenceStore":
+        """Store from (id, sequence) pairs, e.g. [(rec.id, str(rec.seq)) for rec in SeqIO.parse(...)]."""
+        ids, parts = [], []
+        for seq_id, seq in records:
+            ids.append(str(seq_id))
+            parts.append(encode(str(seq) if not isinstance(seq, (bytes, np.ndarray)) else seq))
+        offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+        np.cumsum([len(p) for p in parts], out=offsets[1:])
+        data = np.concatenate(parts) if parts else np.zeros(0, dtype=np.uint8)
+        return cls(ids, data.astype(np.uint8, copy=False), offsets, descriptions)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        """Record i as a uint8 view into the shared buffer."""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"record index {i} out of range (0..{len(self) - 1})")
+        return self.data[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        return (self[i] for i in range(len(self)))
+
+    def __repr__(self) -> str:
+        return f"SequenceStore({len(self)} records, {len(self.data)} residues)"
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def index(self, seq_id: str) -> int:
+        """Position of the record with this id (first one if ids repeat)."""
+        if self._index is None:
+            self._index = {}
+            for i, name in enumerate(self.ids):
+                self._index.setdefault(name, i)
+        try:
+            return self._index[seq_id]
+        except KeyError:
+            raise KeyError(f"No record with id {seq_id!r}") from None
+
+    def text(self, i: int) -> str:
+        """Record i as a str (a copy), for code that indexes characters."""
+        return decode(self[i])
+
+    def items(self) -> List[Tuple[str, np.ndarray]]:
+        """(id, view) pairs in file order."""
+        return [(seq_id, self[i]) for i, seq_id in enumerate(self.ids)]
+
+    def subset(self, indices: Iterable[int]) -> "SequenceStore":
+        """
+        The given records as a store of their own. A leading run (range(k), e.g. the
+        first k records) stays a view of this buffer; any other selection is copied.
+        """
+        indices = list(indices)
+        k = len(indices)
+        if indices == list(range(k)):
+            return SequenceStore(self.ids[:k], self.data[:self.offsets[k]], self.offsets[:k + 1],
+                                 self.descriptions[:k])
+        return SequenceStore.from_sequences(((self.ids[i], self[i]) for i in indices),
+                                            [self.descriptions[i] for i in indices])
+
+    def upper(self) -> "SequenceStore":
+        """Upper-cased copy of the whole store, in one lookup-table pass over the buffer."""
+        return SequenceStore(self.ids, UPPER[self.data], self.offsets, self.descriptions)
+
+    def write_fasta(self, path: Union[str, Path], width: int = 60) -> None:
+        """Write the records as FASTA (`width` residues per line)."""
+        with open(path, "w", encoding="ascii") as fh:
+            for header, seq in zip(self.descriptions, self):
+                fh.write(f">{header}\n")
+                text = decode(seq)
+                for k in range(0, len(text), width):
+                    fh.write(text[k:k + width] + "\n")
+
+
+def parse_fasta(raw: bytes) -> SequenceStore:
+    """
+    Parse FASTA bytes in a few vectorised passes: header lines are masked out with a
+    cumulative sum over their start / end markers and whitespace is dropped, so the
+    residues of all records land in one buffer. Ids are the header text up to the
+    first whitespace (as SeqRecord.id).
+    """
+    buf = np.frombuffer(raw, dtype=np.uint8)
+    gt = np.flatnonzero(buf == ord(">"))
+    starts = gt[(gt == 0) | (buf[gt - 1] == ord("\n"))] if gt.size else gt
+    newlines = np.flatnonzero(buf == ord("\n"))
+    ends = np.append(newlines, len(buf))[np.searchsorted(newlines, starts)]
+
+    marks = np.zeros(len(buf) + 1, dtype=np.int8)
+    marks[starts] += 1
+    marks[ends] -= 1
+    keep = (np.cumsum(marks[:-1]) == 0) & ~_WHITESPACE[buf]
+    if starts.size:
+        keep[:starts[0]] = False  # text before the first header is not part of any record
+
+    kept_before = np.concatenate([[0], np.cumsum(keep, dtype=np.int64)])
+    offsets = np.append(kept_before[starts], kept_before[-1])
+    headers = [raw[s + 1:e].decode().strip() for s, e in zip(starts, ends)]
+    ids = [(h.split(None, 1) or [""])[0] for h in headers]
+    return SequenceStore(ids, buf[keep], offsets, headers)
+
+
+def cache_paths(fasta_path: Union[str, Path]) -> Tuple[Path, Path]:
+    """The (<fasta>.seqs.npy, <fasta>.seqs.json) pair used by load_fasta()."""
+    fasta_path = Path(fasta_path)
+    return fasta_path.with_name(fasta_path.name + ".seqs.npy"), fasta_path.with_name(fasta_path.name + ".seqs.json")
+
+
+def _stamp(path: Path) -> dict:
+    st = path.stat()
+    return {"version": _CACHE_VERSION, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _read_cache(fasta_path: Path) -> Optional[SequenceStore]:
+    data_path, meta_path = cache_paths(fasta_path)
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("source") != _stamp(fasta_path):
+            return None
+        data = np.load(data_path, mmap_mode="r") if meta["offsets"][-1] else np.zeros(0, dtype=np.uint8)
+        return SequenceStore(meta["ids"], data, meta["offsets"], meta["descriptions"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_cache(fasta_path: Path, store: SequenceStore) -> None:
+    data_path, meta_path = cache_paths(fasta_path)
+    meta = {"source": _stamp(fasta_path), "ids": store.ids, "descriptions": store.descriptions,
+            "offsets": store.offsets.tolist()}
+    try:
+        for path, write in [(data_path, lambda fh: np.save(fh, np.ascontiguousarray(store.data))),
+                            (meta_path, lambda fh: fh.write(json.dumps(meta).encode()))]:
+            tmp = path.with_name(path.name + ".tmp")
+            with open(tmp, "wb") as fh:
+                write(fh)
+            os.replace(tmp, path)  # the metadata goes last: a half-written cache is never trusted
+    except OSError:
+        pass
+
+
+def load_fasta(path: Union[str, Path], upper: bool = False, cache: bool = True) -> SequenceStore:
+    """
+    All records of a FASTA (or .gz) file as a SequenceStore. With `cache`, the parsed
+    buffer is reused from <fasta>.seqs.npy (memory-mapped) while the FASTA is unchanged.
+    `upper` upper-cases the residues (soft-masked bases compare equal to the others).
+    """
+    path = Path(path)
+    store = _read_cache(path) if cache else None
+    if store is None:
+        with _open_fasta(path) as fh:
+            store = parse_fasta(fh.read())
+        if cache:
+            _write_cache(path, store)
+    return store.upper() if upper else store
+
+
+def _open_fasta(path: Path):
+    return gzip.open(path, "rb") if path.suffix == ".gz" else open(path, "rb")
+
+
+def stream_fasta(path: Union[str, Path], chunk_size: int = DEFAULT_CHUNK_SIZE, strip: bool = True
+                 ) -> Iterator[Tuple[int, str, np.ndarray]]:
+    """
+    Read a FASTA (or .gz) file `chunk_size` bytes at a time, without building the whole
+    sequence. Yields (record index, header line, residues) with whitespace removed; a
+    long record arrives as several consecutive blocks, and every record yields at least
+    one (possibly empty) block as soon as its header is complete. Memory stays O(chunk).
+    With strip=False the blocks keep their line breaks (for consumers that skip
+    whitespace anyway, e.g. byte counts).
+    """
+    index, header, head_parts = -1, "", []
+    in_header, at_line_start = False, True
+    empty = np.zeros(0, dtype=np.uint8)
+    with _open_fasta(Path(path)) as fh:
+        while True:
+            raw = fh.read(chunk_size)
+            if not raw:
+                break
+            buf = np.frombuffer(raw, dtype=np.uint8)
+            pos, n = 0, len(raw)
+            while pos < n:
+                if in_header:
+                    nl = raw.find(b"\n", pos)
+                    head_parts.append(raw[pos:n if nl < 0 else nl])
+                    if nl < 0:
+                        pos = n
+                        break
+                    index, header, head_parts = index + 1, b"".join(head_parts).decode().strip(), []
+                    in_header, pos, at_line_start = False, nl + 1, True
+                    yield index, header, empty
+                    continue
+                if at_line_start and raw.startswith(b">", pos):
+                    start = pos
+                else:
+                    k = raw.find(b"\n>", pos)
+                    start = n if k < 0 else k + 1
+                if index >= 0 and start > pos:
+                    block = buf[pos:start]
+                    if strip:
+                        block = block[~_WHITESPACE[block]]
+                    if block.size:
+                        yield index, header, block
+                pos = start
+                if start < n:
+                    in_header, pos = True, start + 1
+            at_line_start = raw.endswith(b"\n")
+    if in_header:  # header on the last line, without a newline
+        yield index + 1, b"".join(head_parts).decode().strip(), empty
@@ -0,0 +1,49 @@
+"""Traceback shared by the linear-gap NW / SW engines of Lab 02."""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+from .cigar import DELETE, INSERT, MATCH, MISMATCH, Ops, from_steps
+from .scoring import pair_score
+
+__all__ = ["traceback_linear"]
+
+
+def traceback_linear(score, seq1: str, seq2: str, table: np.ndarray, gap: int,
+                     i: int = None, j: int = None, local: bool = False) -> Tuple[Ops, Tuple[int, int]]:
+    """
+    Walk a filled linear-gap score matrix (list of lists or ndarray) back from (i, j),
+    by default the bottom-right corner. Ties prefer diagonal, then up, then left.
+
+    Global: runs to (0, 0), finishing along the borders with gaps.
+    Local: stops at the first cell that scores 0.
+
+    Returns (ops, (i0, j0)): run-length ops (seqtools.cigar) and the 0-based offsets
+    in seq1 / seq2 where the alignment starts. No aligned strings are built here;
+    seqtools.cigar.render does that on demand.
+    """
+    i = len(seq1) if i is None else i
+    j = len(seq2) if j is None else j
+    steps = []
+    while i > 0 and j > 0:
+        current = score[i][j]
+        if local and current <= 0:
+            break
+        a, b = seq1[i - 1], seq2[j - 1]
+        if current == score[i - 1][j - 1] + pair_score(table, a, b):
+            steps.append(MATCH if a == b else MISMATCH)
+            i -= 1; j -= 1
+        elif current == score[i - 1][j] + gap:
+            steps.append(INSERT)
+            i -= 1
+        else:
+            steps.append(DELETE)
+            j -= 1
+    if not local:
+        steps.extend(INSERT * i)
+        steps.extend(DELETE * j)
+        i = j = 0
+    return from_steps(steps), (i, j)
@@ -0,0 +1,260 @@
+"""
+Lab 02 alignment engines (NW NumPy / Hirschberg / banded / affine, SW score / traceback /
+affine, sw_scan) checked against Align.PairwiseAligner, plus AlignmentResult itself.
+
+Run: python -m unittest discover -s tests   (or: python -m pytest tests)
+"""
+
+import random
+import sys
+import unittest
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+LAB_DIR = REPO_ROOT / "labs" / "02_alignment"
+for path in (REPO_ROOT, LAB_DIR):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import ex01_global_nw as nw
+import ex02_local_sw as sw
+
+from seqtools.alignment import AlignmentResult, biopython_align
+from seqtools.pairwise import get_aligner
+from seqtools.scoring import pair_score, score_table
+
+PROTEIN = "ACDEFGHIKLMNPQRSTVWY"
+
+
+def random_seq(rng: random.Random, length: int, alphabet: str = "ACGT") -> str:
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def mutate(rng: random.Random, seq: str, rate: float, alphabet: str = "ACGT") -> str:
+    """Substitutions, insertions and deletions at `rate` each, so the pairs have real gaps."""
+    out = []
+    for ch in seq:
+        r = rng.random()
+        if r < rate:
+            continue
+        out.append(rng.choice(alphabet) if r < 2 * rate else ch)
+        if rng.random() < rate:
+            out.append(rng.choice(alphabet))
+    return "".join(out)
+
+
+def random_pairs(seed: int, n: int, alphabet: str = "ACGT", max_len: int = 120):
+    rng = random.Random(seed)
+    pairs = [(alphabet[0], alphabet[0]), (alphabet[0], alphabet[1]), (alphabet[:3], alphabet[2])]
+    for _ in range(n):
+        a = random_seq(rng, rng.randint(1, max_len), alphabet)
+        b = mutate(rng, a, rng.choice([0.02, 0.1, 0.3]), alphabet) if rng.random() < 0.7 \
+            else random_seq(rng, rng.randint(1, max_len), alphabet)
+        pairs.append((a, b))
+    return pairs
+
+
+def rescore(result: AlignmentResult, table, gap_open: int, gap_extend: int) -> int:
+    """Score of the gapped strings: pairs from `table`, every gap run open + (L - 1) * extend."""
+    align1, align2 = result.aligned
+    score, previous = 0, None
+    for x, y in zip(align1, align2):
+        state = "I" if y == "-" else "D" if x == "-" else "M"
+        if state == "M":
+            score += pair_score(table, x, y)
+        else:
+            score += gap_extend if state == previous else gap_open
+        previous = state
+    return score
+
+
+def degapped(result: AlignmentResult):
+    return tuple(s.replace("-", "") for s in result.aligned)
+
+
+class GlobalEnginesTest(unittest.TestCase):
+
+    def check(self, run, a: str, b: str, expected: float, table, gap_open: int, gap_extend: int):
+        result = run(a, b)
+        self.assertEqual(result.score, expected, (a, b))
+        self.assertEqual(degapped(result), (a, b))
+        self.assertEqual(rescore(result, table, gap_open, gap_extend), result.score, (a, b))
+
+    def test_linear_engines_match_biopython(self):
+        scoring = dict(match=2, mismatch=-1, gap=-2)
+        table = score_table(2, -1)
+        aligner = get_aligner("global", **scoring)
+        engines = {
+            "numpy": lambda a, b: nw.needleman_wunsch_numpy(a, b, **scoring),
+            "hirschberg": lambda a, b: nw.needleman_wunsch_hirschberg(a, b, **scoring),
+            "banded": lambda a, b: nw.needleman_wunsch_banded(a, b, band=2, **scoring),
+        }
+        for a, b in random_pairs(1, 60):
+            expected = aligner.score(a, b)
+            for name, run in engines.items():
+                with self.subTest(engine=name, a=a, b=b):
+                    self.check(run, a, b, expected, table, -2, -2)
+
+    def test_hirschberg_splits_large_problems(self):
+        rng = random.Random(2)
+        a = random_seq(rng, 700)
+        b = mutate(rng, a, 0.1)
+        self.assertGreater((len(a) + 1) * (len(b) + 1), nw.HIRSCHBERG_BASE_CELLS)
+        self.check(lambda x, y: nw.needleman_wunsch_hirschberg(x, y), a, b,
+                   get_aligner("global").score(a, b), score_table(1, -1), -2, -2)
+
+    def test_substitution_matrix(self):
+        table = score_table(matrix="BLOSUM62")
+        aligner = get_aligner("global", gap=-4, matrix="BLOSUM62")
+        for a, b in random_pairs(3, 25, PROTEIN, 80):
+            expected = aligner.score(a, b)
+            for run in (nw.needleman_wunsch_numpy, nw.needleman_wunsch_hirschberg, nw.needleman_wunsch_banded):
+                with self.subTest(engine=run.__name__, a=a, b=b):
+                    self.check(lambda x, y: run(x, y, gap=-4, matrix="BLOSUM62"), a, b, expected, table, -4, -4)
+
+    def test_affine_matches_biopython(self):
+        for match, mismatch, go, ge in [(1, -1, -5, -1), (2, -3, -4, -2), (1, -2, -2, -3)]:
+            table = score_table(match, mismatch)
+            aligner = get_aligner("global", match, mismatch, gap_open=go, gap_extend=ge)
+            for a, b in random_pairs(4, 40):
+                with self.subTest(scoring=(match, mismatch, go, ge), a=a, b=b):
+                    self.check(lambda x, y: nw.needleman_wunsch_affine(x, y, match, mismatch, go, ge),
+                               a, b, aligner.score(a, b), table, go, ge)
+
+    def test_empty_sequences(self):
+        # PairwiseAligner refuses empty input: a global alignment is then one gap run
+        for a, b in [("", ""), ("ACG", ""), ("", "ACGT")]:
+            with self.subTest(a=a, b=b):
+                length = len(a) + len(b)
+                for run in (nw.needleman_wunsch_numpy, nw.needleman_wunsch_hirschberg, nw.needleman_wunsch_banded):
+                    self.assertEqual(tuple(run(a, b)), (a or "-" * length, b or "-" * length, -2 * length))
+                affine = nw.needleman_wunsch_affine(a, b, gap_open=-5, gap_extend=-1)
+                self.assertEqual(affine.score, -5 - (length - 1) if length else 0)
+
+    def test_align_global_dispatch(self):
+        a, b = "ACGTTGCAAGT", "ACGTGCAAGGT"
+        expected = get_aligner("global").score(a, b)
+        for engine in ("numpy", "hirschberg", "banded"):
+            self.assertEqual(nw.align_global(a, b, engine=engine).score, expected)
+        # a budget too small for the matrix moves to Hirschberg, same score
+        self.assertEqual(nw.align_global(a, b, engine="numpy", max_matrix_mb=1e-6).score, expected)
+        with self.assertRaises(ValueError):
+            nw.align_global(a, b, engine="python", matrix="BLOSUM62")
+
+
+class LocalEnginesTest(unittest.TestCase):
+
+    def check_local(self, result: AlignmentResult, a: str, b: str, expected: float, table, go: int, ge: int):
+        self.assertEqual(result.score, expected, (a, b))
+        self.assertEqual(rescore(result, table, go, ge), result.score, (a, b))
+        seg1, seg2 = degapped(result)
+        self.assertEqual(a[result.start1:result.end1], seg1)
+        self.assertEqual(b[result.start2:result.end2], seg2)
+
+    def test_linear_matches_biopython(self):
+        table = score_table(3, -3)
+        aligner = get_aligner("local", 3, -3, -2)
+        for a, b in random_pairs(5, 60):
+            expected = aligner.score(a, b)
+            with self.subTest(a=a, b=b):
+                score, _ = sw.smith_waterman_score(a, b)
+                self.assertEqual(score, expected)
+                self.check_local(sw.smith_waterman_traceback(a, b), a, b, expected, table, -2, -2)
+
+    def test_affine_matches_biopython(self):
+        for matrix, go, ge in [(None, -5, -2), (None, -2, -3), ("BLOSUM62", -11, -1)]:
+            alphabet = PROTEIN if matrix else "ACGT"
+            table = score_table(3, -3, matrix)
+            aligner = get_aligner("local", 3, -3, gap_open=go, gap_extend=ge, matrix=matrix)
+            for a, b in random_pairs(6, 30, alphabet, 90):
+                expected = aligner.score(a, b)
+                with self.subTest(matrix=matrix, gaps=(go, ge), a=a, b=b):
+                    self.assertEqual(sw.affine_local_score(a, b, table, go, ge), expected)
+                    result = sw.smith_waterman_affine(a, b, gap_open=go, gap_extend=ge, matrix=matrix)
+                    self.check_local(result, a, b, expected, table, go, ge)
+
+    def test_top_alignments_do_not_overlap(self):
+        rng = random.Random(7)
+        motif = random_seq(rng, 30)
+        a = random_seq(rng, 50) + motif + random_seq(rng, 40) + motif + random_seq(rng, 20)
+        b = random_seq(rng, 10) + motif + random_seq(rng, 15)
+        hits = sw.smith_waterman_top(a, b, k=3)
+        self.assertEqual(hits[0].score, get_aligner("local", 3, -3, -2).score(a, b))
+        self.assertEqual([h.score for h in hits], sorted((h.score for h in hits), reverse=True))
+        cells = [set(zip(*h.aligned_positions())) for h in hits]
+        for x in range(len(cells)):
+            for y in range(x + 1, len(cells)):
+                self.assertFalse(cells[x] & cells[y])
+
+
+class ScanTest(unittest.TestCase):
+
+    def scan_all(self, query, subjects, **scoring):
+        return dict(sw.sw_scan(query, subjects, top_n=len(subjects), **scoring))
+
+    def test_scores_match_biopython(self):
+        rng = random.Random(8)
+        query = random_seq(rng, 150)
+        subjects = [mutate(rng, query[rng.randint(0, 50):], rng.choice([0.05, 0.2])) for _ in range(40)]
+        subjects += [random_seq(rng, rng.randint(0, 300)) for _ in range(40)]
+        for go, ge in [(-5, -2), (-3, -3), (-2, -4)]:  # the last one takes the exact per-pair path
+            aligner = get_aligner("local", 3, -3, gap_open=go, gap_extend=ge)
+            expected = {k: aligner.score(query, s) if s else 0 for k, s in enumerate(subjects)}
+            for lanes, batch_size in [(16, None), (4, 8), (8, 1000)]:
+                with self.subTest(gaps=(go, ge), lanes=lanes, batch_size=batch_size):
+                    got = self.scan_all(query, subjects, gap_open=go, gap_extend=ge, lanes=lanes,
+                                        batch_size=batch_size)
+                    self.assertEqual(got, expected)
+
+    def test_striped_batches_are_exercised(self):
+        rng = random.Random(9)
+        query = random_seq(rng, 200, PROTEIN)
+        subjects = [random_seq(rng, rng.randint(50, 250), PROTEIN) for _ in range(60)]
+        self.assertGreaterEqual(60 * len(query), sw.STRIPED_MIN_CELLS)
+        table = score_table(matrix="BLOSUM62")
+        got = self.scan_all(query, subjects, matrix="BLOSUM62", gap_open=-11, gap_extend=-1, batch_size=60)
+        self.assertEqual(got, {k: sw.affine_local_score(query, s, table, -11, -1) for k, s in enumerate(subjects)})
+
+    def test_int16_saturation_falls_back_to_int32(self):
+        query = "ACGT" * 3000  # self score 36000 > int16
+        hits = sw.sw_scan(query, [query] * 3, top_n=1, batch_size=3)
+        self.assertEqual(hits, [(0, 36000)])
+
+    def test_top_n_order(self):
+        hits = sw.sw_scan("ACGTACGT", ["TTTT", "ACGTACGT", "ACGA", "ACGTACGT"], top_n=3)
+        self.assertEqual([k for k, _ in hits], [1, 3, 2])
+
+
+class AlignmentResultTest(unittest.TestCase):
+
+    def setUp(self):
+        self.a, self.b = "GATTACAGG", "GCATGCAG"
+        self.result = nw.needleman_wunsch_numpy(self.a, self.b)
+
+    def test_dict_round_trip(self):
+        again = AlignmentResult.from_dict(self.result.to_dict(), self.a, self.b)
+        self.assertEqual(again, self.result)
+        self.assertEqual(again.cigar, self.result.cigar)
+
+    def test_tuple_compatibility(self):
+        align1, align2, score = self.result
+        self.assertEqual((align1, align2, score), (self.result[0], self.result[1], self.result[2]))
+        self.assertEqual(len(align1), self.result.length)
+
+    def test_statistics_match_the_strings(self):
+        align1, align2 = self.result.aligned
+        matches = sum(x == y for x, y in zip(align1, align2))
+        gaps = sum("-" in (x, y) for x, y in zip(align1, align2))
+        self.assertEqual((self.result.matches, self.result.gaps), (matches, gaps))
+        self.assertAlmostEqual(self.result.identity, matches / len(align1))
+
+    def test_agrees_with_biopython_alignment(self):
+        ours = biopython_align(self.a, self.b)
+        self.assertEqual(ours.score, get_aligner("global").score(self.a, self.b))
+        self.assertEqual(degapped(ours), (self.a, self.b))
+        local = sw.biopython_alignment("TTGATTACA", "CCGATTACC")
+        self.assertEqual((local.start1, local.end1, local.score), (2, 8, 18))
+
+
+if __name__ == "__main__":
+    unittest.main()
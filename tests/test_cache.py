@@ -0,0 +1,148 @@
+"""
+seqtools.cache: keys, size accounting and LRU eviction of the SQLite result cache.
+
+Run: python -m unittest discover -s tests   (or: python -m pytest tests)
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from seqtools.cache import ResultCache, make_key, open_cache
+
+
+def stored_bytes(cache: ResultCache) -> int:
+    return cache.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+
+def stored_keys(cache: ResultCache) -> set:
+    return {key for key, in cache.conn.execute("SELECT key FROM entries")}
+
+
+class MakeKeyTest(unittest.TestCase):
+
+    def test_parts_are_length_prefixed(self):
+        self.assertNotEqual(make_key("ns", "AB", "C"), make_key("ns", "A", "BC"))
+
+    def test_str_and_bytes_parts_agree(self):
+        self.assertEqual(make_key("ns", "ACGT"), make_key("ns", b"ACGT"))
+
+    def test_params_order_does_not_matter(self):
+        self.assertEqual(make_key("ns", "A", match=1, gap=-2), make_key("ns", "A", gap=-2, match=1))
+        self.assertNotEqual(make_key("ns", "A", gap=-2), make_key("ns", "A", gap=-3))
+        self.assertNotEqual(make_key("ns", "A"), make_key("other", "A"))
+
+
+class ResultCacheTest(unittest.TestCase):
+    """A fresh cache file in a temporary directory per test."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "cache.sqlite"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open(self, max_bytes: int = 1 << 20) -> ResultCache:
+        cache = ResultCache(self.path, max_bytes=max_bytes)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_round_trip_and_counters(self):
+        cache = self.open()
+        value = {"score": 12, "ops": [["=", 3], ["X", 1]]}
+        self.assertIsNone(cache.get("k"))
+        cache.set("k", value)
+        self.assertEqual(cache.get("k"), value)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_get_or_compute_calls_once(self):
+        cache = self.open()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return [1, 2, 3]
+
+        self.assertEqual(cache.get_or_compute("k", compute), [1, 2, 3])
+        self.assertEqual(cache.get_or_compute("k", compute), [1, 2, 3])
+        self.assertEqual(len(calls), 1)
+
+    def test_cached_none_is_a_hit(self):
+        cache = self.open()
+        cache.set("k", None)
+        self.assertIsNone(cache.get_or_compute("k", lambda: self.fail("recomputed")))
+
+    def test_replacing_a_key_keeps_the_size_exact(self):
+        cache = self.open()
+        for _ in range(50):
+            cache.set("k", "x" * 100)
+        self.assertEqual(cache._total, stored_bytes(cache))
+        cache.set("k", "short")
+        self.assertEqual(cache._total, stored_bytes(cache))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self.open(max_bytes=1000)
+        value = "x" * 98  # 100 bytes as JSON
+        for i in range(9):
+            cache.set(f"k{i}", value)
+            time.sleep(0.002)  # distinct access times
+        cache.get("k0")  # k0 is now the most recently used
+        time.sleep(0.002)
+        cache.set("k9", value)
+        cache.set("k10", value)  # 1100 bytes > 1000: drop the oldest down to 900
+        self.assertEqual(stored_keys(cache), {"k0"} | {f"k{i}" for i in range(3, 11)})
+        self.assertLessEqual(stored_bytes(cache), 900)
+        self.assertEqual(cache._total, stored_bytes(cache))
+
+    def test_entries_survive_reopening(self):
+        cache = self.open()
+        cache.set("k", [1, 2])
+        cache.close()
+        again = self.open()
+        self.assertEqual(again.get("k"), [1, 2])
+        self.assertEqual(again._total, stored_bytes(again))
+
+    def test_pickled_cache_reopens_its_connection(self):
+        cache = self.open()
+        cache.set("k", "v")
+        clone = pickle.loads(pickle.dumps(cache))
+        self.addCleanup(clone.close)
+        self.assertIsNone(clone._conn)
+        self.assertEqual(clone.get("k"), "v")
+
+    def test_clear(self):
+        cache = self.open()
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.clear()
+        self.assertEqual(stored_keys(cache), set())
+        self.assertEqual(cache._total, 0)
+
+
+class OpenCacheTest(unittest.TestCase):
+
+    def test_off_disables_the_cache(self):
+        self.assertIsNone(open_cache("off"))
+        with mock.patch.dict(os.environ, {"SEQTOOLS_CACHE": "off"}):
+            self.assertIsNone(open_cache())
+
+    def test_environment_path(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "env.sqlite"
+            with mock.patch.dict(os.environ, {"SEQTOOLS_CACHE": str(path)}):
+                cache = open_cache()
+            self.assertEqual(cache.path, path)
+
+
+if __name__ == "__main__":
+    unittest.main()
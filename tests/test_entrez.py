@@ -0,0 +1,288 @@
+"""
+seqtools.entrez against a local E-utilities stub (http.server on 127.0.0.1), no network.
+
+Run: python -m unittest discover -s tests   (or: python -m pytest tests)
+"""
+
+import json
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from seqtools.cache import ResultCache
+from seqtools.entrez import EntrezClient, EntrezError, checkpoint_path, download
+
+N_RECORDS = 1234
+
+
+def make_records(n: int, tag: str = "") -> list:
+    return [f">rec{i} test record {tag}\nACGT{i}{tag}\n" for i in range(n)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """esearch (JSON), epost (XML) and efetch (FASTA) on the History server model."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        srv = self.server
+        params = dict(urllib.parse.parse_qsl(self.rfile.read(int(self.headers["Content-Length"])).decode()))
+        utility = self.path.rsplit("/", 1)[-1].split(".")[0]
+        with srv.lock:
+            srv.calls[utility] = srv.calls.get(utility, 0) + 1
+            if utility == "esearch":
+                body = self.esearch()
+            elif utility == "epost":
+                body = self.epost(params["id"].split(","))
+            elif utility == "efetch":
+                failure = srv.failures.pop(0) if srv.failures else None
+                if failure is not None:
+                    self.send_response(failure[0])
+                    if failure[1] is not None:
+                        self.send_header("Retry-After", failure[1])
+                    self.end_headers()
+                    return
+                body = self.efetch(params)
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def new_session(self, indices) -> str:
+        srv = self.server
+        webenv = f"S{len(srv.sessions)}"
+        srv.sessions[webenv] = list(indices)
+        return webenv
+
+    def esearch(self) -> bytes:
+        webenv = self.new_session(range(len(self.server.records)))
+        return json.dumps({"esearchresult": {"count": str(len(self.server.records)),
+                                             "webenv": webenv, "querykey": "1"}}).encode()
+
+    def epost(self, ids) -> bytes:
+        known = {f"rec{i}": i for i in range(len(self.server.records))}
+        webenv = self.new_session(known[i] for i in ids if i in known)
+        invalid = "".join(f"<Id>{i}</Id>" for i in ids if i not in known)
+        return (f"<ePostResult><InvalidIdList>{invalid}</InvalidIdList>"
+                f"<QueryKey>1</QueryKey><WebEnv>{webenv}</WebEnv></ePostResult>").encode()
+
+    def efetch(self, params) -> bytes:
+        srv = self.server
+        if params.get("WebEnv") not in srv.sessions:
+            return b"<eFetchResult><ERROR>Unable to obtain query #1</ERROR></eFetchResult>"
+        start = int(params.get("retstart", 0))
+        stop = start + int(params["retmax"]) if params.get("retmax") else None
+        records = [srv.records[i] for i in srv.sessions[params["WebEnv"]][start:stop]]
+        if srv.truncate > 0 and len(records) > 1:
+            srv.truncate -= 1
+            records = records[:-1]
+        return "".join(records).encode()
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.lock = threading.Lock()
+        self.records = make_records(N_RECORDS)
+        self.sessions = {}
+        self.calls = {}
+        self.failures = []  # (status, Retry-After or None) for the next efetch calls
+        self.truncate = 0  # next efetch replies that drop their last record
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+
+class StubTestCase(unittest.TestCase):
+    """A fresh stub server and temporary directory per test."""
+
+    def setUp(self):
+        self.server = StubServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = Path(self.tmp.name) / "records.fa"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def client(self, **kwargs) -> EntrezClient:
+        kwargs.setdefault("cache", None)
+        kwargs.setdefault("offline", False)
+        return EntrezClient(email="test@example.org", base_url=self.server.url, rate=1000,
+                            backoff=0.001, **kwargs)
+
+
+class EntrezStubTest(StubTestCase):
+
+    def test_esearch_history_batches(self):
+        client = self.client()
+        total = download(client, self.out, term="tp53[gene]", batch_size=100, workers=3)
+        self.assertEqual(total, N_RECORDS)
+        self.assertEqual(self.out.read_text(), "".join(self.server.records))
+        self.assertEqual(self.server.calls, {"esearch": 1, "efetch": 13})
+        self.assertFalse(checkpoint_path(self.out).exists())
+
+    def test_max_records(self):
+        total = download(self.client(), self.out, term="tp53[gene]", max_records=250, batch_size=100)
+        self.assertEqual(total, 250)
+        self.assertEqual(self.out.read_text(), "".join(self.server.records[:250]))
+
+    def test_epost_skips_invalid_ids(self):
+        client = self.client()
+        query = client.epost("nuccore", ["rec3", "missing", "rec7"])
+        self.assertEqual(query.count, 2)
+        total = download(client, self.out, ids=["rec3", "missing", "rec7"], batch_size=1)
+        self.assertEqual(total, 2)
+        self.assertEqual(self.out.read_text(), self.server.records[3] + self.server.records[7])
+
+    def test_retries_429_and_503(self):
+        self.server.failures = [(429, "0"), (503, "0"), (503, None), (429, "0")]
+        client = self.client()
+        download(client, self.out, term="tp53[gene]", batch_size=500, workers=2)
+        self.assertEqual(self.out.read_text(), "".join(self.server.records))
+        self.assertEqual(client.retries, 4)
+
+    def test_retry_after_is_honoured(self):
+        self.server.failures = [(429, "1")]
+        client = self.client()
+        t0 = time.monotonic()
+        client.efetch(client.esearch("nuccore", "tp53[gene]"), 0, 10)
+        self.assertGreaterEqual(time.monotonic() - t0, 1.0)
+        self.assertEqual(client.retries, 1)
+
+    def test_retries_exhausted(self):
+        self.server.failures = [(503, "0")] * 3
+        client = self.client(max_retries=2)
+        with self.assertRaises(EntrezError):
+            client.efetch(client.esearch("nuccore", "tp53[gene]"), 0, 10)
+
+    def test_truncated_batch_is_fetched_again(self):
+        self.server.truncate = 2
+        client = self.client()
+        download(client, self.out, term="tp53[gene]", batch_size=100, workers=1)
+        self.assertEqual(self.out.read_text(), "".join(self.server.records))
+        self.assertEqual(self.server.calls["efetch"], 13 + 2)
+        self.assertEqual(client.retries, 2)
+
+    def test_expired_webenv_is_an_error(self):
+        client = self.client()
+        query = client.esearch("nuccore", "tp53[gene]")
+        self.server.sessions.clear()
+        with self.assertRaisesRegex(EntrezError, "Unable to obtain query"):
+            client.efetch(query, 0, 10)
+
+    def test_abort_then_resume(self):
+        # the server stops answering after 4 efetch calls: 4 batches are in the checkpoint
+        self.server.failures = [None] * 4 + [(400, None)] * 20
+        with self.assertRaises(EntrezError):
+            download(self.client(), self.out, term="tp53[gene]", batch_size=100, workers=1)
+        ckpt = json.loads(checkpoint_path(self.out).read_text())
+        self.assertEqual(len(ckpt["done"]), 4)
+        self.assertFalse(self.out.exists())
+
+        self.server.failures.clear()
+        self.server.calls.clear()
+        total = download(self.client(), self.out, term="tp53[gene]", batch_size=100, workers=3)
+        self.assertEqual(total, N_RECORDS)
+        self.assertEqual(self.server.calls["efetch"], 13 - 4)
+        self.assertEqual(self.out.read_text(), "".join(self.server.records))
+        self.assertFalse(checkpoint_path(self.out).exists())
+
+    def test_checkpoint_of_another_request_is_refused(self):
+        self.server.failures = [None] + [(400, None)] * 20
+        with self.assertRaises(EntrezError):
+            download(self.client(), self.out, term="tp53[gene]", batch_size=100, workers=1)
+        with self.assertRaisesRegex(EntrezError, "another download"):
+            download(self.client(), self.out, term="brca1[gene]", batch_size=100)
+
+
+class EntrezCacheTest(StubTestCase):
+    """The same stub, with the reply cache in a temporary entrez.sqlite."""
+
+    def setUp(self):
+        super().setUp()
+        self.cache = ResultCache(Path(self.tmp.name) / "entrez.sqlite")
+
+    def tearDown(self):
+        self.cache.close()
+        super().tearDown()
+
+    def cached_client(self, **kwargs) -> EntrezClient:
+        return self.client(cache=self.cache, **kwargs)
+
+    def expire(self, utility: str, **params) -> None:
+        key = self.cached_client()._cache_key(utility, **params)
+        entry = self.cache.get(key)
+        entry["t"] = 0.0
+        self.cache.set(key, entry)
+
+    def test_download_batches_skip_the_cache_by_default(self):
+        download(self.cached_client(), self.out, term="tp53[gene]", batch_size=100)
+        self.assertEqual(self.cache.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0], 1)
+        self.server.calls.clear()
+        download(self.cached_client(), self.out, term="tp53[gene]", batch_size=100)
+        # the batches are fetched again; the cached session is only posted again once
+        self.assertEqual(self.server.calls, {"esearch": 1, "efetch": 13})
+        self.assertEqual(self.out.read_text(), "".join(self.server.records))
+
+    def test_rerun_and_offline_come_from_the_cache(self):
+        download(self.cached_client(), self.out, term="tp53[gene]", cache_batches=True, batch_size=100, workers=3)
+        for client in (self.cached_client(), self.cached_client(offline=True)):
+            download(client, self.out, term="tp53[gene]", cache_batches=True, batch_size=100, workers=3)
+            self.assertEqual(client.requests, 0)
+            self.assertEqual(self.out.read_text(), "".join(self.server.records))
+        with self.assertRaises(EntrezError):
+            self.cached_client(offline=True).esearch("nuccore", "brca1[gene]")
+
+    def test_stale_session_is_posted_again_once(self):
+        download(self.cached_client(), self.out, term="tp53[gene]", cache_batches=True, batch_size=100)
+        self.server.sessions.clear()  # every WebEnv expired
+        client = self.cached_client()
+        download(client, self.out, term="tp53[gene]", cache_batches=True, batch_size=300, workers=3)
+        self.assertEqual(self.out.read_text(), "".join(self.server.records))
+        self.assertEqual(self.server.calls["esearch"], 2)
+        # the refresh kept the result set, so the first run's batches are still used
+        client = self.cached_client()
+        download(client, self.out, term="tp53[gene]", cache_batches=True, batch_size=100)
+        self.assertEqual(client.requests, 0)
+
+    def test_batches_of_an_expired_result_set_are_not_reused(self):
+        download(self.cached_client(), self.out, term="tp53[gene]", cache_batches=True, batch_size=100)
+        self.server.records = make_records(N_RECORDS, tag="v2")  # same count, new records
+        self.expire("esearch+history", db="nuccore", term="tp53[gene]")
+        self.server.calls.clear()
+        download(self.cached_client(), self.out, term="tp53[gene]", cache_batches=True, batch_size=100)
+        self.assertEqual(self.out.read_text(), "".join(self.server.records))
+        self.assertEqual(self.server.calls, {"esearch": 1, "efetch": 13})
+
+    def test_changed_count_is_refused(self):
+        download(self.cached_client(), self.out, term="tp53[gene]", cache_batches=True, batch_size=100)
+        self.server.records = make_records(N_RECORDS + 1)
+        with self.assertRaisesRegex(EntrezError, "now matches"):
+            download(self.cached_client(), self.out, term="tp53[gene]", cache_batches=True, batch_size=200)
+        checkpoint_path(self.out).unlink()  # as the checkpoint error asks
+        download(self.cached_client(), self.out, term="tp53[gene]", cache_batches=True, batch_size=200)
+        self.assertEqual(self.out.read_text(), "".join(self.server.records))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+seqtools.faidx and seqstore.stream_fasta: the .fai index and random access to plain,
+gzip and BGZF FASTA files (LF and CRLF), and the constant-memory streaming parser.
+
+Run: python -m unittest discover -s tests   (or: python -m pytest tests)
+"""
+
+import gzip
+import random
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from Bio import bgzf
+
+from seqtools.faidx import IndexedFasta, build_fai, fai_path, is_bgzf
+from seqtools.scoring import decode
+from seqtools.seqstore import parse_fasta, stream_fasta
+
+
+def make_records(seed: int = 7, n: int = 12):
+    rng = random.Random(seed)
+    lengths = [0, 1, 59, 60, 61] + [rng.randint(0, 5000) for _ in range(n - 5)]
+    return [(f"rec{i} description {i}", "".join(rng.choice("ACGTNacgt") for _ in range(length)))
+            for i, length in enumerate(lengths)]
+
+
+def fasta_bytes(records, width: int = 60, newline: str = "\n") -> bytes:
+    out = []
+    for header, seq in records:
+        out.append(f">{header}")
+        out.extend(seq[k:k + width] for k in range(0, len(seq), width))
+    return (newline.join(out) + newline).encode()
+
+
+class FastaFiles(unittest.TestCase):
+    """The same records written as plain / gzip / BGZF files, with LF or CRLF line ends."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.records = make_records()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, kind: str, newline: str = "\n", width: int = 60) -> Path:
+        raw = fasta_bytes(self.records, width, newline)
+        name = "crlf" if newline == "\r\n" else "lf"
+        if kind == "plain":
+            path = self.dir / f"{name}.fa"
+            path.write_bytes(raw)
+        elif kind == "gzip":
+            path = self.dir / f"{name}.fa.gz"
+            path.write_bytes(gzip.compress(raw))
+        else:
+            path = self.dir / f"{name}.bgzf.fa.gz"
+            with bgzf.BgzfWriter(str(path), "wb") as fh:
+                fh.write(raw)
+        return path
+
+    def variants(self):
+        for kind in ("plain", "gzip", "bgzf"):
+            for newline in ("\n", "\r\n"):
+                yield kind, newline, self.write(kind, newline)
+
+
+class IndexedFastaTest(FastaFiles):
+
+    def test_records_and_slices(self):
+        rng = random.Random(1)
+        for kind, newline, path in self.variants():
+            with self.subTest(kind=kind, crlf=newline == "\r\n"), IndexedFasta(path) as fa:
+                self.assertEqual(len(fa), len(self.records))
+                self.assertEqual(fa.ids, [header.split()[0] for header, _ in self.records])
+                self.assertEqual(fa.lengths.tolist(), [len(seq) for _, seq in self.records])
+                for i, (header, seq) in enumerate(self.records):
+                    self.assertEqual(fa.text(i), seq)
+                    self.assertEqual(fa.description(i), header)
+                    start = rng.randint(0, len(seq))
+                    end = rng.randint(start, len(seq) + 5)
+                    self.assertEqual(fa.text(f"rec{i}", start, end), seq[start:end])
+                self.assertEqual(decode(fa.fetch(5, upper=True)), self.records[5][1].upper())
+
+    def test_index_matches_samtools_layout(self):
+        path = self.write("plain", "\r\n")
+        index = build_fai(path)
+        raw = path.read_bytes()
+        rec = index["rec3"]
+        self.assertEqual((rec.length, rec.linebases, rec.linewidth), (60, 60, 62))
+        self.assertEqual(raw[rec.offset:rec.offset + 60].decode(), self.records[3][1])
+
+    def test_index_file_is_written_and_bgzf_detected(self):
+        path = self.write("bgzf")
+        self.assertTrue(is_bgzf(path))
+        self.assertFalse(is_bgzf(self.write("gzip")))
+        with IndexedFasta(path) as fa:
+            fa.text(len(fa) - 1)
+        self.assertTrue(fai_path(path).exists())
+
+    def test_ragged_lines_fall_back_to_a_full_load(self):
+        path = self.dir / "ragged.fa"
+        path.write_bytes(b">a first\nACG\nTTTT\nG\n>b\nCC\n")
+        with IndexedFasta(path) as fa:
+            self.assertEqual([fa.text(0), fa.text("b")], ["ACGTTTTG", "CC"])
+            self.assertEqual(fa.description(0), "a first")
+
+    def test_store_reads_only_the_requested_records(self):
+        path = self.write("bgzf")
+        with IndexedFasta(path) as fa:
+            store = fa.store(["rec7", 2])
+        self.assertEqual(store.ids, ["rec7", "rec2"])
+        self.assertEqual([store.text(0), store.text(1)], [self.records[7][1], self.records[2][1]])
+
+    def test_unknown_key(self):
+        with IndexedFasta(self.write("plain")) as fa:
+            with self.assertRaises(KeyError):
+                fa.fetch("missing")
+            with self.assertRaises(IndexError):
+                fa.fetch(len(fa))
+
+
+class StreamFastaTest(FastaFiles):
+
+    def collect(self, path: Path, chunk_size: int):
+        records = {}
+        for index, header, block in stream_fasta(path, chunk_size=chunk_size):
+            name, parts = records.setdefault(index, (header, []))
+            self.assertEqual(header, name)
+            parts.append(decode(block))
+        return [(header, "".join(parts)) for _, (header, parts) in sorted(records.items())]
+
+    def test_round_trip(self):
+        for kind, newline, path in self.variants():
+            for chunk_size in (1, 7, 64, 1 << 20):
+                if kind != "plain" and chunk_size == 1:
+                    continue  # byte-sized gzip reads only slow the test down
+                with self.subTest(kind=kind, crlf=newline == "\r\n", chunk_size=chunk_size):
+                    self.assertEqual(self.collect(path, chunk_size), self.records)
+
+    def test_agrees_with_parse_fasta(self):
+        path = self.write("plain", width=13)
+        store = parse_fasta(path.read_bytes())
+        streamed = self.collect(path, 100)
+        self.assertEqual([header for header, _ in streamed], store.descriptions)
+        self.assertEqual([seq for _, seq in streamed], [store.text(i) for i in range(len(store))])
+
+    def test_header_without_trailing_newline(self):
+        path = self.dir / "tail.fa"
+        path.write_bytes(b">a\nAC\n>last")
+        self.assertEqual(self.collect(path, 3), [("a", "AC"), ("last", "")])
+
+    def test_unstripped_blocks_keep_line_breaks(self):
+        path = self.write("plain", width=10)
+        text = "".join(decode(block) for _, _, block in stream_fasta(path, chunk_size=50, strip=False))
+        self.assertEqual(text.replace("\n", ""), "".join(seq for _, seq in self.records))
+
+
+if __name__ == "__main__":
+    unittest.main()
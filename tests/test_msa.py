@@ -0,0 +1,156 @@
+"""
+seqtools.msa: the profile-profile aligner (checked against Align.PairwiseAligner with free
+end gaps) and the progressive alignment built on it.
+
+Run: python -m unittest discover -s tests   (or: python -m pytest tests)
+"""
+
+import random
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from seqtools.msa import MATRIX_GAPS, align_profiles, default_gaps, guide_tree, progressive_align
+from seqtools.pairwise import get_aligner
+from seqtools.scoring import UPPER, encode, pair_score, score_table
+
+PROTEIN = "ACDEFGHIKLMNPQRSTVWY"
+
+
+def random_seq(rng: random.Random, length: int, alphabet: str = "ACGT") -> str:
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def mutate(rng: random.Random, seq: str, rate: float, alphabet: str = "ACGT") -> str:
+    out = []
+    for ch in seq:
+        r = rng.random()
+        if r < rate:
+            continue
+        out.append(rng.choice(alphabet) if r < 2 * rate else ch)
+        if rng.random() < rate:
+            out.append(rng.choice(alphabet))
+    return "".join(out)
+
+
+def family(seed: int, n: int, length: int, alphabet: str = "ACGT"):
+    """n descendants of one random ancestor, with point mutations and indels."""
+    rng = random.Random(seed)
+    root = random_seq(rng, length, alphabet)
+    return [mutate(rng, root, rng.choice([0.02, 0.05, 0.1]), alphabet) for _ in range(n)]
+
+
+def row(seq: str) -> np.ndarray:
+    return UPPER[encode(seq)][None, :].copy()
+
+
+def score_free_ends(align1: str, align2: str, table, gap_open: int, gap_extend: int) -> int:
+    """Score of a pairwise alignment whose gaps before the first / after the last pair cost nothing."""
+    pairs = [k for k, (x, y) in enumerate(zip(align1, align2)) if "-" not in (x, y)]
+    if not pairs:
+        return 0
+    score, previous = 0, None
+    for x, y in zip(align1[pairs[0]:pairs[-1] + 1], align2[pairs[0]:pairs[-1] + 1]):
+        state = "I" if y == "-" else "D" if x == "-" else "M"
+        if state == "M":
+            score += pair_score(table, x, y)
+        else:
+            score += gap_extend if state == previous else gap_open
+        previous = state
+    return score
+
+
+class AlignProfilesTest(unittest.TestCase):
+
+    def check_pairs(self, pairs, table, gap_open, gap_extend, aligner):
+        for a, b in pairs:
+            with self.subTest(a=a, b=b):
+                merged = align_profiles(row(a), row(b), table, gap_open, gap_extend)
+                align1, align2 = (r.tobytes().decode("ascii") for r in merged)
+                self.assertEqual((align1.replace("-", ""), align2.replace("-", "")), (a, b))
+                self.assertEqual(score_free_ends(align1, align2, table, gap_open, gap_extend),
+                                 aligner.score(a, b))
+
+    def test_single_rows_match_biopython(self):
+        rng = random.Random(1)
+        pairs = [(random_seq(rng, rng.randint(1, 80)), random_seq(rng, rng.randint(1, 80))) for _ in range(20)]
+        pairs += [tuple(family(seed, 2, 90)) for seed in range(20)]
+        table = score_table(2, -1)
+        for gap_open, gap_extend in [(-2, -2), (-5, -1), (-3, -4)]:
+            aligner = get_aligner("global", 2, -1, gap_open=gap_open, gap_extend=gap_extend, end_gap=0)
+            self.check_pairs(pairs, table, gap_open, gap_extend, aligner)
+
+    def test_substitution_matrix(self):
+        pairs = [tuple(family(seed, 2, 70, PROTEIN)) for seed in range(15)]
+        table = score_table(matrix="BLOSUM62")
+        aligner = get_aligner("global", gap_open=MATRIX_GAPS[0], gap_extend=MATRIX_GAPS[1], matrix="BLOSUM62",
+                              end_gap=0)
+        self.check_pairs(pairs, table, *MATRIX_GAPS, aligner)
+
+    def test_linear_when_extend_is_omitted(self):
+        table = score_table(2, -1)
+        a, b = family(3, 2, 60)
+        self.assertTrue(np.array_equal(align_profiles(row(a), row(b), table, -2),
+                                       align_profiles(row(a), row(b), table, -2, -2)))
+
+    def test_profile_columns_are_kept_whole(self):
+        seqs = family(4, 4, 60)
+        table = score_table(2, -1)
+        top = align_profiles(row(seqs[0]), row(seqs[1]), table, -2)
+        bottom = align_profiles(row(seqs[2]), row(seqs[3]), table, -2)
+        merged = align_profiles(top, bottom, table, -2)
+        # the rows of each input profile stay aligned with each other: dropping the columns
+        # that are gaps in the whole profile gives the input block back
+        for block, rows in ((top, merged[:2]), (bottom, merged[2:])):
+            kept = rows[:, ~np.all(rows == ord("-"), axis=0)]
+            self.assertTrue(np.array_equal(kept, block))
+
+
+class ProgressiveAlignTest(unittest.TestCase):
+
+    def check_msa(self, seqs, rows):
+        self.assertEqual(len(rows), len(seqs))
+        self.assertEqual(len({len(r) for r in rows}), 1)
+        self.assertEqual([r.replace("-", "") for r in rows], [s.upper() for s in seqs])
+        columns = np.array([list(r) for r in rows])
+        self.assertFalse(np.all(columns == "-", axis=0).any())
+
+    def test_rows_are_the_inputs(self):
+        seqs = family(5, 12, 150)
+        seqs[3] = seqs[3].lower()
+        self.check_msa(seqs, progressive_align(seqs))
+
+    def test_protein_defaults_to_affine_gaps(self):
+        seqs = family(6, 8, 120, PROTEIN)
+        rows = progressive_align(seqs, matrix="BLOSUM62")
+        self.check_msa(seqs, rows)
+        self.assertEqual(rows, progressive_align(seqs, matrix="BLOSUM62", gap_open=-10, gap_extend=-1))
+        self.assertNotEqual(rows, progressive_align(seqs, matrix="BLOSUM62", gap_open=-2, gap_extend=-2))
+
+    def test_workers_give_the_same_alignment(self):
+        seqs = family(7, 10, 100)
+        self.assertEqual(progressive_align(seqs, workers=3), progressive_align(seqs))
+
+    def test_explicit_tree(self):
+        seqs = family(8, 6, 80)
+        tree = guide_tree(seqs, k=4, method="cosine")
+        self.assertEqual(progressive_align(seqs, tree=tree), progressive_align(seqs, k=4, kmer_method="cosine"))
+
+    def test_small_inputs(self):
+        self.assertEqual(progressive_align([]), [])
+        self.assertEqual(progressive_align(["acgt"]), ["ACGT"])
+        self.check_msa(["ACGT", "AGT"], progressive_align(["ACGT", "AGT"]))
+
+    def test_default_gaps(self):
+        self.assertEqual(default_gaps("BLOSUM62"), MATRIX_GAPS)
+        self.assertEqual(default_gaps(None, -3), (-3, -3))
+
+
+if __name__ == "__main__":
+    unittest.main()
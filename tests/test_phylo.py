@@ -0,0 +1,163 @@
+"""
+seqtools.kmer distances and the UPGMA guide tree (msa.upgma, phylo.upgma_tree), checked
+against naive Counter-based distances, a textbook O(n^3) UPGMA and Bio.Phylo.
+
+Run: python -m unittest discover -s tests   (or: python -m pytest tests)
+"""
+
+import random
+import sys
+import unittest
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from Bio.Phylo.TreeConstruction import DistanceTreeConstructor
+
+from seqtools.kmer import (MAX_K, cosine_distances, kmer_codes, kmer_count_vectors, kmer_distance_matrix,
+                           shared_kmer_distances)
+from seqtools.msa import upgma
+from seqtools.phylo import to_distance_matrix, upgma_tree
+
+
+def random_seq(rng: random.Random, length: int, alphabet: str = "ACGT") -> str:
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def kmers(seq: str, k: int) -> Counter:
+    seq = seq.upper()
+    return Counter(seq[i:i + k] for i in range(len(seq) - k + 1))
+
+
+class KmerTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(11)
+        base = random_seq(rng, 300)
+        # related sequences (point mutations of one ancestor), plus unrelated and short ones
+        self.seqs = ["".join(c if rng.random() > rate else rng.choice("ACGT") for c in base)
+                     for rate in (0.0, 0.02, 0.05, 0.2)]
+        self.seqs += [random_seq(rng, 250), base.lower(), "ACG", ""]
+
+    def test_codes_pack_the_upper_cased_bytes(self):
+        for k in (1, 3, MAX_K):
+            codes = kmer_codes("acgTNacgt", k)
+            expected = [int.from_bytes(w.encode(), "big") for w in
+                        ("ACGTNACGT"[i:i + k] for i in range(9 - k + 1))]
+            self.assertEqual(codes.tolist(), expected)
+        self.assertEqual(len(kmer_codes("AC", 3)), 0)
+        with self.assertRaises(ValueError):
+            kmer_codes("ACGT", MAX_K + 1)
+
+    def test_shared_matches_naive(self):
+        k = 4
+        dist = shared_kmer_distances(self.seqs, k)
+        for x, a in enumerate(self.seqs):
+            for y, b in enumerate(self.seqs):
+                if x == y:
+                    continue
+                ca, cb = kmers(a, k), kmers(b, k)
+                denom = min(sum(ca.values()), sum(cb.values()))
+                expected = 1.0 - sum((ca & cb).values()) / denom if denom else 1.0
+                self.assertAlmostEqual(dist[x, y], expected, msg=(x, y))
+
+    def test_cosine_matches_naive(self):
+        k = 3
+        dist = cosine_distances(kmer_count_vectors(self.seqs, k))
+        for x, a in enumerate(self.seqs):
+            for y, b in enumerate(self.seqs):
+                ca, cb = kmers(a, k), kmers(b, k)
+                norm = np.sqrt(sum(v * v for v in ca.values()) * sum(v * v for v in cb.values()))
+                if x == y:
+                    expected = 0.0
+                elif norm == 0:
+                    expected = 1.0
+                else:
+                    expected = 1.0 - sum(ca[w] * cb[w] for w in ca) / norm
+                self.assertAlmostEqual(dist[x, y], expected, places=5, msg=(x, y))
+
+    def test_methods_agree_on_the_extremes(self):
+        for method in ("shared", "cosine", "minhash"):
+            with self.subTest(method=method):
+                dist = kmer_distance_matrix(self.seqs, 4, method)
+                self.assertTrue(np.allclose(dist, dist.T))
+                self.assertTrue(np.all(np.diag(dist) == 0))
+                self.assertAlmostEqual(dist[0, 5], 0.0, places=5)  # same sequence, other case
+                self.assertEqual(dist[0, 7], 1.0)  # empty sequence shares nothing
+                # more mutations, larger distance
+                self.assertTrue(dist[0, 1] < dist[0, 2] < dist[0, 3], dist[0, :4])
+        with self.assertRaises(ValueError):
+            kmer_distance_matrix(self.seqs, 4, "euclid")
+
+
+class UpgmaTest(unittest.TestCase):
+
+    @staticmethod
+    def reference(dist: np.ndarray):
+        """Textbook O(n^3) average linkage: (leaf set, merge distance) for every merge."""
+        clusters = [frozenset([i]) for i in range(len(dist))]
+        merges = []
+        while len(clusters) > 1:
+            best = None
+            for x in range(len(clusters)):
+                for y in range(x + 1, len(clusters)):
+                    d = np.mean([dist[a, b] for a in clusters[x] for b in clusters[y]])
+                    if best is None or d < best[0]:
+                        best = (d, x, y)
+            d, x, y = best
+            merged = clusters[x] | clusters[y]
+            clusters = [c for k, c in enumerate(clusters) if k not in (x, y)] + [merged]
+            merges.append((merged, d))
+        return merges
+
+    @staticmethod
+    def leaf_sets(merges: np.ndarray):
+        n = len(merges) + 1
+        members = [frozenset([i]) for i in range(n)]
+        out = []
+        for a, b, d, size in merges:
+            members.append(members[int(a)] | members[int(b)])
+            assert len(members[-1]) == size
+            out.append((members[-1], d))
+        return out
+
+    def random_distances(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        points = rng.random((n, 3))
+        return np.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2))
+
+    def test_matches_the_textbook_algorithm(self):
+        rng = np.random.default_rng(5)
+        for n in (2, 3, 8, 25):
+            dist = self.random_distances(rng, n)
+            got = sorted(self.leaf_sets(upgma(dist)), key=lambda m: m[1])
+            expected = sorted(self.reference(dist), key=lambda m: m[1])
+            self.assertEqual([members for members, _ in got], [members for members, _ in expected])
+            self.assertTrue(np.allclose([d for _, d in got], [d for _, d in expected]))
+
+    def test_single_sequence(self):
+        self.assertEqual(upgma(np.zeros((1, 1))).shape, (0, 4))
+
+    def test_tree_matches_biopython(self):
+        rng = np.random.default_rng(6)
+        dist = self.random_distances(rng, 12)
+        names = [f"s{i}" for i in range(12)]
+        ours = upgma_tree(dist, names)
+        theirs = DistanceTreeConstructor().upgma(to_distance_matrix(dist, names))
+
+        def clades(tree):
+            return {frozenset(leaf.name for leaf in clade.get_terminals()) for clade in tree.find_clades()}
+
+        self.assertEqual(clades(ours), clades(theirs))
+        # ultrametric: every leaf sits at half the root merge distance
+        root = upgma(dist)[-1, 2] / 2
+        for leaf in ours.get_terminals():
+            self.assertAlmostEqual(ours.distance(ours.root, leaf), root)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+"""
+seqtools.seqstore, distance and composition: the FASTA buffer and the kernels that read it,
+checked against Biopython's parser and naive per-sequence loops.
+
+Run: python -m unittest discover -s tests   (or: python -m pytest tests)
+"""
+
+import io
+import os
+import random
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from Bio import SeqIO
+
+from seqtools.composition import CLASSES, sequence_composition
+from seqtools.distance import hamming_block, hamming_matrix, p_distance_matrix, prepare_panel
+from seqtools.seqstore import SequenceStore, cache_paths, load_fasta, parse_fasta
+
+
+def random_seq(rng: random.Random, length: int, alphabet: str = "ACGT") -> str:
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def fasta_text(records, width: int = 60, newline: str = "\n") -> str:
+    out = []
+    for header, seq in records:
+        out.append(f">{header}")
+        out.extend(seq[k:k + width] for k in range(0, len(seq), width))
+    return newline.join(out) + newline
+
+
+class ParseFastaTest(unittest.TestCase):
+
+    def assert_matches_biopython(self, text: str, fmt: str = "fasta"):
+        store = parse_fasta(text.encode())
+        expected = list(SeqIO.parse(io.StringIO(text), fmt))
+        self.assertEqual(store.ids, [rec.id for rec in expected])
+        self.assertEqual(store.descriptions, [rec.description for rec in expected])
+        self.assertEqual([store.text(i) for i in range(len(store))], [str(rec.seq) for rec in expected])
+
+    def test_agrees_with_biopython(self):
+        rng = random.Random(1)
+        records = [(f"seq{i} sample {i}", random_seq(rng, rng.randint(0, 300), "ACGTNacgtn"))
+                   for i in range(25)]
+        for width in (1, 7, 60, 1000):
+            with self.subTest(width=width):
+                self.assert_matches_biopython(fasta_text(records, width))
+
+    def test_crlf_blank_lines_and_leading_text(self):
+        text = "comment line\r\n>a first\r\nAC GT\r\n\r\nTT\r\n>b\r\n>c  spaced  header \r\nGG\r\n"
+        self.assert_matches_biopython(text, "fasta-pearson")  # text before the first header is skipped
+        store = parse_fasta(text.encode())
+        self.assertEqual([store.text(i) for i in range(3)], ["ACGTTT", "", "GG"])
+
+    def test_empty_input(self):
+        store = parse_fasta(b"")
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.offsets.tolist(), [0])
+
+    def test_views_share_the_buffer(self):
+        store = parse_fasta(b">a\nACGT\n>b\nGG\n")
+        self.assertTrue(np.shares_memory(store[1], store.data))
+        self.assertEqual(store.lengths.tolist(), [4, 2])
+        self.assertEqual(store.index("b"), 1)
+
+
+class SequenceStoreTest(unittest.TestCase):
+
+    def test_from_sequences_subset_and_upper(self):
+        store = SequenceStore.from_sequences([("a", "acgt"), ("b", b"GGN"), ("c", np.frombuffer(b"T", np.uint8))])
+        self.assertEqual(store.ids, ["a", "b", "c"])
+        self.assertEqual(store.upper().text(0), "ACGT")
+        sub = store.subset([2, 0])
+        self.assertEqual((sub.ids, sub.text(0), sub.text(1)), (["c", "a"], "T", "acgt"))
+
+    def test_write_fasta_round_trip(self):
+        store = SequenceStore.from_sequences([("a", "ACGT" * 40), ("b", ""), ("c", "GG")], ["a x", "b", "c y"])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "out.fa"
+            store.write_fasta(path, width=50)
+            again = load_fasta(path, cache=False)
+        self.assertEqual(again.descriptions, store.descriptions)
+        self.assertTrue(np.array_equal(again.data, store.data))
+        self.assertEqual(again.offsets.tolist(), store.offsets.tolist())
+
+
+class LoadFastaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "panel.fa"
+        self.path.write_text(">a\nACGT\n>b\nGGCC\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cache_is_written_and_reused(self):
+        first = load_fasta(self.path)
+        data_path, meta_path = cache_paths(self.path)
+        self.assertTrue(data_path.exists() and meta_path.exists())
+        second = load_fasta(self.path)
+        self.assertIsInstance(second.data, np.memmap)
+        self.assertEqual([second.text(i) for i in range(2)], [first.text(i) for i in range(2)])
+
+    def test_edited_fasta_invalidates_the_cache(self):
+        load_fasta(self.path)
+        stat = self.path.stat()
+        self.path.write_text(">a\nTTTT\n>b\nGGCC\n")  # same size: only the mtime tells
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertEqual(load_fasta(self.path).text(0), "TTTT")
+
+    def test_upper(self):
+        self.path.write_text(">a\nacgtN\n")
+        self.assertEqual(load_fasta(self.path, upper=True).text(0), "ACGTN")
+
+
+class HammingTest(unittest.TestCase):
+
+    @staticmethod
+    def naive(seqs):
+        return np.array([[sum(x != y for x, y in zip(a.upper(), b.upper())) for b in seqs] for a in seqs])
+
+    def test_matches_naive_loop(self):
+        rng = random.Random(2)
+        for alphabet, length in [("ACGT", 1), ("ACGT", 31), ("ACGT", 33), ("ACGTacgt", 100), ("ACGTN-", 70),
+                                 ("ACDEFGHIKLMNPQRSTVWY", 50)]:
+            seqs = [random_seq(rng, length, alphabet) for _ in range(12)]
+            with self.subTest(alphabet=alphabet, length=length):
+                expected = self.naive(seqs)
+                for pack in (True, False):
+                    self.assertTrue(np.array_equal(hamming_matrix(seqs, pack=pack), expected))
+                self.assertTrue(np.allclose(p_distance_matrix(seqs), expected / length))
+
+    def test_blocks_match_the_matrix(self):
+        rng = random.Random(3)
+        seqs = [random_seq(rng, 90) for _ in range(10)]
+        panel = prepare_panel(seqs)
+        self.assertEqual(panel.dtype, np.uint64)
+        self.assertTrue(np.array_equal(hamming_block(panel[:4], panel[4:]), hamming_matrix(seqs)[:4, 4:]))
+
+    def test_unequal_lengths_are_refused(self):
+        with self.assertRaises(ValueError):
+            hamming_matrix(["ACGT", "ACG"])
+
+
+class CompositionTest(unittest.TestCase):
+
+    def test_matches_naive_counts(self):
+        rng = random.Random(4)
+        seqs = [random_seq(rng, rng.randint(0, 400), "ACGTUacgtNnRYkm-.*X") for _ in range(30)]
+        comp = sequence_composition(seqs)
+        classes = {"A": "Aa", "C": "Cc", "G": "Gg", "T": "TtUu", "N": "Nn", "ambiguous": "RYKMSWBDHVrykmswbdhv",
+                   "gap": "-."}
+        for i, seq in enumerate(seqs):
+            counts = {name: sum(seq.count(ch) for ch in chars) for name, chars in classes.items()}
+            counts["other"] = len(seq) - sum(counts.values())
+            self.assertEqual(comp.counts[i].tolist(), [counts[name] for name in CLASSES])
+            acgt = counts["A"] + counts["C"] + counts["G"] + counts["T"]
+            gc = (counts["G"] + counts["C"]) / acgt if acgt else 0.0
+            self.assertAlmostEqual(float(comp.gc[i]), gc)
+            lower = sum(ch.islower() for ch in seq)
+            self.assertAlmostEqual(float(comp.soft_masked[i]), lower / len(seq) if seq else 0.0)
+
+    def test_store_and_list_agree(self):
+        store = SequenceStore.from_sequences([("a", "ACGTNNgc"), ("b", ""), ("c", "GGGG")])
+        from_store = sequence_composition(store)
+        from_list = sequence_composition([store.text(i) for i in range(3)], store.ids)
+        self.assertTrue(np.array_equal(from_store.counts, from_list.counts))
+        self.assertTrue(np.allclose(from_store.gc, [4 / 6, 0.0, 1.0]))
+
+
+if __name__ == "__main__":
+    unittest.main()